@@ -0,0 +1,155 @@
+"""
+async_extract.py - Concurrent, Chunked Extraction from Open-Meteo
+
+The async extractor splits a long date range into chunks of
+config.EXTRACT_CHUNK_DAYS days and fetches them concurrently over one shared
+keep-alive httpx.AsyncClient. At most config.EXTRACT_CONCURRENCY requests
+are in flight at a time. Rate limiting, timeouts, retries and the circuit
+breaker are shared with the synchronous extractor (app.upstream). The chunk
+responses are merged back into a single Open-Meteo shaped response
+in timestamp order.
+
+Days already present in the archive cache (app.cache) are not fetched again.
+"""
+
+import asyncio
+from datetime import timedelta
+
+from app import config
+from app.cache import as_date, assemble, get_archive_cache, missing_ranges
+from app.decode import loads
+from app.metrics import stage
+from app.models import HOURLY_FIELDS
+from app.upstream import get_upstream
+
+_client = None
+_client_loop = None
+
+def get_async_client():
+    """
+    Returns the shared httpx.AsyncClient for the running event loop.
+
+    httpx clients are bound to the loop they were first used on, so a new
+    client is created if the loop changes (e.g. between test runs). httpx
+    itself is imported here, on first use.
+    """
+    import httpx
+
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(config.EXTRACT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=config.EXTRACT_CONCURRENCY,
+                max_keepalive_connections=config.EXTRACT_CONCURRENCY,
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+async def close_async_client():
+    """Closes the shared client; called on application shutdown."""
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+def split_date_range(start_date, end_date, chunk_days):
+    """
+    Splits [start_date, end_date] into consecutive inclusive (first, last)
+    date pairs of at most chunk_days days each.
+    """
+    start, end = as_date(start_date), as_date(end_date)
+    chunks = []
+    while start <= end:
+        last = min(start + timedelta(days=chunk_days - 1), end)
+        chunks.append((start, last))
+        start = last + timedelta(days=1)
+    return chunks
+
+async def fetch_chunk(client, lat, lon, start, end):
+    """
+    Fetches one date range through the shared upstream policy (app.upstream).
+
+    Returns:
+        dict: The decoded JSON response.
+
+    Raises:
+        UpstreamError: If Open-Meteo keeps failing or its circuit is open.
+        httpx.HTTPStatusError: For 4xx responses other than 429.
+    """
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "hourly": ",".join(HOURLY_FIELDS),
+        "timezone": "UTC",
+    }
+    content = await get_upstream().get_async(client, config.OPEN_METEO_ARCHIVE_URL, params)
+    with stage("decode"):
+        return loads(content)
+
+def merge_chunks(chunks):
+    """
+    Concatenates chunk responses into one response, ordered by first timestamp.
+    """
+    chunks = [c for c in chunks if c.get("hourly", {}).get("time")]
+    chunks.sort(key=lambda c: c["hourly"]["time"][0])
+    hourly = {"time": [], **{field: [] for field in HOURLY_FIELDS}}
+    for chunk in chunks:
+        times = chunk["hourly"]["time"]
+        hourly["time"].extend(times)
+        for field in HOURLY_FIELDS:
+            hourly[field].extend(chunk["hourly"].get(field) or [None] * len(times))
+    merged = {key: value for key, value in (chunks[0] if chunks else {}).items() if key != "hourly"}
+    merged["hourly"] = hourly
+    return merged
+
+async def fetch_ranges(lat, lon, ranges, client=None):
+    """
+    Fetches every (first, last) range, split into chunks, with bounded concurrency.
+
+    Returns:
+        list: Chunk responses in completion order.
+    """
+    client = client or get_async_client()
+    semaphore = asyncio.Semaphore(config.EXTRACT_CONCURRENCY)
+
+    async def bounded(first, last):
+        async with semaphore:
+            return await fetch_chunk(client, lat, lon, first, last)
+
+    chunks = [
+        chunk
+        for first, last in ranges
+        for chunk in split_date_range(first, last, config.EXTRACT_CHUNK_DAYS)
+    ]
+    return await asyncio.gather(*(bounded(first, last) for first, last in chunks))
+
+async def extract_weather_data_async(lat, lon, start_date, end_date, client=None):
+    """
+    Async counterpart of pipeline.extract_weather_data().
+
+    Args:
+        lat (float): Latitude coordinate for the target location.
+        lon (float): Longitude coordinate for the target location.
+        start_date (str | date): First day of the range.
+        end_date (str | date): Last day of the range (inclusive).
+        client (httpx.AsyncClient, optional): Defaults to the shared client.
+
+    Returns:
+        dict: One Open-Meteo shaped response covering the whole range.
+    """
+    start, end = as_date(start_date), as_date(end_date)
+    cache = get_archive_cache()
+    if cache is None:
+        return merge_chunks(await fetch_ranges(lat, lon, [(start, end)], client))
+
+    days = await asyncio.to_thread(cache.get_days, lat, lon, HOURLY_FIELDS, start, end)
+    chunks = await fetch_ranges(lat, lon, missing_ranges(start, end, days), client)
+    for chunk in chunks:
+        days.update(await asyncio.to_thread(cache.put_response, lat, lon, HOURLY_FIELDS, chunk))
+    return assemble(days, HOURLY_FIELDS, start, end, lat, lon)
@@ -0,0 +1,165 @@
+"""
+batch.py - Multi-Venue Batch Backfill
+
+run_batch() runs many (venue_id, start_date, end_date) jobs on a thread or
+process pool. At most per_venue_limit jobs of the same venue run at once, so
+overlapping ranges of one venue do not contend for the same rows, while
+different venues proceed in parallel. The returned report aggregates
+throughput over the whole batch and gives a status per venue.
+
+When a venue registry is passed, jobs for the same date range whose venues
+fall into the same grid cell are merged into one task that extracts once and
+loads the result for every venue (pipeline.run_pipeline_shared).
+
+Used by the POST /weather/batch endpoint and the 'backfill' CLI command.
+"""
+
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from app import config
+from app.pipeline import LoadResult, PipelineError, run_pipeline, run_pipeline_shared
+from app.venues import UnknownVenueError
+
+EXECUTORS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+@dataclass(frozen=True)
+class BatchJob:
+    """One venue and inclusive date range to backfill."""
+    venue_id: str
+    start_date: str
+    end_date: str
+
+def _run_task(runner, shared_runner, venue_ids, start_date, end_date):
+    """
+    Runs one task and returns [(venue_id, result, error)] instead of raising,
+    so failures cross process boundaries as plain data.
+    """
+    try:
+        if len(venue_ids) == 1:
+            results = {venue_ids[0]: runner(venue_ids[0], start_date, end_date)}
+        else:
+            results = shared_runner(list(venue_ids), start_date, end_date)
+        return [(venue_id, results[venue_id], None) for venue_id in venue_ids]
+    except PipelineError as e:
+        return [(venue_id, e.results.get(venue_id, LoadResult()), str(e)) for venue_id in venue_ids]
+    except Exception as e:
+        return [(venue_id, LoadResult(), f"{type(e).__name__}: {e}") for venue_id in venue_ids]
+
+def _group_tasks(jobs, registry):
+    """
+    Turns jobs into (venue_ids, start_date, end_date) tasks, merging jobs with
+    the same range and grid cell when a registry is given. Jobs are unique
+    (run_batch() rejects duplicates), so each venue appears once per task.
+    """
+    if registry is None:
+        return [((job.venue_id,), job.start_date, job.end_date) for job in jobs]
+    groups = defaultdict(list)
+    for job in jobs:
+        try:
+            key = (registry.get(job.venue_id).cell, job.start_date, job.end_date)
+        except UnknownVenueError:
+            key = (job.venue_id, job.start_date, job.end_date)  # runs alone and reports the error
+        groups[key].append(job.venue_id)
+    return [(tuple(venue_ids), start, end) for (_, start, end), venue_ids in groups.items()]
+
+def run_batch(jobs, max_workers=None, per_venue_limit=None, executor=None,
+              runner=run_pipeline, shared_runner=run_pipeline_shared, registry=None):
+    """
+    Runs jobs in parallel and reports aggregate and per-venue results.
+
+    Args:
+        jobs (list): BatchJob instances.
+        max_workers (int, optional): Pool size; defaults to config.BATCH_MAX_WORKERS.
+        per_venue_limit (int, optional): Concurrent jobs per venue; defaults to
+            config.BATCH_PER_VENUE_LIMIT.
+        executor (str, optional): "thread" or "process"; defaults to
+            config.BATCH_EXECUTOR.
+        runner (callable, optional): Single-venue pipeline runner; must be
+            picklable for the process executor.
+        shared_runner (callable, optional): Runner for venues sharing a grid
+            cell, returning {venue_id: LoadResult}.
+        registry (VenueRegistry, optional): Enables grid-cell fan-out.
+
+    Returns:
+        dict: Totals ('jobs', 'tasks', 'succeeded', 'failed', row counts,
+        'elapsed_seconds', 'rows_per_second') and a 'venues' mapping with each
+        venue's 'status', row counts and 'errors'.
+
+    Raises:
+        ValueError: For an unknown executor or a job listed more than once.
+    """
+    max_workers = max_workers or config.BATCH_MAX_WORKERS
+    per_venue_limit = per_venue_limit or config.BATCH_PER_VENUE_LIMIT
+    executor = executor or config.BATCH_EXECUTOR
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}; expected one of {tuple(EXECUTORS)}")
+    seen = set()
+    for job in jobs:
+        if job in seen:
+            raise ValueError(f"Duplicate job: {job.venue_id} {job.start_date}..{job.end_date}")
+        seen.add(job)
+
+    tasks = _group_tasks(jobs, registry)
+    pending = deque(tasks)
+    running = defaultdict(int)
+    results = {job.venue_id: LoadResult() for job in jobs}
+    errors = defaultdict(list)
+    outcomes = {"succeeded": 0, "failed": 0}
+    started = time.perf_counter()
+
+    with EXECUTORS[executor](max_workers=max_workers) as pool:
+        futures = {}
+
+        def submit_ready():
+            # Submit, in order, every pending task whose venues all have capacity.
+            for _ in range(len(pending)):
+                task = pending.popleft()
+                venue_ids, start_date, end_date = task
+                if all(running[venue_id] < per_venue_limit for venue_id in venue_ids):
+                    for venue_id in venue_ids:
+                        running[venue_id] += 1
+                    futures[pool.submit(_run_task, runner, shared_runner, *task)] = task
+                else:
+                    pending.append(task)
+
+        submit_ready()
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                venue_ids, start_date, end_date = futures.pop(future)
+                for venue_id, result, error in future.result():
+                    running[venue_id] -= 1
+                    results[venue_id] += result
+                    if error is None:
+                        outcomes["succeeded"] += 1
+                    else:
+                        outcomes["failed"] += 1
+                        errors[venue_id].append(
+                            {"start_date": str(start_date), "end_date": str(end_date), "error": error}
+                        )
+            submit_ready()
+
+    elapsed = time.perf_counter() - started
+    total = sum(results.values(), LoadResult())
+    venues = {}
+    for venue_id, result in results.items():
+        venue_errors = errors.get(venue_id, [])
+        if not venue_errors:
+            status = "success"
+        elif result.rows_loaded:
+            status = "partial"
+        else:
+            status = "failed"
+        venues[venue_id] = {"status": status, **result.as_dict(), "errors": venue_errors}
+    return {
+        "jobs": len(jobs),
+        "tasks": len(tasks),
+        **outcomes,
+        **total.as_dict(),
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(total.rows_loaded / elapsed, 1) if elapsed > 0 else 0.0,
+        "venues": venues,
+    }
@@ -0,0 +1,251 @@
+"""
+cache.py - On-Disk Cache of Open-Meteo Archive Responses
+
+Historical archive data for a past date range never changes, so responses are
+cached in a local SQLite file at day granularity, keyed on (latitude,
+longitude, hourly variable set, day). A request for an overlapping range only
+fetches the days that are not cached yet.
+
+Days close to today may still be revised by Open-Meteo, so they expire after
+a TTL; older days are kept until the size-bounded LRU eviction removes them.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta, timezone
+
+from app import config
+from app.decode import loads
+from app.metrics import CACHE_DAYS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive_days (
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    fields TEXT NOT NULL,
+    day TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (lat, lon, fields, day)
+);
+CREATE INDEX IF NOT EXISTS archive_days_accessed_at ON archive_days (accessed_at);
+"""
+
+def as_date(value):
+    """Accepts a date or a 'YYYY-MM-DD' string and returns a date."""
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+def iter_days(start, end):
+    """Yields every date from start to end, inclusive."""
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+def missing_ranges(start, end, cached_days):
+    """
+    Collapses the days in [start, end] that are not in cached_days into
+    contiguous (first_day, last_day) ranges, one upstream request each.
+    """
+    ranges = []
+    run_start = None
+    for day in iter_days(start, end):
+        if day.isoformat() in cached_days:
+            if run_start is not None:
+                ranges.append((run_start, day - timedelta(days=1)))
+                run_start = None
+        elif run_start is None:
+            run_start = day
+    if run_start is not None:
+        ranges.append((run_start, end))
+    return ranges
+
+def split_by_day(data, fields):
+    """
+    Splits the 'hourly' arrays of an Open-Meteo response into per-day dicts
+    of the same shape, keyed by 'YYYY-MM-DD'.
+    """
+    hourly = data.get("hourly", {})
+    times = hourly.get("time", [])
+    days = {}
+    for i, ts in enumerate(times):
+        day = days.setdefault(ts[:10], {"time": [], **{field: [] for field in fields}})
+        day["time"].append(ts)
+        for field in fields:
+            values = hourly.get(field)
+            day[field].append(values[i] if values is not None and i < len(values) else None)
+    return days
+
+def assemble(days, fields, start, end, lat=None, lon=None):
+    """
+    Concatenates per-day hourly dicts for [start, end] into a response shaped
+    like Open-Meteo's, so transform() can consume it unchanged.
+    """
+    hourly = {"time": [], **{field: [] for field in fields}}
+    for day in iter_days(start, end):
+        cached = days.get(day.isoformat())
+        if cached is None:
+            continue
+        hourly["time"].extend(cached["time"])
+        for field in fields:
+            hourly[field].extend(cached[field])
+    return {"latitude": lat, "longitude": lon, "timezone": "UTC", "hourly": hourly}
+
+class ArchiveCache:
+    """
+    SQLite-backed day cache for Open-Meteo archive responses.
+
+    Args:
+        path (str): SQLite database file (created if missing).
+        max_bytes (int): Upper bound on stored (compressed) payload bytes;
+            least recently used days are evicted beyond it.
+        recent_days (int): Days within this many days of today are "recent".
+        recent_ttl (float): Seconds after which a recent day is re-fetched.
+        clock (callable, optional): Returns the current epoch time; for tests.
+    """
+
+    def __init__(self, path, max_bytes, recent_days, recent_ttl, clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.recent_days = recent_days
+        self.recent_ttl = recent_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(lat, lon, fields):
+        return round(float(lat), 4), round(float(lon), 4), ",".join(sorted(fields))
+
+    def _is_fresh(self, day, fetched_at, now):
+        today = datetime.fromtimestamp(now, timezone.utc).date()
+        if date.fromisoformat(day) < today - timedelta(days=self.recent_days):
+            return True
+        return now - fetched_at < self.recent_ttl
+
+    def get_days(self, lat, lon, fields, start, end):
+        """
+        Returns {'YYYY-MM-DD': hourly dict} for the fresh cached days in
+        [start, end] and marks them as recently used.
+        """
+        lat, lon, fields_key = self._key(lat, lon, fields)
+        now = self._clock()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT day, payload, fetched_at FROM archive_days "
+                "WHERE lat = ? AND lon = ? AND fields = ? AND day BETWEEN ? AND ?",
+                (lat, lon, fields_key, start.isoformat(), end.isoformat()),
+            ).fetchall()
+            days = {
+                day: loads(zlib.decompress(payload))
+                for day, payload, fetched_at in rows
+                if self._is_fresh(day, fetched_at, now)
+            }
+            self._db.executemany(
+                "UPDATE archive_days SET accessed_at = ? "
+                "WHERE lat = ? AND lon = ? AND fields = ? AND day = ?",
+                [(now, lat, lon, fields_key, day) for day in days],
+            )
+            requested = (end - start).days + 1
+            self.hits += len(days)
+            self.misses += requested - len(days)
+        CACHE_DAYS.inc(len(days), result="hit")
+        CACHE_DAYS.inc(requested - len(days), result="miss")
+        return days
+
+    def put_days(self, lat, lon, fields, days):
+        """Stores per-day hourly dicts and evicts down to max_bytes."""
+        lat, lon, fields_key = self._key(lat, lon, fields)
+        now = self._clock()
+        rows = []
+        for day, hourly in days.items():
+            payload = zlib.compress(json.dumps(hourly, separators=(",", ":")).encode())
+            rows.append((lat, lon, fields_key, day, payload, len(payload), now, now))
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO archive_days "
+                "(lat, lon, fields, day, payload, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+
+    def put_response(self, lat, lon, fields, data):
+        """Splits an Open-Meteo response by day and stores every day."""
+        days = split_by_day(data, fields)
+        self.put_days(lat, lon, fields, days)
+        return days
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM archive_days").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT rowid, size FROM archive_days ORDER BY accessed_at, day"
+        ).fetchall()
+        evict = []
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            evict.append((rowid,))
+            total -= size
+        self._db.executemany("DELETE FROM archive_days WHERE rowid = ?", evict)
+
+    def stats(self):
+        """Returns hit/miss counts (in days) and the stored size."""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM archive_days"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "days": entries, "bytes": size}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def cached_fetch(cache, fetch, lat, lon, start_date, end_date, fields):
+    """
+    Serves [start_date, end_date] from the cache, calling
+    fetch(lat, lon, first_day, last_day) only for the missing day ranges.
+
+    Returns:
+        dict: An Open-Meteo shaped response covering the whole range.
+    """
+    start, end = as_date(start_date), as_date(end_date)
+    days = cache.get_days(lat, lon, fields, start, end)
+    for first, last in missing_ranges(start, end, days):
+        days.update(cache.put_response(lat, lon, fields, fetch(lat, lon, first, last)))
+    return assemble(days, fields, start, end, lat, lon)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_archive_cache():
+    """
+    Returns the process-wide ArchiveCache, or None when ARCHIVE_CACHE_PATH
+    is empty (caching disabled).
+    """
+    global _cache
+    if not config.ARCHIVE_CACHE_PATH:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ArchiveCache(
+                config.ARCHIVE_CACHE_PATH,
+                config.ARCHIVE_CACHE_MAX_BYTES,
+                config.ARCHIVE_CACHE_RECENT_DAYS,
+                config.ARCHIVE_CACHE_RECENT_TTL,
+            )
+        return _cache
@@ -0,0 +1,185 @@
+"""
+cli.py - Command-Line Entry Point
+
+Runs pipeline operations without going through the HTTP API, e.g. from a
+nightly cron job or a one-off shell.
+
+Usage:
+    python -m app.cli backfill --venues v1 v2 --start 2024-01-01 --end 2024-12-31
+    python -m app.cli backfill --jobs-file jobs.json --workers 8 --executor process
+    python -m app.cli sync --venues v1 v2 [--start 2024-01-01]
+    python -m app.cli qa [--venue v1] [--start 2024-01-01] [--end 2024-01-31]
+    python -m app.cli partitions list|qa
+    python -m app.cli partitions ensure --start 2024-01-01 --end 2024-12-31
+    python -m app.cli partitions drop --before 2020-01-01 [--detach-only]
+    python -m app.cli replay --venues v1 v2 --start 2024-01-01 --end 2024-12-31 [--workers 4]
+    python -m app.cli export --venues v1 v2 --start 2024-01-01 --end 2024-12-31 [--format arrow] [--out DIR]
+
+A jobs file is a JSON list of {"venue_id", "start_date", "end_date"} objects.
+Results are printed as JSON; the exit code is 1 if any job failed.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from app import config
+
+def _backfill(args):
+    from app.batch import BatchJob, run_batch
+    from app.venues import get_registry
+
+    jobs = []
+    if args.jobs_file:
+        with open(args.jobs_file) as f:
+            jobs.extend(BatchJob(**item) for item in json.load(f))
+    if args.venues:
+        if not (args.start and args.end):
+            raise SystemExit("--venues requires --start and --end")
+        jobs.extend(BatchJob(venue_id, args.start, args.end) for venue_id in args.venues)
+    if not jobs:
+        raise SystemExit("Nothing to do: pass --venues or --jobs-file")
+    registry = None
+    if config.BATCH_SHARE_CELLS:
+        registry = get_registry()
+        registry.load()
+    try:
+        report = run_batch(jobs, args.workers, args.per_venue, args.executor, registry=registry)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+def _sync(args):
+    from app.pipeline import sync_venue
+
+    reports = []
+    failed = False
+    for venue_id in args.venues:
+        try:
+            reports.append(sync_venue(venue_id, args.start))
+        except Exception as e:
+            failed = True
+            reports.append({"venue_id": venue_id, "error": str(e)})
+    print(json.dumps(reports, indent=2))
+    return 1 if failed else 0
+
+def _qa(args):
+    from app.qa import run_qa
+
+    report = run_qa(args.venue, args.start, args.end)
+    print(json.dumps(report, indent=2))
+    return 0 if report["passed"] else 1
+
+def _partitions(args):
+    from app import partitions
+    from app.db import connection
+
+    with connection() as conn:
+        if args.action == "list":
+            result = [
+                {"partition": name, "from": str(lower) if lower else None, "to": str(upper) if upper else None}
+                for name, lower, upper in partitions.list_partitions(conn)
+            ]
+        elif args.action == "ensure":
+            if not (args.start and args.end):
+                raise SystemExit("ensure requires --start and --end")
+            result = {"created": partitions.ensure_partitions(conn, args.start, args.end)}
+        elif args.action == "drop":
+            if not args.before:
+                raise SystemExit("drop requires --before")
+            result = {"retired": partitions.drop_partitions(conn, args.before, args.detach_only),
+                      "detached_only": args.detach_only}
+        else:
+            result = partitions.qa_by_partition(conn)
+    print(json.dumps(result, indent=2))
+    if args.action == "qa" and not all(report["passed"] for report in result.values()):
+        return 1
+    return 0
+
+def _replay(args):
+    from app.pipeline import replay_archives
+
+    reports = []
+    failed = False
+    for venue_id in args.venues:
+        try:
+            result = replay_archives(venue_id, args.start, args.end, workers=args.workers)
+            reports.append({"venue_id": venue_id, **result.as_dict()})
+        except Exception as e:
+            failed = True
+            reports.append({"venue_id": venue_id, "error": str(e)})
+    print(json.dumps(reports, indent=2))
+    return 1 if failed else 0
+
+def _export(args):
+    from app.export import export_weather
+    from app.query import parse_fields
+
+    try:
+        fields = parse_fields(args.fields)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    files = export_weather(args.venues, args.start, args.end, args.out, args.format, fields)
+    print(json.dumps({"files": files, "rows": sum(f["rows"] for f in files)}, indent=2))
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Weather pipeline commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill", help="Load several venues and date ranges in parallel.")
+    backfill.add_argument("--venues", nargs="+", help="venue ids sharing --start/--end")
+    backfill.add_argument("--start", help="start date (YYYY-MM-DD)")
+    backfill.add_argument("--end", help="end date (YYYY-MM-DD)")
+    backfill.add_argument("--jobs-file", help="JSON list of {venue_id, start_date, end_date}")
+    backfill.add_argument("--workers", type=int, default=config.BATCH_MAX_WORKERS)
+    backfill.add_argument("--per-venue", type=int, default=config.BATCH_PER_VENUE_LIMIT,
+                          help="concurrent jobs per venue")
+    backfill.add_argument("--executor", choices=("thread", "process"), default=config.BATCH_EXECUTOR)
+    backfill.set_defaults(func=_backfill)
+
+    sync = commands.add_parser("sync", help="Bring venues up to yesterday from their high-water marks.")
+    sync.add_argument("--venues", nargs="+", required=True)
+    sync.add_argument("--start", help="start date for venues that were never synced (YYYY-MM-DD)")
+    sync.set_defaults(func=_sync)
+
+    qa = commands.add_parser("qa", help="Count QA rule violations in stored rows.")
+    qa.add_argument("--venue", help="only check this venue")
+    qa.add_argument("--start", help="first day to check (YYYY-MM-DD)")
+    qa.add_argument("--end", help="last day to check (YYYY-MM-DD)")
+    qa.set_defaults(func=_qa)
+
+    parts = commands.add_parser("partitions", help="Manage weather_data partitions and run per-partition QA.")
+    parts.add_argument("action", choices=("list", "ensure", "drop", "qa"))
+    parts.add_argument("--start", help="ensure: first day (YYYY-MM-DD)")
+    parts.add_argument("--end", help="ensure: last day (YYYY-MM-DD)")
+    parts.add_argument("--before", help="drop: retire partitions ending on or before this day")
+    parts.add_argument("--detach-only", action="store_true", help="drop: detach but keep the tables")
+    parts.set_defaults(func=_partitions)
+
+    replay = commands.add_parser("replay", help="Reload venues from landed raw responses, without network access.")
+    replay.add_argument("--venues", nargs="+", required=True)
+    replay.add_argument("--start", required=True, help="first day (YYYY-MM-DD)")
+    replay.add_argument("--end", required=True, help="last day (YYYY-MM-DD)")
+    replay.add_argument("--workers", type=int, default=config.REPLAY_WORKERS, help="decoding processes")
+    replay.set_defaults(func=_replay)
+
+    export = commands.add_parser("export", help="Write stored rows as Parquet/Arrow files per venue and month.")
+    export.add_argument("--venues", nargs="+", required=True)
+    export.add_argument("--start", required=True, help="first day (YYYY-MM-DD)")
+    export.add_argument("--end", required=True, help="last day (YYYY-MM-DD)")
+    export.add_argument("--format", choices=("parquet", "arrow"), default=config.EXPORT_FORMAT)
+    export.add_argument("--fields", help="comma-separated hourly fields (default: all)")
+    export.add_argument("--out", default=config.EXPORT_DIR, help="output directory")
+    export.set_defaults(func=_export)
+    return parser
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
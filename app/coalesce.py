@@ -0,0 +1,126 @@
+"""
+coalesce.py - Single-Flight Runs and Short-Lived Result Cache for GET /weather
+
+Dashboards tend to refresh the same venue and date range from many clients at
+once. ResultCache.run() makes identical concurrent requests share one pipeline
+run (single flight): the first request starts it and the others await the same
+task. A successful result is then kept for config.RESULT_CACHE_TTL seconds in
+a least-recently-used map of at most config.RESULT_CACHE_SIZE entries, so
+repeats within that window are answered without touching the API or the
+database. Failures are shared by the waiting requests but never cached.
+
+Everything runs on the event loop, so no locking is needed.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from app import config
+from app.metrics import RESULT_CACHE
+
+HIT, MISS, COALESCED = "hit", "miss", "coalesced"
+
+class ResultCache:
+    """
+    Single-flight coordinator plus TTL/LRU cache of results, keyed by any
+    hashable request key.
+
+    Attributes:
+        hits (int): Requests answered from the cache.
+        misses (int): Requests that started a run.
+        coalesced (int): Requests that joined a run already in flight.
+    """
+
+    def __init__(self, ttl, max_entries, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._in_flight = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, result):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (self._clock() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _run(self, key, func):
+        try:
+            result = await func()
+            self._store(key, result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def run(self, key, func):
+        """
+        Returns the result for key: cached, from the run in flight, or from
+        a new run of func.
+
+        Args:
+            key: Hashable request key.
+            func: Coroutine function without arguments that computes the result.
+
+        Returns:
+            tuple: (result, outcome) where outcome is "hit", "miss" or "coalesced".
+
+        Raises:
+            Whatever func raises, for every request sharing the run.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            outcome = HIT
+            self.hits += 1
+        else:
+            task = self._in_flight.get(key)
+            if task is None:
+                task = self._in_flight[key] = asyncio.ensure_future(self._run(key, func))
+                outcome = MISS
+                self.misses += 1
+            else:
+                outcome = COALESCED
+                self.coalesced += 1
+        RESULT_CACHE.inc(result=outcome)
+        if outcome == HIT:
+            return entry[1], outcome
+        # Shielded, so a disconnecting client does not cancel the shared run.
+        return await asyncio.shield(task), outcome
+
+    def stats(self):
+        """Returns the hit/miss/coalesced counts and the number of cached results."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+        }
+
+    def clear(self):
+        """Drops every cached result; runs in flight are unaffected."""
+        self._entries.clear()
+
+_cache = None
+
+def get_result_cache():
+    """Returns the process-wide ResultCache configured from app.config."""
+    global _cache
+    if _cache is None:
+        _cache = ResultCache(config.RESULT_CACHE_TTL, config.RESULT_CACHE_SIZE)
+    return _cache
@@ -0,0 +1,179 @@
+"""
+columns.py - Columnar Representation of Hourly Weather Data
+
+WeatherColumns keeps the Open-Meteo 'hourly' arrays as typed column arrays
+instead of one dict per hour:
+  - timestamps: array('q') of UTC epoch seconds, parsed once.
+  - values[field]: array('d') for REAL columns, array('q') for INTEGER columns.
+  - nulls[field]: bytearray null mask (1 where the API returned null or the
+    field was missing).
+
+A year of hourly data for one venue takes roughly 120 KB this way, compared
+with several MB of per-row dicts, and the loader consumes the columns directly.
+"""
+
+import itertools
+from array import array
+from datetime import datetime, timezone
+
+from app.models import HOURLY_FIELDS, INTEGER_FIELDS
+
+def parse_timestamps(times):
+    """
+    Parses Open-Meteo ISO timestamps into an array of UTC epoch seconds.
+
+    The archive API returns evenly spaced hourly timestamps, so when the last
+    timestamp equals first + (n - 1) hours and every entry matches the
+    generated hour (checked by string comparison, which is far cheaper than
+    parsing), the array is generated arithmetically. Anything else, such as
+    a gap offset by a repeated hour, is parsed element by element.
+    """
+    def epoch(ts):
+        dt = datetime.fromisoformat(ts)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp())
+
+    if not times:
+        return array("q")
+    first, last, n = epoch(times[0]), epoch(times[-1]), len(times)
+    if n == 1:
+        return array("q", [first])
+    if last - first == (n - 1) * 3600 and _is_hourly(times, first):
+        return array("q", range(first, last + 1, 3600))
+    return array("q", map(epoch, times))
+
+def _is_hourly(times, first):
+    """
+    True if times is exactly the Open-Meteo style 'YYYY-MM-DDTHH:MM' strings
+    of consecutive hours starting at epoch first.
+    """
+    if first % 3600 or len(times[0]) != 16:
+        return False
+    day_prefix = {}
+    for i, ts in enumerate(times):
+        day, seconds = divmod(first + i * 3600, 86400)
+        prefix = day_prefix.get(day)
+        if prefix is None:
+            prefix = day_prefix[day] = datetime.fromtimestamp(day * 86400, timezone.utc).strftime("%Y-%m-%dT")
+        if ts != f"{prefix}{seconds // 3600:02d}:00":
+            return False
+    return True
+
+def format_timestamp(epoch):
+    """Renders epoch seconds as an explicit-UTC timestamp literal for PostgreSQL."""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d %H:%M:%S+00")
+
+def _format_timestamps(epochs):
+    """
+    format_timestamp() for a sequence; the date part is computed once per day,
+    which matters because the loader formats every hour of a multi-year range.
+    """
+    day_prefix = {}
+    out = []
+    for epoch in epochs:
+        day, seconds = divmod(epoch, 86400)
+        prefix = day_prefix.get(day)
+        if prefix is None:
+            prefix = day_prefix[day] = format_timestamp(day * 86400)[:11]
+        hours, seconds = divmod(seconds, 3600)
+        out.append(f"{prefix}{hours:02d}:{seconds // 60:02d}:{seconds % 60:02d}+00")
+    return out
+
+class WeatherColumns:
+    """
+    Column arrays plus null masks for one venue's hourly data.
+
+    Attributes:
+        timestamps (array): UTC epoch seconds, one per hour.
+        values (dict): Field name -> array of values (0 where null).
+        nulls (dict): Field name -> bytearray null mask.
+    """
+
+    __slots__ = ("timestamps", "values", "nulls")
+
+    def __init__(self, timestamps, values, nulls):
+        self.timestamps = timestamps
+        self.values = values
+        self.nulls = nulls
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def column(self, field):
+        """Returns one field as a list with None for nulls (for tests and debugging)."""
+        values, nulls = self.values[field], self.nulls[field]
+        return [None if nulls[i] else values[i] for i in range(len(self))]
+
+    def take(self, indices):
+        """Returns a new WeatherColumns holding only the rows at indices."""
+        return WeatherColumns(
+            array("q", (self.timestamps[i] for i in indices)),
+            {f: array(v.typecode, (v[i] for i in indices)) for f, v in self.values.items()},
+            {f: bytearray(m[i] for i in indices) for f, m in self.nulls.items()},
+        )
+
+    def dedupe(self):
+        """Keeps the last row per timestamp, like the record-based loader does."""
+        last = {ts: i for i, ts in enumerate(self.timestamps)}
+        if len(last) == len(self):
+            return self
+        return self.take(sorted(last.values()))
+
+    def iter_rows(self, venue_id, batch_size=4096):
+        """
+        Yields one tuple per hour, ordered like models.WEATHER_COLUMNS.
+
+        Rows are assembled batch_size hours at a time from slices of the
+        column arrays, so no per-row dicts exist and memory stays bounded.
+        """
+        for start in range(0, len(self), batch_size):
+            stop = min(start + batch_size, len(self))
+            columns = [_format_timestamps(self.timestamps[start:stop])]
+            for field in HOURLY_FIELDS:
+                values = self.values[field][start:stop].tolist()
+                nulls = self.nulls[field]
+                if any(nulls[start:stop]):
+                    values = [None if nulls[start + i] else v for i, v in enumerate(values)]
+                columns.append(values)
+            yield from zip(itertools.repeat(venue_id), *columns)
+
+def _column(raw, n, integer):
+    """Converts one raw JSON list into (values array, null mask), padded to n."""
+    raw = raw or []
+    if len(raw) != n:
+        raw = list(raw[:n]) + [None] * (n - len(raw))
+    if None not in raw:
+        values = array("q", map(round, raw)) if integer else array("d", raw)
+        return values, bytearray(n)
+    nulls = bytearray(v is None for v in raw)
+    if integer:
+        values = array("q", (0 if v is None else round(v) for v in raw))
+    else:
+        values = array("d", (0.0 if v is None else v for v in raw))
+    return values, nulls
+
+def transform_columnar(data, consume=False):
+    """
+    Columnar counterpart of pipeline.transform().
+
+    Args:
+        data (dict): Raw JSON data returned by the API.
+        consume (bool): Remove each hourly list from data once its column
+            array is built, so the decoded lists and the arrays are never all
+            alive at the same time. Only for data the caller owns.
+
+    Returns:
+        WeatherColumns: One typed array per field plus null masks. Missing
+        fields and short arrays become nulls rather than raising IndexError.
+    """
+    hourly = data.get("hourly", {})
+    take = hourly.pop if consume else hourly.get
+    times = take("time", None) or []
+    n = len(times)
+    timestamps = parse_timestamps(times)
+    del times
+    values, nulls = {}, {}
+    for field in HOURLY_FIELDS:
+        values[field], nulls[field] = _column(take(field, None), n, field in INTEGER_FIELDS)
+    return WeatherColumns(timestamps, values, nulls)
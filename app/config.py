@@ -8,17 +8,217 @@ the hosting platform.
 """
 
 import os
+from dataclasses import asdict, dataclass
+from typing import Optional
+
 from dotenv import load_dotenv
 
 # Load environment variables from the .env file located in the project root.
+# This is the only place the .env file is read.
 load_dotenv()
 
-# Database configuration variables
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "weather")
-DB_USER = os.getenv("DB_USER", "weather_admin")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "Zr9!vB73xQm#LpN2")
-DB_SSLMODE = os.getenv("DB_SSLMODE", "require")
+# Local state (the job store, request profiles and exports by default) lives
+# under this absolute directory, never relative to the process's working directory.
+DATA_DIR = os.path.abspath(os.getenv(
+    "DATA_DIR",
+    os.path.join(os.getenv("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share"),
+                 "weather-pipeline"),
+))
+
+# Database connection settings (DB_HOST, DB_PORT, DB_NAME, DB_USER,
+# DB_PASSWORD, DB_SSLMODE) are read by database() below.
+
+# Connection pool configuration (see app.db.ConnectionPool)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# Seconds a request waits for a free connection before failing.
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections idle longer than this many seconds are pinged on checkout.
+DB_POOL_HEALTHCHECK_AFTER = float(os.getenv("DB_POOL_HEALTHCHECK_AFTER", "30"))
+
+# Open-Meteo historical archive endpoint
+OPEN_METEO_ARCHIVE_URL = os.getenv("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+
+# Archive response cache (see app.cache). Off by default; set a path (e.g.
+# .data/archive_cache.sqlite3) to enable it. An empty path disables caching.
+ARCHIVE_CACHE_PATH = os.getenv("ARCHIVE_CACHE_PATH", "")
+ARCHIVE_CACHE_MAX_BYTES = int(os.getenv("ARCHIVE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Days within this many days of today may still be revised upstream...
+ARCHIVE_CACHE_RECENT_DAYS = int(os.getenv("ARCHIVE_CACHE_RECENT_DAYS", "7"))
+# ...so they are re-fetched once older than this many seconds.
+ARCHIVE_CACHE_RECENT_TTL = float(os.getenv("ARCHIVE_CACHE_RECENT_TTL", "21600"))
+
+# Venue coordinates are snapped to grid cells of this many degrees; venues in
+# the same cell share one extraction (see app.venues).
+VENUE_GRID_RESOLUTION = float(os.getenv("VENUE_GRID_RESOLUTION", "0.1"))
+
+# Async extraction (see app.async_extract)
+# Long date ranges are split into chunks of this many days...
+EXTRACT_CHUNK_DAYS = int(os.getenv("EXTRACT_CHUNK_DAYS", "31"))
+# ...fetched with at most this many requests in flight.
+EXTRACT_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", "4"))
+# Per-request timeout in seconds (sync and async clients alike).
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "30"))
+# Retries per request for transport errors, timeouts, 429 and 5xx responses.
+EXTRACT_MAX_RETRIES = int(os.getenv("EXTRACT_MAX_RETRIES", "3"))
+# Base backoff in seconds, doubled on every retry and jittered.
+EXTRACT_BACKOFF = float(os.getenv("EXTRACT_BACKOFF", "0.5"))
+
+# Upstream policy shared by every Open-Meteo request in a process (see
+# app.upstream): token-bucket rate in requests per second (0 disables
+# limiting) and burst size. A 429 halves the rate, down to UPSTREAM_MIN_RATE,
+# and pauses requests for its Retry-After; successes restore the rate gradually.
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", "10"))
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "10"))
+UPSTREAM_MIN_RATE = float(os.getenv("UPSTREAM_MIN_RATE", "0.5"))
+# The circuit opens after this many consecutive failed attempts (0 disables
+# it), failing requests fast until one probe is let through after
+# UPSTREAM_BREAKER_RESET seconds.
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5"))
+UPSTREAM_BREAKER_RESET = float(os.getenv("UPSTREAM_BREAKER_RESET", "30"))
+
+# Streaming pipeline (see pipeline.iter_pipeline): each chunk of this many days
+# is extracted, transformed, loaded and committed before the next one...
+PIPELINE_CHUNK_DAYS = int(os.getenv("PIPELINE_CHUNK_DAYS", "92"))
+# ...and the async pipeline buffers at most this many fetched chunks.
+PIPELINE_BUFFER_CHUNKS = int(os.getenv("PIPELINE_BUFFER_CHUNKS", "1"))
+
+# Transform mode used by run_pipeline(): "columnar" keeps the hourly arrays as
+# typed column arrays (app.columns); "records" builds one dict per hour.
+TRANSFORM_MODE = os.getenv("TRANSFORM_MODE", "columnar")
+
+# JSON decoder for Open-Meteo responses: "orjson" (used when installed, falls
+# back to the stdlib otherwise) or "json" (always the stdlib).
+JSON_DECODER = os.getenv("JSON_DECODER", "orjson")
+
+# Loader configuration
+# LOAD_METHOD selects how load() writes rows: "copy" (COPY FROM STDIN),
+# "values" (batched execute_values) or "row" (one INSERT per record).
+LOAD_METHOD = os.getenv("LOAD_METHOD", "copy")
+# Number of records encoded per COPY chunk / execute_values page.
+LOAD_BATCH_SIZE = int(os.getenv("LOAD_BATCH_SIZE", "5000"))
+# Merge rows on the (venue_id, timestamp) unique index instead of plain INSERTs.
+LOAD_UPSERT = os.getenv("LOAD_UPSERT", "true").lower() in ("1", "true", "yes")
+
+# Batch backfill (see app.batch): pool size, pool type ("thread" or "process")
+# and how many jobs of the same venue may run at once.
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+BATCH_EXECUTOR = os.getenv("BATCH_EXECUTOR", "thread")
+BATCH_PER_VENUE_LIMIT = int(os.getenv("BATCH_PER_VENUE_LIMIT", "1"))
+# Merge batch jobs whose venues share a grid cell into one extraction.
+BATCH_SHARE_CELLS = os.getenv("BATCH_SHARE_CELLS", "true").lower() in ("1", "true", "yes")
+
+# Background jobs (see app.jobs): SQLite file holding job state (shared by the
+# worker processes of one host), the number of jobs executed concurrently by
+# each process, and the seconds a job stays claimed by a process that stopped
+# renewing it before another process re-runs it.
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(DATA_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# Opt-in: check each batch against the QA rules (see app.qa) before load()
+# writes it, and reject batches with violations. Off by default, so QA reports
+# problems (GET /qa, the qa CLI command) without blocking loads.
+QA_VALIDATE_ON_LOAD = os.getenv("QA_VALIDATE_ON_LOAD", "false").lower() in ("1", "true", "yes")
+
+# Refresh the weather_daily/weather_monthly rollups (see app.rollups) for the
+# days written by each load().
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Partitioning (see app.partitions and sql/schema_partitioned.sql): size of the
+# time partitions ("month" or "year") and hash buckets by venue_id within each
+# (0 = no venue sub-partitioning). Must match how the table was created.
+PARTITION_GRANULARITY = os.getenv("PARTITION_GRANULARITY", "month")
+PARTITION_VENUE_BUCKETS = int(os.getenv("PARTITION_VENUE_BUCKETS", "0"))
+
+# Incremental sync (see app.sync): days before today whose archive values may
+# still be revised; they are always re-fetched and never count as complete.
+SYNC_SETTLE_DAYS = int(os.getenv("SYNC_SETTLE_DAYS", "7"))
+
+# Read API (see app.query): default and maximum rows per page, and rows fetched
+# per round trip from the server-side cursor.
+QUERY_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", "1000"))
+QUERY_MAX_PAGE_SIZE = int(os.getenv("QUERY_MAX_PAGE_SIZE", "50000"))
+QUERY_FETCH_SIZE = int(os.getenv("QUERY_FETCH_SIZE", "2000"))
+
+# Request profiling (see app.metrics): "off", "header" (profile requests that
+# send "X-Profile: 1") or "always". Profiles are written to PROFILE_DIR, which
+# keeps at most PROFILE_MAX_FILES of them (the oldest are deleted; 0 keeps all).
+# In "always" mode only a PROFILE_SAMPLE_RATE fraction of requests is profiled.
+PROFILE_MODE = os.getenv("PROFILE_MODE", "off")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+
+# GET /weather result cache: identical concurrent requests always share one
+# pipeline run; successful results are also reused for RESULT_CACHE_TTL
+# seconds (0 disables reuse), keeping at most RESULT_CACHE_SIZE entries.
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "30"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+
+# Columnar export (see app.export): output root, default format ("parquet" or
+# "arrow"), Parquet compression codec, and rows per cursor fetch / record batch.
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(DATA_DIR, "exports"))
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "parquet")
+EXPORT_COMPRESSION = os.getenv("EXPORT_COMPRESSION", "zstd")
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "50000"))
+
+# Raw landing (see app.landing): directory where every fetched response is
+# kept gzip-compressed per venue and chunk (empty disables landing), and the
+# number of processes that decode archives during an offline replay.
+RAW_LANDING_DIR = os.getenv("RAW_LANDING_DIR", "")
+REPLAY_WORKERS = int(os.getenv("REPLAY_WORKERS", "4"))
+
+# Startup (see app.main.lifespan): open the database pool and the shared HTTP
+# client while the app starts instead of on the first request. The database
+# driver and HTTP libraries are imported on first use either way.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() in ("1", "true", "yes")
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """
+    Typed PostgreSQL connection settings (DB_HOST, DB_PORT, DB_NAME, DB_USER,
+    DB_PASSWORD, DB_SSLMODE). Unset values are left to libpq's defaults.
+    """
+    host: Optional[str]
+    port: Optional[str]
+    dbname: Optional[str]
+    user: Optional[str]
+    password: Optional[str]
+    sslmode: str = "require"
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            host=os.getenv("DB_HOST"),
+            port=os.getenv("DB_PORT"),
+            dbname=os.getenv("DB_NAME"),
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASSWORD"),
+            sslmode=os.getenv("DB_SSLMODE", "require"),
+        )
+
+    def connect_kwargs(self):
+        """Returns the settings as psycopg2.connect() keyword arguments."""
+        return asdict(self)
+
+_database = None
+
+def database():
+    """
+    Returns the DatabaseSettings, read from the environment on first use.
+
+    Call reset_database() after changing DB_* at runtime (tests, benchmarks);
+    app.db.close_pool() does so as well.
+    """
+    global _database
+    if _database is None:
+        _database = DatabaseSettings.from_env()
+    return _database
+
+def reset_database():
+    """Forgets the cached DatabaseSettings so the next database() re-reads DB_*."""
+    global _database
+    _database = None
 
 # Additional configuration variables can be added here as needed.
@@ -1,39 +1,316 @@
 """
 db.py - Database Connection Module
 
-This module is responsible for creating and returning a connection to the
-PostgreSQL database using psycopg2. The connection parameters are loaded
-from environment variables for security and portability.
+This module is responsible for creating connections to the PostgreSQL
+database using psycopg2. The connection parameters are loaded from
+environment variables for security and portability.
+
+Connections are normally borrowed from a process-wide ConnectionPool
+(see connection()), so the TLS and authentication handshake with the
+server is paid once per pooled connection rather than once per load.
 """
 
 import os
-import psycopg2
-from dotenv import load_dotenv
+import threading
+import time
+from contextlib import contextmanager
+
+from app import config
+from app.metrics import DB_ROUND_TRIPS, POOL_WAIT_SECONDS
+
+_cursor_class = None
+
+def counting_cursor():
+    """
+    Returns the cursor class that counts statements and COPYs in
+    weather_db_round_trips_total.
+
+    The class is defined on first use, so importing this module does not
+    import psycopg2; the driver is loaded when the first connection opens.
+    """
+    global _cursor_class
+    if _cursor_class is None:
+        import psycopg2.extensions
+
+        class CountingCursor(psycopg2.extensions.cursor):
+            def execute(self, query, vars=None):
+                DB_ROUND_TRIPS.inc()
+                return super().execute(query, vars)
+
+            def executemany(self, query, vars_list):
+                DB_ROUND_TRIPS.inc()
+                return super().executemany(query, vars_list)
+
+            def copy_expert(self, sql, file, size=8192):
+                DB_ROUND_TRIPS.inc()
+                return super().copy_expert(sql, file, size)
+
+        _cursor_class = CountingCursor
+    return _cursor_class
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available within the timeout."""
 
-# Load environment variables from the .env file in the project root.
-load_dotenv()
+def _connect_kwargs():
+    """
+    Connection parameters come from config.database() (DB_HOST, DB_PORT,
+    DB_NAME, DB_USER, DB_PASSWORD and DB_SSLMODE, default require), which
+    reads the environment once.
+    """
+    return {**config.database().connect_kwargs(), "cursor_factory": counting_cursor()}
 
 def get_db_connection():
     """
-    Establish a connection to the PostgreSQL database.
+    Establish a new, unpooled connection to the PostgreSQL database.
 
-    Connection parameters are retrieved from environment variables:
-      - DB_HOST: The PostgreSQL server host.
-      - DB_PORT: Port number, typically 5432.
-      - DB_NAME: The name of the database to connect to.
-      - DB_USER: Database username.
-      - DB_PASSWORD: Database password.
-      - DB_SSLMODE: SSL mode for secure connection (default: require).
+    See _connect_kwargs() for the settings that are used.
 
     Returns:
         psycopg2.extensions.connection: A new database connection.
     """
-    conn = psycopg2.connect(
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-        dbname=os.getenv("DB_NAME"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        sslmode=os.getenv("DB_SSLMODE", "require")
-    )
-    return conn
+    import psycopg2
+
+    return psycopg2.connect(**_connect_kwargs())
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    Unlike psycopg2.pool.ThreadedConnectionPool, getconn() blocks until a
+    connection is free (up to a timeout) instead of failing immediately,
+    connections that sat idle are health-checked before they are handed out,
+    and wait times are tracked for stats().
+
+    Args:
+        minconn (int): Connections opened eagerly and kept when idle.
+        maxconn (int): Upper bound on open connections.
+        timeout (float): Seconds getconn() waits for a free connection.
+        healthcheck_after (float): Idle seconds after which a connection is
+            pinged with 'SELECT 1' on checkout; 0 checks on every checkout.
+        connect (callable, optional): Factory returning new connections;
+            defaults to get_db_connection.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, healthcheck_after=30.0, connect=None):
+        if not 0 <= minconn <= maxconn or maxconn < 1:
+            raise ValueError(f"Invalid pool size: min={minconn}, max={maxconn}")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_after = healthcheck_after
+        self._connect = connect or get_db_connection
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, returned_at) pairs, most recent last
+        self._in_use = set()
+        self._opening = 0
+        self._waiting = 0
+        self._closed = False
+        self._acquired = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _healthy(self, conn, idle_since):
+        import psycopg2
+
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.healthcheck_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        import psycopg2
+
+        self._discarded += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout=None):
+        """
+        Borrows a connection, opening a new one if the pool is below maxconn.
+
+        Raises:
+            PoolTimeout: If no connection is free within the timeout.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed")
+                    if self._idle or self._size() < self.maxconn:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"No database connection available within {timeout:.1f}s "
+                            f"(max {self.maxconn} in use)"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - started
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            POOL_WAIT_SECONDS.observe(waited)
+            candidate = self._idle.pop() if self._idle else None
+            self._opening += 1
+
+        # Health checks and new connections happen outside the lock.
+        conn = None
+        try:
+            if candidate is not None:
+                if self._healthy(*candidate):
+                    conn = candidate[0]
+                else:
+                    with self._cond:
+                        self._discard(candidate[0])
+            if conn is None:
+                conn = self._connect()
+        finally:
+            with self._cond:
+                self._opening -= 1
+                if conn is not None:
+                    self._in_use.add(conn)
+                else:
+                    self._cond.notify()
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Returns a borrowed connection, rolling back any open transaction.
+        Broken connections (or discard=True) are closed instead of kept.
+        """
+        import psycopg2.extensions
+
+        if not conn.closed and not discard:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+        with self._cond:
+            self._in_use.discard(conn)
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Closes idle connections and refuses new checkouts."""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                conn.close()
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self):
+        """
+        Returns a snapshot of pool usage: open/idle/in-use connections,
+        callers currently waiting, and checkout wait times in seconds.
+        """
+        with self._cond:
+            return {
+                "size": self._size(),
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_time_total": round(self._wait_total, 6),
+                "wait_time_max": round(self._wait_max, 6),
+                "wait_time_avg": round(self._wait_total / self._acquired, 6) if self._acquired else 0.0,
+            }
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    Returns the process-wide ConnectionPool, creating it on first use.
+
+    The pool is recreated after a fork so worker processes never share
+    sockets with their parent.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                config.DB_POOL_MIN_SIZE,
+                config.DB_POOL_MAX_SIZE,
+                config.DB_POOL_TIMEOUT,
+                config.DB_POOL_HEALTHCHECK_AFTER,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+def close_pool():
+    """
+    Closes the process-wide pool, if one was created. The next pool re-reads
+    the DB_* settings.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        config.reset_database()
+
+def pool_stats():
+    """Returns stats() of the process-wide pool, or None before first use."""
+    pool = _pool
+    return pool.stats() if pool is not None and _pool_pid == os.getpid() else None
+
+@contextmanager
+def connection():
+    """
+    Borrows a connection from the process-wide pool for a with-block.
+
+    The caller is responsible for committing; an exception rolls back the
+    transaction before the connection is returned to the pool.
+    """
+    import psycopg2
+
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    except BaseException:
+        discard = False
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            discard = True
+        pool.putconn(conn, discard=discard)
+        raise
+    else:
+        pool.putconn(conn)
@@ -0,0 +1,71 @@
+"""
+decode.py - Fast Decoding of Open-Meteo Responses
+
+Response bodies are decoded with orjson when it is installed and with the
+stdlib json module otherwise (config.JSON_DECODER = "json" forces the
+stdlib). decode_columns() decodes a response body in full and then converts
+it to WeatherColumns field by field. Each decoded hourly list is released as
+soon as its typed column array is built, and the ISO timestamps become one
+epoch array. Peak memory is still that of the fully decoded response, but
+the decoded lists and the column arrays are never all alive together, and
+only the arrays outlive the call. Responses that are already decoded
+(assembled from the archive cache or merged by the async extractor) skip the
+decode step.
+"""
+
+import json
+
+from app import config
+from app.columns import transform_columnar
+
+try:
+    import orjson
+except ImportError:  # Optional dependency; the stdlib decoder is used instead.
+    orjson = None
+
+def backend():
+    """Returns the name of the decoder in use: "orjson" or "json"."""
+    if orjson is None or config.JSON_DECODER == "json":
+        return "json"
+    return "orjson"
+
+def loads(content):
+    """
+    Decodes a JSON document.
+
+    Args:
+        content (bytes | str): The raw response body.
+
+    Returns:
+        The decoded object.
+    """
+    if backend() == "orjson":
+        return orjson.loads(content)
+    return json.loads(content)
+
+def dumps(obj):
+    """
+    Encodes an object as compact JSON with the decoder's library.
+
+    Returns:
+        bytes: The encoded document.
+    """
+    if backend() == "orjson":
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+def decode_columns(content):
+    """
+    Decodes an Open-Meteo response body, then converts it to WeatherColumns
+    with transform_columnar(consume=True), releasing each hourly list early.
+
+    Args:
+        content (bytes | str | dict): The raw response body, or a response
+            that is already decoded. A dict is consumed: its hourly lists are
+            removed as the column arrays are built.
+
+    Returns:
+        WeatherColumns: The hourly data, as from transform_columnar().
+    """
+    data = content if isinstance(content, dict) else loads(content)
+    return transform_columnar(data, consume=True)
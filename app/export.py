@@ -0,0 +1,194 @@
+"""
+export.py - Columnar Export of weather_data (Parquet / Arrow IPC)
+
+Writes a venue/time-range selection of weather_data as typed columnar files,
+one per venue and month, in a Hive-style layout that Arrow, DuckDB, Polars
+and Spark discover as partitions:
+
+    {directory}/venue_id={venue}/month={YYYY-MM}/data.parquet   (or data.arrow)
+
+Rows are streamed from a server-side (named) cursor in batches of
+config.EXPORT_BATCH_ROWS and appended to the open file batch by batch, so
+memory use does not depend on the size of the selection. Column types follow
+sql/schema.sql: REAL -> float32, INTEGER -> int32, TIMESTAMPTZ ->
+timestamp[us, UTC]. Arrow IPC files are written uncompressed so they can be
+memory-mapped; Parquet uses config.EXPORT_COMPRESSION.
+
+pyarrow is imported on first use.
+"""
+
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from app import config
+from app.cache import as_date
+from app.db import connection
+from app.models import HOURLY_FIELDS, INTEGER_FIELDS
+from app.query import window_bounds
+
+FORMATS = {"parquet": "data.parquet", "arrow": "data.arrow"}
+
+def schema(fields=HOURLY_FIELDS):
+    """Returns the Arrow schema of an export file (venue_id is in the path)."""
+    import pyarrow as pa
+
+    return pa.schema(
+        [pa.field("timestamp", pa.timestamp("us", tz="UTC"), nullable=False)]
+        + [pa.field(f, pa.int32() if f in INTEGER_FIELDS else pa.float32()) for f in fields]
+    )
+
+def partition_path(directory, venue_id, month, fmt):
+    """Returns the file path of one venue/month partition."""
+    return os.path.join(directory, f"venue_id={quote(venue_id, safe='')}", f"month={month}", FORMATS[fmt])
+
+def _month_bounds(epoch_us):
+    """Returns ('YYYY-MM', upper bound in epoch microseconds) of the month containing epoch_us."""
+    day = datetime.fromtimestamp(epoch_us // 1_000_000, timezone.utc)
+    upper = datetime(day.year + day.month // 12, day.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return f"{day.year:04d}-{day.month:02d}", int(upper.timestamp()) * 1_000_000
+
+class _PartitionWriter:
+    """
+    Appends record batches to one partition file. The file is written under
+    a temporary name and only moved into place by close().
+    """
+
+    def __init__(self, directory, key, arrow_schema, fmt):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.key = key
+        self.path = partition_path(directory, *key, fmt)
+        self.rows = 0
+        self._tmp = f"{self.path}.tmp"
+        self._sink = None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(self._tmp, arrow_schema, compression=config.EXPORT_COMPRESSION)
+        else:
+            self._sink = pa.OSFile(self._tmp, "wb")
+            self._writer = pa.ipc.new_file(self._sink, arrow_schema)
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def _finish(self):
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+    def close(self):
+        """Completes the file and returns its manifest entry."""
+        self._finish()
+        os.replace(self._tmp, self.path)
+        return {
+            "venue_id": self.key[0], "month": self.key[1], "path": self.path,
+            "rows": self.rows, "bytes": os.path.getsize(self.path),
+        }
+
+    def abort(self):
+        """Discards the partially written file; an existing partition is kept."""
+        try:
+            self._finish()
+        finally:
+            if os.path.exists(self._tmp):
+                os.remove(self._tmp)
+
+def _batches(rows, arrow_schema, batch_rows):
+    """
+    Groups (venue_id, epoch_us, value, ...) rows ordered by venue and time
+    into ((venue_id, month), RecordBatch) pairs that never straddle a
+    partition.
+    """
+    import pyarrow as pa
+
+    def batch(pending):
+        columns = list(zip(*pending))[1:]  # venue_id is encoded in the path
+        arrays = [pa.array(col, type=arrow_schema.field(i).type) for i, col in enumerate(columns)]
+        return pa.RecordBatch.from_arrays(arrays, schema=arrow_schema)
+
+    key, upper, pending = None, None, []
+    for row in rows:
+        if key is None or row[0] != key[0] or row[1] >= upper:
+            if pending:
+                yield key, batch(pending)
+                pending = []
+            month, upper = _month_bounds(row[1])
+            key = (row[0], month)
+        pending.append(row)
+        if len(pending) >= batch_rows:
+            yield key, batch(pending)
+            pending = []
+    if pending:
+        yield key, batch(pending)
+
+def iter_export_rows(venue_ids, start_date, end_date, fields=HOURLY_FIELDS):
+    """
+    Yields (venue_id, epoch microseconds, value, ...) for the selection,
+    ordered by venue and timestamp, from a server-side cursor.
+    """
+    from psycopg2 import sql
+
+    lower, upper = window_bounds(as_date(start_date), as_date(end_date))
+    query = sql.SQL(
+        "SELECT venue_id, (EXTRACT(EPOCH FROM timestamp) * 1000000)::BIGINT, {columns} FROM weather_data "
+        "WHERE venue_id = ANY(%(venue_ids)s) AND timestamp >= %(lower)s AND timestamp < %(upper)s "
+        "ORDER BY venue_id, timestamp"
+    ).format(columns=sql.SQL(", ").join(sql.Identifier(f) for f in fields))
+    with connection() as conn:
+        # Named cursors live inside a transaction; finish with a rollback so
+        # the pooled connection goes back idle.
+        with conn.cursor(name="weather_export") as cur:
+            cur.itersize = config.EXPORT_BATCH_ROWS
+            cur.execute(query, {"venue_ids": list(venue_ids), "lower": lower, "upper": upper})
+            yield from cur
+        conn.rollback()
+
+def export_weather(venue_ids, start_date, end_date, directory=None, fmt=None, fields=HOURLY_FIELDS, rows=None):
+    """
+    Exports stored rows as one columnar file per venue and month.
+
+    Partitions that already exist are replaced atomically, so re-running an
+    export for the same window is safe.
+
+    Args:
+        venue_ids (list): Venues to export.
+        start_date (date | str): First day (UTC).
+        end_date (date | str): Last day, inclusive (UTC).
+        directory (str, optional): Output root; defaults to config.EXPORT_DIR.
+        fmt (str, optional): "parquet" or "arrow"; defaults to config.EXPORT_FORMAT.
+        fields (tuple): Hourly fields to include after the timestamp.
+        rows (iterable, optional): Row source; defaults to iter_export_rows().
+
+    Returns:
+        list: One {"venue_id", "month", "path", "rows", "bytes"} per file written.
+
+    Raises:
+        ValueError: For an unknown format.
+    """
+    directory = directory or config.EXPORT_DIR
+    fmt = fmt or config.EXPORT_FORMAT
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {tuple(FORMATS)}")
+    if rows is None:
+        rows = iter_export_rows(venue_ids, start_date, end_date, fields)
+    arrow_schema = schema(fields)
+    files, writer = [], None
+    try:
+        for key, batch in _batches(rows, arrow_schema, config.EXPORT_BATCH_ROWS):
+            if writer is not None and key != writer.key:
+                files.append(writer.close())
+                writer = None
+            if writer is None:
+                writer = _PartitionWriter(directory, key, arrow_schema, fmt)
+            writer.write(batch)
+        if writer is not None:
+            files.append(writer.close())
+            writer = None
+    finally:
+        # Only reached with an open writer when the export failed.
+        if writer is not None:
+            writer.abort()
+    return files
@@ -0,0 +1,333 @@
+"""
+jobs.py - Background Pipeline Jobs
+
+GET /weather?background=true enqueues the pipeline run instead of holding the
+HTTP request open. A local thread pool (config.JOB_WORKERS) executes the jobs;
+their state and progress (chunks fetched, rows loaded) and final result are
+kept in a SQLite file (config.JOB_STORE_PATH), so they survive restarts and
+can be polled via GET /jobs/{job_id}.
+
+An identical request (same venue, date range and incremental flag) that arrives while a job is
+still queued or running is coalesced onto that job instead of starting a
+second run.
+
+Several worker processes (uvicorn --workers, gunicorn) may share one store
+on the same host. Each JobQueue owns the jobs it accepts and renews a lease
+on them (config.JOB_LEASE_SECONDS) from a heartbeat thread while it is
+alive. Only jobs whose lease has expired, because their process stopped or
+crashed, are claimed by recover(), which runs on startup and on every
+heartbeat. A claim is made in one write transaction, so one process takes
+each orphan. The loader upserts, so re-running an orphan is safe.
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app import config
+from app.async_extract import split_date_range
+from app.pipeline import PipelineError, run_pipeline
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    venue_id TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    incremental INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    chunks_total INTEGER NOT NULL,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    rows_loaded INTEGER NOT NULL DEFAULT 0,
+    inserted INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    unchanged INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_active ON jobs (venue_id, start_date, end_date, status);
+"""
+
+_ADDED_COLUMNS = (
+    ("incremental", "INTEGER NOT NULL DEFAULT 0"),
+    ("owner", "TEXT"),
+    ("lease_until", "REAL"),
+)
+
+def _job(row):
+    """Converts a jobs row to a dict with a boolean 'incremental'."""
+    job = dict(row)
+    job["incremental"] = bool(job["incremental"])
+    return job
+
+class JobStore:
+    """
+    SQLite persistence for job state.
+
+    Args:
+        path (str): SQLite database file (created if missing).
+    """
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        # Stores created before incremental jobs and job leases.
+        for name, definition in _ADDED_COLUMNS:
+            if name not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    def create_or_get_active(self, venue_id, start_date, end_date, chunks_total, incremental=False,
+                             owner=None, lease_until=None):
+        """
+        Returns (job, created): the active job for the same request (venue,
+        range and incremental flag) if there is one, otherwise a newly
+        inserted queued job held by owner until lease_until.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE venue_id = ? AND start_date = ? AND end_date = ? "
+                "AND incremental = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (venue_id, start_date, end_date, int(incremental), *ACTIVE_STATUSES),
+            ).fetchone()
+            if row is not None:
+                return _job(row), False
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (job_id, venue_id, start_date, end_date, incremental, status, chunks_total, "
+                "created_at, owner, lease_until) VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, venue_id, start_date, end_date, int(incremental), chunks_total, time.time(),
+                 owner, lease_until),
+            )
+        return self.get(job_id), True
+
+    def get(self, job_id):
+        """Returns the job as a dict, or None if it does not exist."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _job(row) if row is not None else None
+
+    def list(self, status=None, limit=50):
+        """Returns the most recent jobs, optionally filtered by status."""
+        query = "SELECT * FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [_job(row) for row in self._db.execute(query, params).fetchall()]
+
+    def active(self):
+        """Returns queued and running jobs, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at", ACTIVE_STATUSES
+            ).fetchall()
+        return [_job(row) for row in rows]
+
+    def claim_orphans(self, owner, lease_until, now=None):
+        """
+        Re-queues the active jobs whose lease has expired (or that have no
+        owner) for owner, in one write transaction.
+
+        Returns:
+            list: The claimed job ids, oldest first.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                job_ids = [row["job_id"] for row in self._db.execute(
+                    "SELECT job_id FROM jobs WHERE status IN (?, ?) "
+                    "AND (owner IS NULL OR lease_until IS NULL OR lease_until < ?) ORDER BY created_at",
+                    (*ACTIVE_STATUSES, now),
+                )]
+                self._db.executemany(
+                    "UPDATE jobs SET status = 'queued', started_at = NULL, chunks_done = 0, rows_loaded = 0, "
+                    "inserted = 0, updated = 0, unchanged = 0, owner = ?, lease_until = ? WHERE job_id = ?",
+                    [(owner, lease_until, job_id) for job_id in job_ids],
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return job_ids
+
+    def renew(self, owner, lease_until):
+        """Extends the lease on owner's active jobs."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN (?, ?)",
+                (lease_until, owner, *ACTIVE_STATUSES),
+            )
+
+    def start(self, job_id, owner):
+        """Marks owner's queued job as running; False if another process has claimed it since."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? "
+                "WHERE job_id = ? AND owner = ? AND status = 'queued'",
+                (time.time(), job_id, owner),
+            )
+        return cursor.rowcount == 1
+
+    def update(self, job_id, **fields):
+        """Sets the given columns of one job."""
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def add_progress(self, job_id, result):
+        """Adds one committed chunk's LoadResult to the job's counters."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET chunks_done = chunks_done + 1, rows_loaded = rows_loaded + ?, "
+                "inserted = inserted + ?, updated = updated + ?, unchanged = unchanged + ? "
+                "WHERE job_id = ?",
+                (result.rows_loaded, result.inserted, result.updated, result.unchanged, job_id),
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class JobQueue:
+    """
+    Runs pipeline jobs on a local thread pool and records them in a JobStore.
+
+    Args:
+        store (JobStore): Where job state is persisted.
+        workers (int): Number of jobs executed concurrently.
+        runner (callable, optional): run_pipeline-compatible function that
+            accepts an on_chunk callback.
+        lease (float, optional): Seconds a job stays claimed without a
+            heartbeat; defaults to config.JOB_LEASE_SECONDS.
+    """
+
+    def __init__(self, store, workers, runner=run_pipeline, lease=None):
+        self.store = store
+        self.runner = runner
+        self.lease = lease or config.JOB_LEASE_SECONDS
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline-job")
+        self._submit_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(target=self._beat, name="pipeline-job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _lease_until(self):
+        return time.time() + self.lease
+
+    def _beat(self):
+        """Renews this queue's leases and adopts jobs orphaned by other processes."""
+        while not self._stopped.wait(self.lease / 3):
+            try:
+                self.store.renew(self.owner, self._lease_until())
+                adopted = self.recover()
+            except Exception as e:
+                logger.warning(f"Job heartbeat failed: {e}")
+                continue
+            if adopted:
+                logger.info(f"Adopted {adopted} orphaned background jobs")
+
+    def submit(self, venue_id, start_date, end_date, incremental=False):
+        """
+        Enqueues a pipeline run, or joins the identical one already in flight.
+
+        Args:
+            incremental (bool): Run with run_pipeline(..., incremental=True);
+                incremental and full runs of one range are never coalesced.
+
+        Returns:
+            tuple: (job dict, coalesced flag).
+        """
+        start_date, end_date = str(start_date), str(end_date)
+        chunks_total = len(split_date_range(start_date, end_date, config.PIPELINE_CHUNK_DAYS))
+        with self._submit_lock:
+            job, created = self.store.create_or_get_active(
+                venue_id, start_date, end_date, chunks_total, incremental, self.owner, self._lease_until()
+            )
+            if created:
+                self._executor.submit(self._run, job["job_id"])
+        return job, not created
+
+    def recover(self):
+        """
+        Claims and re-queues the jobs whose owner stopped renewing its lease.
+        Jobs held by live processes, including this one, are left alone.
+
+        Returns:
+            int: The number of jobs claimed.
+        """
+        job_ids = self.store.claim_orphans(self.owner, self._lease_until())
+        for job_id in job_ids:
+            self._executor.submit(self._run, job_id)
+        return len(job_ids)
+
+    def _run(self, job_id):
+        if not self.store.start(job_id, self.owner):
+            return  # claimed by another process after our lease lapsed
+        job = self.store.get(job_id)
+        options = {"incremental": True} if job["incremental"] else {}
+        try:
+            self.runner(
+                job["venue_id"], job["start_date"], job["end_date"],
+                on_chunk=lambda first, last, result: self.store.add_progress(job_id, result),
+                **options,
+            )
+        except PipelineError as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self.store.update(job_id, status="failed", error=str(e), finished_at=time.time())
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            self.store.update(job_id, status="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+        else:
+            self.store.update(job_id, status="succeeded", finished_at=time.time())
+
+    def shutdown(self, wait=False):
+        """
+        Stops the heartbeat and the workers. Unfinished jobs are claimed by
+        another process once their lease expires.
+        """
+        self._stopped.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Returns the process-wide JobQueue, creating it (and its store) on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(JobStore(config.JOB_STORE_PATH), config.JOB_WORKERS)
+        return _queue
+
+def close_job_queue():
+    """Shuts down the process-wide JobQueue, if one was created."""
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown()
+            _queue.store.close()
+        _queue = None
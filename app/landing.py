@@ -0,0 +1,115 @@
+"""
+landing.py - Raw Landing of Open-Meteo Responses
+
+When config.RAW_LANDING_DIR is set, the pipeline saves every response it
+fetches, gzip-compressed and byte for byte, before transforming it:
+
+    {RAW_LANDING_DIR}/venue_id={venue}/{first_day}_{last_day}.json.gz
+
+A shared run (several venues in one grid cell) writes the file once and
+hard-links it for the other venues. pipeline.run_pipeline(..., replay=True)
+rebuilds weather_data from these archives without touching the network, so
+transform fixes and schema changes can be backfilled at local disk speed.
+"""
+
+import gzip
+import os
+import re
+import shutil
+from datetime import date
+from urllib.parse import quote
+
+from app import config
+from app.cache import as_date
+from app.decode import decode_columns
+
+_NAME_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})\.json\.gz$")
+
+class RawLanding:
+    """
+    Directory of landed responses, one gzip file per venue and date chunk.
+
+    Args:
+        root (str): Landing directory (created on first write).
+        compresslevel (int): gzip level; 6 trades little size for speed.
+    """
+
+    def __init__(self, root, compresslevel=6):
+        self.root = root
+        self.compresslevel = compresslevel
+
+    def venue_dir(self, venue_id):
+        return os.path.join(self.root, f"venue_id={quote(venue_id, safe='')}")
+
+    def path(self, venue_id, first, last):
+        """Returns the archive path of one venue and chunk."""
+        return os.path.join(self.venue_dir(venue_id), f"{as_date(first)}_{as_date(last)}.json.gz")
+
+    def put(self, venue_ids, first, last, content):
+        """
+        Lands one response for every venue it was fetched for.
+
+        Args:
+            venue_ids (list): Venues sharing the response.
+            first, last (date): The chunk's inclusive day range.
+            content (bytes): The raw response body.
+
+        Returns:
+            list: The archive paths written.
+        """
+        compressed = gzip.compress(content, compresslevel=self.compresslevel)
+        paths = []
+        for venue_id in venue_ids:
+            path = self.path(venue_id, first, last)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            if paths:
+                try:
+                    os.link(paths[0], tmp)
+                except OSError:
+                    shutil.copyfile(paths[0], tmp)
+            else:
+                with open(tmp, "wb") as f:
+                    f.write(compressed)
+            os.replace(tmp, path)
+            paths.append(path)
+        return paths
+
+    def list(self, venue_id, start_date=None, end_date=None):
+        """
+        Returns the venue's archives overlapping [start_date, end_date].
+
+        Returns:
+            list: (first_day, last_day, path) ordered by first day, then by
+            landing time, so a re-fetched chunk is replayed after the older one.
+        """
+        directory = self.venue_dir(venue_id)
+        if not os.path.isdir(directory):
+            return []
+        start = as_date(start_date) if start_date else date.min
+        end = as_date(end_date) if end_date else date.max
+        archives = []
+        for entry in os.scandir(directory):
+            match = _NAME_RE.match(entry.name)
+            if not match:
+                continue
+            first, last = date.fromisoformat(match[1]), date.fromisoformat(match[2])
+            if first <= end and last >= start:
+                archives.append((first, entry.stat().st_mtime, last, entry.path))
+        archives.sort()
+        return [(first, last, path) for first, _, last, path in archives]
+
+def read_columns(path):
+    """
+    Decompresses and decodes one archive into WeatherColumns.
+
+    A module-level function so process pools can run it.
+    """
+    with open(path, "rb") as f:
+        return decode_columns(gzip.decompress(f.read()))
+
+def get_landing():
+    """Returns a RawLanding for config.RAW_LANDING_DIR, or None when landing is disabled."""
+    if not config.RAW_LANDING_DIR:
+        return None
+    return RawLanding(config.RAW_LANDING_DIR)
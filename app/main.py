@@ -6,52 +6,621 @@ triggers the ETL pipeline. The pipeline runner is provided via a FastAPI
 dependency (get_pipeline_runner), making it easy to override in tests.
 """
 
+import inspect
 import logging
-from fastapi import FastAPI, HTTPException, Depends
-from datetime import date
-from app.pipeline import run_pipeline as default_run_pipeline
+import math
+import os
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager, nullcontext
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from datetime import date, datetime
+from typing import Literal
+from app import config, metrics
+from app.async_extract import close_async_client, get_async_client
+from app.batch import BatchJob, run_batch
+from app.coalesce import get_result_cache
+from app.db import close_pool, get_pool, pool_stats
+from app.export import export_weather
+from app.jobs import close_job_queue, get_job_queue
+from app.models import BatchRequest, ExportRequest, VenueRequest
+from app.qa import run_qa
+from app.query import iter_weather, parse_fields, stream_page_json
+from app.rollups import aggregates
+from app.upstream import UpstreamError, close_session, upstream_stats
+from app.pipeline import (
+    LoadResult, PipelineError, run_pipeline, run_pipeline_async as default_run_pipeline, run_pipeline_shared,
+    sync_venue
+)
+from app.venues import UnknownVenueError, Venue, get_registry
 
 
 # Configure root logger to output INFO+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Weather Pipeline API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Application lifespan: opens the database pool and the shared HTTP client
+    (unless STARTUP_WARMUP is off), loads the venue registry and re-queues
+    unfinished background jobs on startup, and stops the job workers and
+    closes the shared HTTP clients and the database connection pool on shutdown.
+    """
+    if config.STARTUP_WARMUP:
+        started = time.perf_counter()
+        get_async_client()
+        try:
+            await run_in_threadpool(get_pool)
+        except Exception as e:
+            logger.warning(f"Could not open the database pool: {e}")
+        logger.info(f"Warm-up took {time.perf_counter() - started:.3f}s")
+    try:
+        count = await run_in_threadpool(get_registry().load)
+        logger.info(f"Loaded {count} venues")
+    except Exception as e:
+        # Venues are then looked up individually on first use.
+        logger.warning(f"Could not preload venue registry: {e}")
+    recovered = get_job_queue().recover()
+    if recovered:
+        logger.info(f"Re-queued {recovered} unfinished background jobs")
+    yield
+    close_job_queue()
+    await close_async_client()
+    close_session()
+    close_pool()
+
+app = FastAPI(title="Weather Pipeline API", version="1.0.0", lifespan=lifespan)
+
+def _should_profile(request):
+    if config.PROFILE_MODE == "always":
+        return random.random() < config.PROFILE_SAMPLE_RATE
+    return config.PROFILE_MODE == "header" and request.headers.get("X-Profile", "").lower() in ("1", "true")
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """
+    Records request durations in weather_http_request_seconds and, when
+    profiling is enabled for the request, profiles its pipeline stages,
+    writes the profile to PROFILE_DIR (keeping at most PROFILE_MAX_FILES) and
+    returns its id as X-Profile-Id.
+    """
+    started = time.perf_counter()
+    profile_context = metrics.profiling() if _should_profile(request) else nullcontext()
+    with profile_context as profile:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.HTTP_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method, route=getattr(route, "path", "unmatched"), status=response.status_code
+    )
+    if profile is not None:
+        profile_id = uuid.uuid4().hex
+        path = await run_in_threadpool(
+            metrics.save_profile, profile, config.PROFILE_DIR, profile_id, config.PROFILE_MAX_FILES
+        )
+        if path is not None:
+            logger.info(f"Profile {path} for {request.method} {request.url.path}:\n{profile.summary()}")
+            response.headers["X-Profile-Id"] = profile_id
+    return response
+
+def _failure(e, detail):
+    """
+    Returns the HTTPException for a failed pipeline run: 503 when Open-Meteo
+    was unavailable (e or an error it wraps is an UpstreamError), with a
+    Retry-After header when the upstream gave one, otherwise 500.
+    """
+    upstream = e
+    while upstream is not None and not isinstance(upstream, UpstreamError):
+        upstream = upstream.__cause__
+    if upstream is None:
+        return HTTPException(status_code=500, detail=detail)
+    headers = None
+    if upstream.retry_after is not None:
+        headers = {"Retry-After": str(math.ceil(upstream.retry_after))}
+    return HTTPException(status_code=503, detail=detail, headers=headers)
 
 def get_pipeline_runner():
     """
     Dependency that returns the pipeline runner function.
     Override this in tests via app.dependency_overrides.
+
+    The runner may be a coroutine function (awaited on the event loop) or a
+    plain function (run in the threadpool).
     """
     return default_run_pipeline
 
+def get_venue_registry():
+    """
+    Dependency that returns the venue registry.
+    Override this in tests via app.dependency_overrides.
+    """
+    return get_registry()
+
+def get_jobs():
+    """
+    Dependency that returns the background job queue.
+    Override this in tests via app.dependency_overrides.
+    """
+    return get_job_queue()
+
+def get_job_submitter():
+    """
+    Dependency that returns the function enqueueing a background run. The job
+    queue (and its store) is only opened when a run is actually submitted, so
+    synchronous /weather requests never touch it.
+    Override this in tests via app.dependency_overrides.
+    """
+    return lambda *args: get_job_queue().submit(*args)
+
+def get_results():
+    """
+    Dependency that returns the GET /weather single-flight result cache.
+    Override this in tests via app.dependency_overrides.
+    """
+    return get_result_cache()
+
 @app.get(
     "/weather",
     summary="Trigger Weather Data Pipeline",
     description="Fetches historical weather data and stores it in the database."
 )
-def get_weather(
+async def get_weather(
     venue_id: str,
     start_date: date,
     end_date: date,
-    run_pipeline=Depends(get_pipeline_runner)
+    background: bool = False,
+    incremental: bool = False,
+    run_pipeline=Depends(get_pipeline_runner),
+    registry=Depends(get_venue_registry),
+    submit_job=Depends(get_job_submitter),
+    results=Depends(get_results)
 ):
     """
     Endpoint: GET /weather
     - venue_id: Unique identifier for the venue.
     - start_date: Start date for data (YYYY-MM-DD).
     - end_date: End date for data (YYYY-MM-DD).
+    - background: If true, enqueue the run and return immediately.
+    - incremental: If true, only fetch the days not yet stored for the venue.
 
     Returns:
-        JSON response with 'status' and 'rows_loaded'.
-        Raises HTTPException(500) on errors.
+        JSON response with 'status' and 'rows_loaded', plus the 'inserted',
+        'updated' and 'unchanged' row counts when the runner reports them.
+        Identical concurrent requests share one run, and successful results
+        are reused for RESULT_CACHE_TTL seconds; X-Cache says whether this
+        response was a HIT, a MISS or COALESCED onto a run in flight, and
+        X-Cache-Hits / X-Cache-Misses carry the cache's running counts.
+        With background=true, HTTP 202 with the 'job_id' to poll at
+        /jobs/{job_id} and whether the request was 'coalesced' onto an
+        identical job already in flight.
+        Raises HTTPException(404) for unregistered venues,
+        HTTPException(503) when Open-Meteo is unavailable (rate limited,
+        failing or behind an open circuit) and HTTPException(500) on other
+        errors.
     """
     logger.info(f"GET /weather?venue_id={venue_id}&start_date={start_date}&end_date={end_date}")
+    if background:
+        try:
+            # Reject unknown venues now rather than in a failed job.
+            await run_in_threadpool(registry.get, venue_id)
+        except UnknownVenueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        job, coalesced = await run_in_threadpool(submit_job, venue_id, start_date, end_date, incremental)
+        return JSONResponse(
+            status_code=202,
+            content={"status": job["status"], "job_id": job["job_id"], "coalesced": coalesced}
+        )
+    options = {"incremental": True} if incremental else {}
+
+    async def run():
+        if inspect.iscoroutinefunction(run_pipeline):
+            return await run_pipeline(venue_id, start_date, end_date, **options)
+        return await run_in_threadpool(run_pipeline, venue_id, start_date, end_date, **options)
+
     try:
-        rows_loaded = run_pipeline(venue_id, start_date, end_date)
-        logger.info(f"Rows loaded: {rows_loaded}")
-        return {"status": "success", "rows_loaded": rows_loaded}
+        result, outcome = await results.run((venue_id, start_date, end_date, incremental), run)
+        logger.info(f"Rows loaded: {result} ({outcome})")
+        if isinstance(result, LoadResult):
+            content = {"status": "success", **result.as_dict()}
+        else:
+            content = {"status": "success", "rows_loaded": result}
+        return JSONResponse(content=content, headers={
+            "X-Cache": outcome.upper(),
+            "X-Cache-Hits": str(results.hits),
+            "X-Cache-Misses": str(results.misses),
+        })
+    except UnknownVenueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PipelineError as e:
+        logger.error(f"Pipeline error: {e}", exc_info=True)
+        # Earlier chunks were committed; report them alongside the error.
+        raise _failure(e, {"error": str(e), **e.result.as_dict()})
     except Exception as e:
         logger.error(f"Pipeline error: {e}", exc_info=True)
-        # Propagate exceptions as HTTP 500 for visibility
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        # Propagate exceptions as HTTP 500 (503 for upstream outages) for visibility
+        raise _failure(e, str(e))
+
+@app.get(
+    "/jobs",
+    summary="List Background Jobs",
+    description="Lists the most recent background pipeline jobs."
+)
+def list_jobs(status: str = None, limit: int = 50, jobs=Depends(get_jobs)):
+    """
+    Endpoint: GET /jobs
+    - status: Optional filter (queued, running, succeeded, failed).
+    - limit: Maximum number of jobs returned, newest first.
+
+    Returns:
+        JSON list of jobs as described for GET /jobs/{job_id}.
+    """
+    return jobs.store.list(status, limit)
+
+@app.get(
+    "/jobs/{job_id}",
+    summary="Background Job Status",
+    description="Reports a background job's progress and result."
+)
+def get_job(job_id: str, jobs=Depends(get_jobs)):
+    """
+    Endpoint: GET /jobs/{job_id}
+
+    Returns:
+        JSON object with the job's 'status', its progress ('chunks_done' of
+        'chunks_total', 'rows_loaded', 'inserted', 'updated', 'unchanged')
+        and 'error' once failed. Raises HTTPException(404) for unknown jobs.
+    """
+    job = jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+def get_weather_reader():
+    """
+    Dependency that returns the function reading stored rows (app.query.iter_weather).
+    Override this in tests via app.dependency_overrides.
+    """
+    return iter_weather
+
+@app.get(
+    "/weather/data",
+    summary="Read Stored Weather Data",
+    description="Streams stored hourly rows for a venue and date window, one keyset page at a time."
+)
+def get_weather_data(
+    venue_id: str,
+    start_date: date,
+    end_date: date,
+    fields: str = None,
+    after: datetime = None,
+    limit: int = None,
+    reader=Depends(get_weather_reader)
+):
+    """
+    Endpoint: GET /weather/data
+    - venue_id: Unique identifier for the venue.
+    - start_date, end_date: Inclusive UTC day window (YYYY-MM-DD).
+    - fields: Optional comma-separated hourly fields (default: all).
+    - after: Keyset cursor; pass the previous page's 'next_after'.
+    - limit: Rows per page (default QUERY_PAGE_SIZE, max QUERY_MAX_PAGE_SIZE).
+
+    Returns:
+        Streamed JSON object with 'rows' in timestamp order, 'count' and
+        'next_after' (null on the last page). Raises HTTPException(422) for
+        an invalid window, limit or field name.
+    """
+    if end_date < start_date:
+        raise HTTPException(status_code=422, detail="end_date must not be before start_date")
+    limit = limit or config.QUERY_PAGE_SIZE
+    if not 1 <= limit <= config.QUERY_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {config.QUERY_MAX_PAGE_SIZE}")
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    rows = reader(venue_id, start_date, end_date, selected, after, limit)
+    return StreamingResponse(
+        stream_page_json(venue_id, start_date, end_date, selected, after, limit, rows=rows),
+        media_type="application/json"
+    )
+
+def get_aggregator():
+    """
+    Dependency that returns the rollup reader (app.rollups.aggregates).
+    Override this in tests via app.dependency_overrides.
+    """
+    return aggregates
+
+@app.get(
+    "/weather/aggregates",
+    summary="Daily or Monthly Aggregates",
+    description="Serves per-day or per-month aggregates from the rollup tables."
+)
+def get_weather_aggregates(
+    venue_id: str,
+    start_date: date,
+    end_date: date,
+    granularity: Literal["day", "month"] = "day",
+    aggregator=Depends(get_aggregator)
+):
+    """
+    Endpoint: GET /weather/aggregates
+    - venue_id: Unique identifier for the venue.
+    - start_date, end_date: Inclusive UTC day window (YYYY-MM-DD).
+    - granularity: "day" or "month".
+
+    Returns:
+        JSON object with 'venue_id', 'granularity' and 'periods': rows of
+        temperature min/max/mean, precipitation/rain/snowfall totals and
+        maximum gusts. Each row's 'source' tells whether it came from the
+        rollups or was aggregated from raw rows. Raises HTTPException(422)
+        for an invalid window.
+    """
+    if end_date < start_date:
+        raise HTTPException(status_code=422, detail="end_date must not be before start_date")
+    periods = aggregator(venue_id, start_date, end_date, granularity)
+    return {"venue_id": venue_id, "granularity": granularity, "periods": periods}
+
+def get_batch_runner():
+    """
+    Dependency that returns the synchronous pipeline runner used by batch jobs.
+    Override this in tests via app.dependency_overrides.
+    """
+    return run_pipeline
+
+def get_shared_batch_runner():
+    """
+    Dependency that returns the runner for batch venues sharing a grid cell.
+    Override this in tests via app.dependency_overrides.
+    """
+    return run_pipeline_shared
+
+@app.post(
+    "/weather/batch",
+    summary="Batch Backfill Several Venues",
+    description="Runs many venue/date-range jobs in parallel on a worker pool."
+)
+def post_weather_batch(
+    request: BatchRequest,
+    runner=Depends(get_batch_runner),
+    shared_runner=Depends(get_shared_batch_runner),
+    registry=Depends(get_venue_registry)
+):
+    """
+    Endpoint: POST /weather/batch
+    - jobs: List of {venue_id, start_date, end_date}.
+    - max_workers, per_venue_limit, executor: Optional pool settings.
+
+    Jobs for the same range whose venues share a grid cell run as one
+    extraction fanned out to all of them (unless BATCH_SHARE_CELLS is off).
+
+    Returns:
+        JSON report from app.batch.run_batch(): totals, throughput and a
+        per-venue status. Failed jobs are reported, not raised.
+        Raises HTTPException(422) when a job is listed more than once.
+    """
+    logger.info(f"POST /weather/batch with {len(request.jobs)} jobs")
+    jobs = [BatchJob(job.venue_id, job.start_date, job.end_date) for job in request.jobs]
+    try:
+        report = run_batch(
+            jobs, request.max_workers, request.per_venue_limit, request.executor,
+            runner=runner, shared_runner=shared_runner,
+            registry=registry if config.BATCH_SHARE_CELLS else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    logger.info(
+        f"Batch finished: {report['succeeded']}/{report['jobs']} jobs, "
+        f"{report['rows_loaded']} rows at {report['rows_per_second']} rows/s"
+    )
+    return report
+
+@app.get(
+    "/venues",
+    summary="List Venues",
+    description="Lists the registered venues and their coordinates."
+)
+def list_venues(registry=Depends(get_venue_registry)):
+    """
+    Endpoint: GET /venues
+
+    Returns:
+        JSON list of {venue_id, latitude, longitude, name, cell}.
+    """
+    return [
+        {"venue_id": v.venue_id, "latitude": v.latitude, "longitude": v.longitude, "name": v.name, "cell": v.cell}
+        for v in registry.all()
+    ]
+
+@app.put(
+    "/venues/{venue_id}",
+    summary="Register Venue",
+    description="Creates or updates a venue's coordinates."
+)
+def put_venue(venue_id: str, request: VenueRequest, registry=Depends(get_venue_registry)):
+    """
+    Endpoint: PUT /venues/{venue_id}
+    - latitude, longitude: Venue coordinates in decimal degrees.
+    - name: Optional display name.
+
+    Returns:
+        JSON object with the stored venue and its grid cell.
+    """
+    venue = registry.register(Venue(venue_id, request.latitude, request.longitude, request.name))
+    return {"status": "success", "venue_id": venue.venue_id, "cell": venue.cell}
+
+def get_venue_syncer():
+    """
+    Dependency that returns the sync-to-yesterday function (app.pipeline.sync_venue).
+    Override this in tests via app.dependency_overrides.
+    """
+    return sync_venue
+
+@app.post(
+    "/venues/{venue_id}/sync",
+    summary="Sync Venue to Yesterday",
+    description="Loads the days after the venue's high-water mark, up to yesterday."
+)
+def post_venue_sync(venue_id: str, start_date: date = None, syncer=Depends(get_venue_syncer)):
+    """
+    Endpoint: POST /venues/{venue_id}/sync
+    - start_date: Where the first sync of a venue starts (YYYY-MM-DD);
+      ignored once the venue has a high-water mark.
+
+    Returns:
+        JSON report from app.pipeline.sync_venue(). Raises HTTPException(404)
+        for unregistered venues, HTTPException(422) when a first sync has no
+        start_date, HTTPException(503) when Open-Meteo is unavailable and
+        HTTPException(500) on other pipeline errors.
+    """
+    try:
+        return {"status": "success", **syncer(venue_id, start_date)}
+    except UnknownVenueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except PipelineError as e:
+        logger.error(f"Sync error: {e}", exc_info=True)
+        raise _failure(e, {"error": str(e), **e.result.as_dict()})
+
+def get_exporter():
+    """
+    Dependency that returns the columnar exporter (app.export.export_weather).
+    Override this in tests via app.dependency_overrides.
+    """
+    return export_weather
+
+@app.post(
+    "/weather/export",
+    summary="Export Weather Data",
+    description="Writes stored rows as Parquet or Arrow IPC files partitioned by venue and month."
+)
+def post_weather_export(request: ExportRequest, exporter=Depends(get_exporter)):
+    """
+    Endpoint: POST /weather/export
+    Body: {"venue_ids": [...], "start_date", "end_date", "format": "parquet" | "arrow",
+           "fields": [...]}; format and fields are optional.
+
+    Returns:
+        JSON object with the 'files' written (venue_id, month, path relative
+        to EXPORT_DIR, rows, bytes) and the total 'rows'. Each file can be
+        downloaded from GET /exports/{path}. Raises HTTPException(422) for
+        an invalid window or field name.
+    """
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=422, detail="end_date must not be before start_date")
+    try:
+        fields = parse_fields(request.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    files = exporter(
+        request.venue_ids, request.start_date, request.end_date,
+        config.EXPORT_DIR, request.format or config.EXPORT_FORMAT, fields
+    )
+    for entry in files:
+        entry["path"] = os.path.relpath(entry["path"], config.EXPORT_DIR)
+    return {"status": "success", "files": files, "rows": sum(f["rows"] for f in files)}
+
+@app.get(
+    "/exports/{path:path}",
+    summary="Download Export File",
+    description="Serves one file written by POST /weather/export."
+)
+def get_export_file(path: str):
+    """
+    Endpoint: GET /exports/{path}
+    - path: A 'path' from the POST /weather/export response.
+
+    Returns:
+        The file. Raises HTTPException(404) for paths outside EXPORT_DIR or
+        files that do not exist.
+    """
+    root = os.path.realpath(config.EXPORT_DIR)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root or not os.path.isfile(full):
+        raise HTTPException(status_code=404, detail=f"No export file {path!r}")
+    return FileResponse(full, filename=os.path.basename(full), media_type="application/octet-stream")
+
+def get_qa_runner():
+    """
+    Dependency that returns the QA runner (app.qa.run_qa).
+    Override this in tests via app.dependency_overrides.
+    """
+    return run_qa
+
+@app.get(
+    "/qa",
+    summary="Data Quality Checks",
+    description="Counts rule violations in stored rows with one aggregated scan."
+)
+def get_qa(
+    venue_id: str = None,
+    start_date: date = None,
+    end_date: date = None,
+    qa_runner=Depends(get_qa_runner)
+):
+    """
+    Endpoint: GET /qa
+    - venue_id: Optional venue to limit the checks to.
+    - start_date, end_date: Optional inclusive UTC day window.
+
+    Returns:
+        JSON object with 'rows' checked, 'violations' (rule -> count) and
+        'passed'.
+    """
+    return qa_runner(venue_id, start_date, end_date)
+
+@app.get(
+    "/metrics",
+    summary="Prometheus Metrics",
+    description="Stage timings, bytes, rows, DB round trips, pool waits and cache hits.",
+    response_class=PlainTextResponse
+)
+def get_metrics():
+    """
+    Endpoint: GET /metrics
+
+    Returns:
+        The metrics of this process in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get(
+    "/pool/stats",
+    summary="Database Pool Statistics",
+    description="Reports in-use and idle pooled connections and checkout wait times."
+)
+def get_pool_stats():
+    """
+    Endpoint: GET /pool/stats
+
+    Returns:
+        JSON object from app.db.ConnectionPool.stats(), or {"status": "not_started"}
+        when no request has used the database yet.
+    """
+    stats = pool_stats()
+    if stats is None:
+        return {"status": "not_started"}
+    return {"status": "ok", **stats}
+
+@app.get(
+    "/upstream/stats",
+    summary="Open-Meteo Client Statistics",
+    description="Reports upstream request counts, throttling, the current rate limit, circuit state and latency."
+)
+def get_upstream_stats():
+    """
+    Endpoint: GET /upstream/stats
+
+    Returns:
+        JSON object from app.upstream.UpstreamClient.stats(), or
+        {"status": "not_started"} when no request has reached Open-Meteo yet.
+    """
+    stats = upstream_stats()
+    if stats is None:
+        return {"status": "not_started"}
+    return {"status": "ok", **stats}
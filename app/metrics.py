@@ -0,0 +1,360 @@
+"""
+metrics.py - Pipeline Instrumentation and Prometheus Exposition
+
+A small in-process metrics registry rendered in the Prometheus text format
+by GET /metrics:
+
+  - weather_pipeline_stage_seconds{stage}: histogram of extract (HTTP),
+    decode (JSON), transform and load durations, recorded with stage().
+  - weather_upstream_bytes_total / weather_upstream_requests_total{status}
+  - weather_upstream_retries_total{reason}, weather_upstream_rejected_total
+    and weather_upstream_wait_seconds (rate limiter waits), plus the current
+    rate limit and circuit state read from app.upstream at scrape time.
+  - weather_rows_transformed_total, weather_rows_loaded_total{outcome}
+  - weather_db_round_trips_total: statements and COPYs sent by pooled
+    connections (app.db uses a counting cursor).
+  - weather_db_pool_wait_seconds: histogram of connection checkout waits,
+    plus pool size gauges read from app.db.pool_stats() at scrape time.
+  - weather_archive_cache_days_total{result}: cache hits and misses.
+  - weather_http_request_seconds{method,route,status}
+
+Counters are per process; with several workers each exposes its own.
+
+Profiling: inside profiling() every stage() also runs under cProfile (one
+profiler per thread, merged afterwards), which main.py switches on per
+request with the X-Profile header or for every request via config.PROFILE_MODE.
+save_profile() writes a request's profile and keeps the directory bounded.
+"""
+
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), self._zero())]  # unlabelled series are always exposed
+        lines.extend(self._render_samples(items))
+        return lines
+
+class Counter(_Metric):
+    """Monotonic counter, optionally labelled."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _zero(self):
+        return 0
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    """Histogram with cumulative buckets, a sum and a count per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _zero(self):
+        return [0] * len(self.buckets), 0.0, 0
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    """Holds metrics plus collectors that produce gauge lines at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """collector() returns Prometheus text lines (including HELP/TYPE)."""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:  # a broken collector must not break the scrape
+                logger.warning(f"Metrics collector {collector!r} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "weather_pipeline_stage_seconds", "Duration of pipeline stages in seconds.", ("stage",)))
+UPSTREAM_BYTES = REGISTRY.register(Counter(
+    "weather_upstream_bytes_total", "Bytes received from the Open-Meteo archive API."))
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    "weather_upstream_requests_total", "Open-Meteo archive API responses by status.", ("status",)))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    "weather_upstream_retries_total", "Open-Meteo requests retried, by reason.", ("reason",)))
+UPSTREAM_REJECTED = REGISTRY.register(Counter(
+    "weather_upstream_rejected_total", "Open-Meteo requests failed fast while the circuit was open."))
+UPSTREAM_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "weather_upstream_wait_seconds", "Time requests waited for the Open-Meteo rate limiter."))
+ROWS_TRANSFORMED = REGISTRY.register(Counter(
+    "weather_rows_transformed_total", "Hourly rows produced by the transform stage."))
+ROWS_LOADED = REGISTRY.register(Counter(
+    "weather_rows_loaded_total", "Hourly rows written by load(), by outcome.", ("outcome",)))
+DB_ROUND_TRIPS = REGISTRY.register(Counter(
+    "weather_db_round_trips_total", "Statements and COPY commands sent to PostgreSQL."))
+POOL_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "weather_db_pool_wait_seconds", "Time spent waiting for a pooled database connection.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)))
+CACHE_DAYS = REGISTRY.register(Counter(
+    "weather_archive_cache_days_total", "Days looked up in the archive cache, by result.", ("result",)))
+RESULT_CACHE = REGISTRY.register(Counter(
+    "weather_result_cache_requests_total", "GET /weather runs by result cache outcome.", ("result",)))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "weather_http_request_seconds", "API request durations in seconds.", ("method", "route", "status")))
+
+def _pool_collector():
+    from app.db import pool_stats
+
+    stats = pool_stats()
+    if stats is None:
+        return []
+    return [
+        "# HELP weather_db_pool_connections Pooled database connections by state.",
+        "# TYPE weather_db_pool_connections gauge",
+        f'weather_db_pool_connections{{state="in_use"}} {stats["in_use"]}',
+        f'weather_db_pool_connections{{state="idle"}} {stats["idle"]}',
+        "# HELP weather_db_pool_waiting Threads waiting for a pooled connection.",
+        "# TYPE weather_db_pool_waiting gauge",
+        f"weather_db_pool_waiting {stats['waiting']}",
+    ]
+
+REGISTRY.add_collector(_pool_collector)
+
+def _upstream_collector():
+    from app.upstream import upstream_stats
+
+    stats = upstream_stats()
+    if stats is None:
+        return []
+    return [
+        "# HELP weather_upstream_rate Current Open-Meteo request rate limit (requests per second).",
+        "# TYPE weather_upstream_rate gauge",
+        f"weather_upstream_rate {stats['rate']}",
+        "# HELP weather_upstream_circuit_open Whether the Open-Meteo circuit breaker is open.",
+        "# TYPE weather_upstream_circuit_open gauge",
+        f"weather_upstream_circuit_open {int(stats['circuit'] == 'open')}",
+    ]
+
+REGISTRY.add_collector(_upstream_collector)
+
+def render():
+    """Returns all metrics in the Prometheus text exposition format."""
+    return REGISTRY.render()
+
+class RequestProfile:
+    """
+    cProfile data for one request, collected by stage() in every thread the
+    request's stages run in.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self._depth = {}
+
+    @contextmanager
+    def active(self):
+        """Profiles the current thread for the duration of the block."""
+        thread = threading.get_ident()
+        with self._lock:
+            profile = self._profiles.setdefault(thread, cProfile.Profile())
+            depth = self._depth.get(thread, 0)
+            self._depth[thread] = depth + 1
+        enabled = False
+        if depth == 0:
+            try:
+                profile.enable()
+                enabled = True
+            except ValueError:  # another profiler is active in this thread
+                pass
+        try:
+            yield
+        finally:
+            if enabled:
+                profile.disable()
+            with self._lock:
+                self._depth[thread] -= 1
+
+    def stats(self):
+        """Returns the merged pstats.Stats, or None if nothing was profiled."""
+        with self._lock:
+            profiles = [p for p in self._profiles.values() if p.getstats()]
+        if not profiles:
+            return None
+        return pstats.Stats(*profiles)
+
+    def summary(self, limit=20):
+        """Returns the top functions by cumulative time as text."""
+        stats = self.stats()
+        if stats is None:
+            return ""
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def dump(self, path):
+        """Writes the merged profile to path (load it with pstats or snakeviz)."""
+        stats = self.stats()
+        if stats is not None:
+            stats.dump_stats(path)
+        return stats is not None
+
+def save_profile(profile, directory, profile_id, max_files=0):
+    """
+    Writes profile to directory as <profile_id>.pstats, then deletes the
+    oldest profiles so that at most max_files remain (0 keeps all).
+
+    Returns:
+        str | None: The path written, or None if nothing was profiled.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{profile_id}.pstats")
+    if not profile.dump(path):
+        return None
+    if max_files:
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith(".pstats")]
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[:-max_files]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:  # removed by another worker
+                pass
+    return path
+
+_current_profile = contextvars.ContextVar("weather_request_profile", default=None)
+
+@contextmanager
+def profiling():
+    """
+    Profiles every stage() run in this context (including worker threads
+    started with asyncio.to_thread or run_in_threadpool, which copy it).
+
+    Yields:
+        RequestProfile
+    """
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+@contextmanager
+def stage(name, profile=True):
+    """
+    Times a pipeline stage into weather_pipeline_stage_seconds.
+
+    Args:
+        name (str): Stage label (extract, decode, transform, load, ...).
+        profile (bool): Also run it under the request's profiler, if any.
+            Pass False around awaits, where other requests would be profiled too.
+    """
+    request_profile = _current_profile.get() if profile else None
+    with STAGE_SECONDS.time(stage=name):
+        if request_profile is None:
+            yield
+        else:
+            with request_profile.active():
+                yield
@@ -3,9 +3,68 @@ models.py - (Optional) ORM Model Definitions or Schema Constants
 
 This module is reserved for defining ORM models if you choose to use
 an ORM (e.g., SQLAlchemy) instead of executing raw SQL queries.
-Currently, the project uses raw SQL in the 'sql/schema.sql' script.
+Currently, the project uses raw SQL in the 'sql/schema.sql' script, and the
+constants below describe the columns of the 'weather_data' table. The
+Pydantic models further down define request bodies of the API.
 """
 
+from datetime import date
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+# Hourly fields requested from Open-Meteo. Each name doubles as the column
+# name in 'weather_data', in the same order as the table definition.
+HOURLY_FIELDS = (
+    "temperature_2m",
+    "precipitation",
+    "snowfall",
+    "cloud_cover",
+    "wind_speed_10m",
+    "relative_humidity_2m",
+    "apparent_temperature",
+    "precipitation_probability",
+    "wind_gusts_10m",
+    "pressure_msl",
+    "wind_direction_10m",
+    "weather_code",
+    "rain",
+    "surface_pressure",
+)
+
+# Fields stored in INTEGER columns; everything else is REAL.
+INTEGER_FIELDS = frozenset({"cloud_cover", "wind_direction_10m", "weather_code"})
+
+# Columns written by the loader, in INSERT/COPY order.
+WEATHER_COLUMNS = ("venue_id", "timestamp") + HOURLY_FIELDS
+
+class BatchJobRequest(BaseModel):
+    """One venue and inclusive date range in a batch backfill."""
+    venue_id: str
+    start_date: date
+    end_date: date
+
+class BatchRequest(BaseModel):
+    """Body of POST /weather/batch; unset options fall back to app.config."""
+    jobs: List[BatchJobRequest] = Field(min_length=1)
+    max_workers: Optional[int] = Field(None, ge=1)
+    per_venue_limit: Optional[int] = Field(None, ge=1)
+    executor: Optional[Literal["thread", "process"]] = None
+
+class ExportRequest(BaseModel):
+    """Body of POST /weather/export; unset options fall back to app.config."""
+    venue_ids: List[str] = Field(min_length=1)
+    start_date: date
+    end_date: date
+    format: Optional[Literal["parquet", "arrow"]] = None
+    fields: Optional[List[str]] = None
+
+class VenueRequest(BaseModel):
+    """Body of PUT /venues/{venue_id}."""
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+    name: Optional[str] = None
+
 # Example (commented out) using SQLAlchemy:
 #
 # from sqlalchemy import Column, Integer, String, Float, DateTime
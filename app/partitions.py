@@ -0,0 +1,210 @@
+"""
+partitions.py - Time-Partitioned weather_data Support
+
+With sql/schema_partitioned.sql, weather_data is range-partitioned on
+timestamp by month or year (config.PARTITION_GRANULARITY), and each time
+partition is optionally hash-partitioned by venue_id into
+config.PARTITION_VENUE_BUCKETS buckets.
+
+  - ensure_partitions() creates the partitions a load is about to write to;
+    load() calls it for the span of every batch. Partitions already seen by
+    this process are skipped without a round trip.
+  - drop_partitions() retires whole partitions older than a cutoff with
+    DETACH (and DROP), which is O(1) compared with DELETE ... WHERE timestamp,
+    and deletes the rollups (app.rollups) of the retired days.
+  - qa_by_partition() runs the QA rules (app.qa) per partition.
+
+On the plain schema (sql/schema.sql) all of this is a no-op apart from QA,
+which then treats weather_data as a single partition.
+"""
+
+import re
+import threading
+from datetime import date, datetime, time, timezone
+
+from app import config
+from app.cache import as_date
+from app.qa import run_qa
+from app.rollups import delete_rollups
+
+PARENT = "weather_data"
+GRANULARITIES = ("month", "year")
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+_lock = threading.Lock()
+_partitioned = None
+_known = set()
+
+def reset():
+    """Forgets the cached catalog state (e.g. after switching schemas)."""
+    global _partitioned
+    with _lock:
+        _partitioned = None
+        _known.clear()
+
+def partition_for(day, granularity=None):
+    """
+    Returns (name, lower_day, upper_day) of the time partition holding day.
+
+    The upper bound is exclusive, e.g. weather_data_p2024_01 covers
+    [2024-01-01, 2024-02-01).
+    """
+    granularity = granularity or config.PARTITION_GRANULARITY
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown partition granularity {granularity!r}; expected one of {GRANULARITIES}")
+    day = as_date(day)
+    if granularity == "year":
+        return f"{PARENT}_p{day.year}", date(day.year, 1, 1), date(day.year + 1, 1, 1)
+    lower = date(day.year, day.month, 1)
+    upper = date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+    return f"{PARENT}_p{day.year}_{day.month:02d}", lower, upper
+
+def partitions_for_range(start_date, end_date, granularity=None):
+    """Returns partition_for() of every time partition overlapping [start_date, end_date]."""
+    partitions = []
+    day = as_date(start_date)
+    end_date = as_date(end_date)
+    while day <= end_date:
+        partition = partition_for(day, granularity)
+        partitions.append(partition)
+        day = partition[2]
+    return partitions
+
+def is_partitioned(conn):
+    """Returns whether weather_data is a partitioned table (cached per process)."""
+    global _partitioned
+    if _partitioned is None:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+                (PARENT,),
+            )
+            _partitioned = cur.fetchone()[0]
+    return _partitioned
+
+def _utc(day):
+    return datetime.combine(day, time(), tzinfo=timezone.utc)
+
+def _utc_day(bound):
+    return bound.astimezone(timezone.utc).date()
+
+def ensure_partitions(conn, start_date, end_date):
+    """
+    Creates the missing partitions for [start_date, end_date].
+
+    Runs and commits in its own transaction, before the load's, so the lock
+    taken on weather_data while attaching a partition is held only briefly.
+    Concurrent loaders serialize on an advisory lock and CREATE ... IF NOT
+    EXISTS, so each partition is created exactly once.
+
+    Returns:
+        list: Names of the partitions that were created.
+    """
+    from psycopg2 import sql
+
+    if not is_partitioned(conn):
+        return []
+    needed = [p for p in partitions_for_range(start_date, end_date) if p[0] not in _known]
+    if not needed:
+        return []
+    buckets = config.PARTITION_VENUE_BUCKETS
+    created = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (PARENT,))
+        for name, lower, upper in needed:
+            cur.execute("SELECT to_regclass(%s) IS NULL", (name,))
+            if cur.fetchone()[0]:
+                cur.execute(
+                    sql.SQL(
+                        "CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)"
+                    ).format(sql.Identifier(name), sql.Identifier(PARENT))
+                    + (sql.SQL(" PARTITION BY HASH (venue_id)") if buckets else sql.SQL("")),
+                    (_utc(lower), _utc(upper)),
+                )
+                for remainder in range(buckets):
+                    cur.execute(
+                        sql.SQL(
+                            "CREATE TABLE IF NOT EXISTS {} PARTITION OF {} "
+                            "FOR VALUES WITH (MODULUS %s, REMAINDER %s)"
+                        ).format(sql.Identifier(f"{name}_v{remainder}"), sql.Identifier(name)),
+                        (buckets, remainder),
+                    )
+                created.append(name)
+    conn.commit()
+    with _lock:
+        _known.update(name for name, _, _ in needed)
+    return created
+
+def list_partitions(conn):
+    """
+    Lists the time partitions of weather_data, oldest first.
+
+    Returns:
+        list: (name, lower, upper) tuples with datetime bounds; on the plain
+        schema a single ("weather_data", None, None).
+    """
+    if not is_partitioned(conn):
+        return [(PARENT, None, None)]
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)",
+            (PARENT,),
+        )
+        partitions = []
+        for name, bound in cur.fetchall():
+            match = _BOUND_RE.search(bound)
+            if match is None:  # DEFAULT partition
+                partitions.append((name, None, None))
+                continue
+            lower, upper = (datetime.fromisoformat(v.replace(" ", "T")) for v in match.groups())
+            partitions.append((name, lower, upper))
+    return sorted(partitions, key=lambda p: (p[1] is None, p[1] or datetime.min))
+
+def drop_partitions(conn, before, detach_only=False):
+    """
+    Retires the time partitions that end on or before the given day, and
+    deletes the daily and monthly rollups of their days in the same
+    transaction, so aggregates() stops serving data that is gone.
+
+    Args:
+        conn: Database connection.
+        before (date | str): Cutoff; partitions with an upper bound at or
+            before midnight UTC of this day are removed.
+        detach_only (bool): Only DETACH them (keeping the tables for archiving)
+            instead of dropping them.
+
+    Returns:
+        list: Names of the retired partitions.
+    """
+    from psycopg2 import sql
+
+    cutoff = _utc(as_date(before))
+    retired = []
+    for name, lower, upper in list_partitions(conn):
+        if upper is None or upper > cutoff:
+            continue
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                sql.Identifier(PARENT), sql.Identifier(name)))
+            if not detach_only:
+                cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+            delete_rollups(cur, _utc_day(lower) if lower is not None else None, _utc_day(upper))
+        retired.append(name)
+    conn.commit()
+    with _lock:
+        _known.difference_update(retired)
+    return retired
+
+def qa_by_partition(conn):
+    """
+    Runs the QA rules (app.qa) against each partition separately, one
+    aggregated scan per partition.
+
+    Returns:
+        dict: partition name -> app.qa.run_qa() report.
+    """
+    report = {name: run_qa(table=name, conn=conn) for name, _, _ in list_partitions(conn)}
+    conn.rollback()
+    return report
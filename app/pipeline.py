@@ -5,19 +5,100 @@ This module implements the full ETL process:
   1. Extraction: Retrieve historical weather data from the Open-Meteo API.
   2. Transformation: Convert the raw API data into a structured list of records.
   3. Loading: Insert the structured records into the PostgreSQL database.
-  4. Orchestration: run_pipeline() ties these steps together.
+  4. Orchestration: run_pipeline() ties these steps together, streaming the
+     date range chunk by chunk with a commit per chunk (iter_pipeline()
+     yields the same chunks one at a time); run_pipeline_async() does the
+     same with the concurrent extractor from app.async_extract. In
+     incremental mode only the days not yet stored are extracted (see
+     app.sync), and sync_venue() brings a venue up to yesterday from its
+     high-water mark. replay_archives() rebuilds a range offline from the
+     raw responses landed by app.landing.
 
 Each record's keys are named to directly match the API's parameter names,
 so our transformed data fields match what Open-Meteo returns.
 """
 
-import requests
-from app.db import get_db_connection
+import asyncio
+import csv
+import io
+import itertools
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+from app import config
+from app.async_extract import extract_weather_data_async, split_date_range
+from app.cache import as_date, cached_fetch, get_archive_cache, iter_days, missing_ranges
+from app.columns import WeatherColumns, transform_columnar
+from app.db import connection
+from app.decode import decode_columns, dumps, loads
+from app.landing import get_landing, read_columns
+from app.metrics import ROWS_LOADED, ROWS_TRANSFORMED, stage
+from app.models import HOURLY_FIELDS, WEATHER_COLUMNS
+from app.partitions import ensure_partitions
+from app.qa import QAError, validate_records
+from app.query import window_bounds
+from app.rollups import refresh_rollups
+from app.sync import advance_high_water_mark, get_high_water_mark, missing_day_ranges, sync_window
+from app.upstream import get_upstream
+from app.venues import get_registry
+
+logger = logging.getLogger(__name__)
+
+LOAD_METHODS = ("copy", "values", "row")
+
+def request_archive(lat, lon, start_date, end_date):
+    """
+    Requests one date range from the Open-Meteo historical API, bypassing the cache.
+
+    Args:
+        lat (float): Latitude coordinate for the target location.
+        lon (float): Longitude coordinate for the target location.
+        start_date (str | date): First day of the range.
+        end_date (str | date): Last day of the range (inclusive).
+
+    Returns:
+        bytes: The undecoded JSON response body.
+
+    Raises:
+        UpstreamError: If Open-Meteo keeps failing or its circuit is open
+            (see app.upstream for the rate limit and retry policy).
+
+    Note:
+        The request asks for every field in models.HOURLY_FIELDS.
+    """
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+        # Requesting fields that will be used by the pipeline.
+        "hourly": ",".join(HOURLY_FIELDS),
+        "timezone": "UTC",
+    }
+    return get_upstream().get(config.OPEN_METEO_ARCHIVE_URL, params)
+
+def fetch_archive(lat, lon, start_date, end_date):
+    """
+    request_archive() plus decoding (app.decode).
+
+    Returns:
+        dict: The JSON response from the API.
+    """
+    content = request_archive(lat, lon, start_date, end_date)
+    with stage("decode"):
+        return loads(content)
 
 def extract_weather_data(lat, lon, start_date, end_date):
     """
     Extracts weather data from the Open-Meteo historical API.
 
+    When the archive cache is enabled (config.ARCHIVE_CACHE_PATH), days that
+    are already cached are served locally and only the missing day ranges
+    are requested from the API.
+
     Args:
         lat (float): Latitude coordinate for the target location.
         lon (float): Longitude coordinate for the target location.
@@ -25,23 +106,12 @@ def extract_weather_data(lat, lon, start_date, end_date):
         end_date (str): End date in 'YYYY-MM-DD' format.
 
     Returns:
-        dict: The JSON response from the API.
-
-    Note:
-        The URL requests 15 specific hourly parameters to capture detailed weather data.
+        dict: The JSON response from the API (or its cached equivalent).
     """
-    url = (
-        f"https://archive-api.open-meteo.com/v1/archive?latitude={lat}"
-        f"&longitude={lon}&start_date={start_date}&end_date={end_date}"
-        # Requesting fields that will be used by the pipeline.
-        "&hourly=temperature_2m,precipitation,snowfall,cloud_cover,wind_speed_10m,"
-        "relative_humidity_2m,apparent_temperature,precipitation_probability,"
-        "wind_gusts_10m,pressure_msl,wind_direction_10m,weather_code,rain,surface_pressure"
-        "&timezone=UTC"
-    )
-    response = requests.get(url)
-    response.raise_for_status()  # Throws HTTPError if the API request fails.
-    return response.json()
+    cache = get_archive_cache()
+    if cache is None:
+        return fetch_archive(lat, lon, start_date, end_date)
+    return cached_fetch(cache, fetch_archive, lat, lon, start_date, end_date, HOURLY_FIELDS)
 
 def transform(data):
     """
@@ -62,99 +132,710 @@ def transform(data):
     """
     hourly = data.get("hourly", {})
     timestamps = hourly.get("time", [])
+    # Missing or short field arrays are padded with None instead of raising IndexError.
+    columns = {}
+    for field in HOURLY_FIELDS:
+        values = list(hourly.get(field) or [])
+        columns[field] = values + [None] * (len(timestamps) - len(values))
     records = []
     # Loop over each timestamp index to construct individual records.
     for i, ts in enumerate(timestamps):
-        record = {
-            "timestamp": ts,
-            "temperature_2m": hourly.get("temperature_2m", [None])[i],
-            "precipitation": hourly.get("precipitation", [None])[i],
-            "snowfall": hourly.get("snowfall", [None])[i],
-            "cloud_cover": hourly.get("cloud_cover", [None])[i],
-            "wind_speed_10m": hourly.get("wind_speed_10m", [None])[i],
-            "relative_humidity_2m": hourly.get("relative_humidity_2m", [None])[i],
-            "apparent_temperature": hourly.get("apparent_temperature", [None])[i],
-            "precipitation_probability": hourly.get("precipitation_probability", [None])[i],
-            "wind_gusts_10m": hourly.get("wind_gusts_10m", [None])[i],
-            "pressure_msl": hourly.get("pressure_msl", [None])[i],
-            "wind_direction_10m": hourly.get("wind_direction_10m", [None])[i],
-            "weather_code": hourly.get("weather_code", [None])[i],
-            "rain": hourly.get("rain", [None])[i],
-            "surface_pressure": hourly.get("surface_pressure", [None])[i]
-        }
+        record = {"timestamp": ts}
+        for field in HOURLY_FIELDS:
+            record[field] = columns[field][i]
         records.append(record)
     return records
 
-def load(records, venue_id):
+def transform_data(data):
+    """
+    Transforms a raw API response with the configured config.TRANSFORM_MODE:
+    "columnar" (transform_columnar) or "records" (transform).
+    """
+    with stage("transform"):
+        records = transform_columnar(data) if config.TRANSFORM_MODE == "columnar" else transform(data)
+    ROWS_TRANSFORMED.inc(len(records))
+    return records
+
+def _transform_content(content):
+    """
+    Transforms a response in the configured TRANSFORM_MODE.
+
+    content is either the raw response body or a response that is already
+    decoded and owned by the caller (assembled from the archive cache or
+    merged by the async extractor). In columnar mode both go through
+    decode_columns().
+    """
+    decoded = isinstance(content, dict)
+    if config.TRANSFORM_MODE != "columnar":
+        if not decoded:
+            with stage("decode"):
+                content = loads(content)
+        return transform_data(content)
+    with stage("transform" if decoded else "decode"):
+        records = decode_columns(content)
+    ROWS_TRANSFORMED.inc(len(records))
+    return records
+
+def extract_transformed(lat, lon, start_date, end_date, venue_ids=()):
+    """
+    extract_weather_data() followed by transform_data().
+
+    In columnar mode the response is turned into WeatherColumns by
+    app.decode.decode_columns(). That applies to the raw bytes without the
+    archive cache and to the assembled response with it. The decoded hourly
+    lists are released one by one as their column arrays are built, so they
+    do not outlive the conversion. With raw landing enabled (app.landing), the response is saved for
+    venue_ids first; only a response assembled from the cache is re-encoded
+    for that.
+    """
+    landing = get_landing() if venue_ids else None
+    if get_archive_cache() is None:
+        content = request_archive(lat, lon, start_date, end_date)
+    else:
+        content = extract_weather_data(lat, lon, start_date, end_date)
+    if landing is not None:
+        landing.put(venue_ids, start_date, end_date, content if isinstance(content, bytes) else dumps(content))
+    return _transform_content(content)
+
+def _as_utc(ts):
+    """
+    Marks a timezone-naive timestamp as UTC, as the Open-Meteo request asks
+    for UTC times. Otherwise PostgreSQL would read it in the session time
+    zone.
+    """
+    if isinstance(ts, datetime):
+        return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+    if ts.endswith("Z") or "+" in ts[10:] or "-" in ts[10:]:
+        return ts
+    return ts + "+00"
+
+def _record_rows(records, venue_id):
+    """
+    Yields one tuple per record, ordered like WEATHER_COLUMNS, with the
+    timestamp as an explicit-UTC value.
+
+    WeatherColumns produce their tuples straight from the column arrays.
+    """
+    if isinstance(records, WeatherColumns):
+        yield from records.iter_rows(venue_id)
+        return
+    for rec in records:
+        yield (venue_id, _as_utc(rec["timestamp"])) + tuple(rec[field] for field in HOURLY_FIELDS)
+
+class _CopyStream:
+    """
+    Read-only file-like object that encodes rows as CSV on demand.
+
+    psycopg2's copy_expert() pulls data with read(size); rows are encoded
+    batch_size at a time, so only one batch is ever held in memory.
+    """
+
+    def __init__(self, rows, batch_size):
+        self._rows = iter(rows)
+        self._batch_size = batch_size
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pending = ""
+        self._pos = 0
+        self.rows_written = 0
+
+    def _fill(self):
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        batch = list(itertools.islice(self._rows, self._batch_size))
+        self.rows_written += len(batch)
+        self._writer.writerows(batch)
+        self._pending = self._pending[self._pos:] + self._buffer.getvalue()
+        self._pos = 0
+        return len(self._pending) > 0
+
+    def read(self, size=-1):
+        if self._pos >= len(self._pending) and not self._fill():
+            return ""
+        if size < 0:
+            size = len(self._pending) - self._pos
+        data = self._pending[self._pos:self._pos + size]
+        self._pos += len(data)
+        return data
+
+_COLUMN_LIST = ", ".join(WEATHER_COLUMNS)
+
+# Upserts only rewrite rows whose values actually changed; unchanged rows are
+# skipped by the WHERE clause and therefore never returned.
+_ON_CONFLICT = f"""
+    ON CONFLICT (venue_id, timestamp) DO UPDATE SET
+        {", ".join(f"{field} = EXCLUDED.{field}" for field in HOURLY_FIELDS)}
+    WHERE ({", ".join(f"weather_data.{field}" for field in HOURLY_FIELDS)})
+          IS DISTINCT FROM ({", ".join(f"EXCLUDED.{field}" for field in HOURLY_FIELDS)})
+    RETURNING (xmax = 0) AS inserted
+"""
+
+@dataclass
+class LoadResult:
+    """
+    Outcome of a load() call.
+
+    rows_loaded counts the records handed to the database; in upsert mode they
+    are split into newly inserted rows, rows updated with changed values and
+    rows that already existed unchanged.
+    """
+    rows_loaded: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __add__(self, other):
+        return LoadResult(
+            self.rows_loaded + other.rows_loaded,
+            self.inserted + other.inserted,
+            self.updated + other.updated,
+            self.unchanged + other.unchanged,
+        )
+
+    def __int__(self):
+        return self.rows_loaded
+
+    def as_dict(self):
+        return asdict(self)
+
+def _count_flags(flags):
+    """Splits RETURNING (xmax = 0) results into (inserted, updated) counts."""
+    inserted = sum(1 for (is_insert,) in flags if is_insert)
+    return inserted, len(flags) - inserted
+
+def _load_row_by_row(cur, rows, upsert):
+    """Executes one INSERT per row (the original, slowest path)."""
+    insert_query = f"""
+        INSERT INTO weather_data ({_COLUMN_LIST})
+        VALUES ({", ".join(["%s"] * len(WEATHER_COLUMNS))})
+    """
+    if not upsert:
+        count = 0
+        for row in rows:
+            cur.execute(insert_query, row)
+            count += 1
+        return count, 0
+    flags = []
+    for row in rows:
+        cur.execute(insert_query + _ON_CONFLICT, row)
+        flags.extend(cur.fetchall())
+    return _count_flags(flags)
+
+def _load_values(cur, rows, batch_size, upsert):
+    """Inserts rows with multi-row VALUES lists, batch_size rows per statement."""
+    from psycopg2.extras import execute_values
+
+    insert_query = f"INSERT INTO weather_data ({_COLUMN_LIST}) VALUES %s"
+    if not upsert:
+        rows = list(rows)
+        execute_values(cur, insert_query, rows, page_size=batch_size)
+        return len(rows), 0
+    flags = execute_values(cur, insert_query + _ON_CONFLICT, rows, page_size=batch_size, fetch=True)
+    return _count_flags(flags)
+
+def _load_copy(cur, rows, batch_size, upsert):
+    """
+    Streams rows into weather_data with a single COPY FROM STDIN.
+
+    In upsert mode the rows are copied into a temporary staging table first and
+    merged with one INSERT ... SELECT ... ON CONFLICT statement.
+    """
+    stream = _CopyStream(rows, batch_size)
+    if not upsert:
+        cur.copy_expert(f"COPY weather_data ({_COLUMN_LIST}) FROM STDIN WITH (FORMAT csv)", stream)
+        return stream.rows_written, 0
+    cur.execute(
+        f"CREATE TEMP TABLE weather_data_stage ON COMMIT DROP AS "
+        f"SELECT {_COLUMN_LIST} FROM weather_data WITH NO DATA"
+    )
+    cur.copy_expert(f"COPY weather_data_stage ({_COLUMN_LIST}) FROM STDIN WITH (FORMAT csv)", stream)
+    cur.execute(f"""
+        WITH upserted AS (
+            INSERT INTO weather_data ({_COLUMN_LIST})
+            SELECT {_COLUMN_LIST} FROM weather_data_stage
+            {_ON_CONFLICT}
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted)
+          FROM upserted
+    """)
+    return cur.fetchone()
+
+def _dedupe(records):
+    """
+    Keeps the last record per timestamp; ON CONFLICT DO UPDATE cannot touch
+    the same row twice within one statement.
+    """
+    if isinstance(records, WeatherColumns):
+        return records.dedupe()
+    return list({rec["timestamp"]: rec for rec in records}.values())
+
+def _record_span(records):
+    """Returns the first and last day covered by the records, or None if there are none."""
+    if not len(records):
+        return None
+    if isinstance(records, WeatherColumns):
+        return tuple(
+            datetime.fromtimestamp(epoch, timezone.utc).date()
+            for epoch in (min(records.timestamps), max(records.timestamps))
+        )
+    days = [rec["timestamp"][:10] for rec in records]
+    return min(days), max(days)
+
+def load(records, venue_id, method=None, batch_size=None, upsert=None):
     """
     Loads the list of weather records into the PostgreSQL database.
 
-    For each record in the provided list, this function executes an INSERT statement.
-    
+    Three load methods are available:
+      - "copy": streams all records through one COPY FROM STDIN (default).
+      - "values": batched multi-row INSERTs via psycopg2's execute_values.
+      - "row": one INSERT statement per record.
+    If the server refuses COPY (e.g. behind a pooler that does not support it),
+    the load is retried with the "values" method.
+
+    In upsert mode (the default) every method resolves conflicts on the
+    (venue_id, timestamp) unique index with INSERT ... ON CONFLICT DO UPDATE,
+    so re-running an overlapping date range only rewrites changed rows.
+
+    When weather_data is partitioned (sql/schema_partitioned.sql), the
+    partitions covering the records are created first (app.partitions).
+    If any row was inserted or changed, the daily and monthly rollups of the
+    days covered are refreshed in the same transaction (app.rollups).
+
+    With config.QA_VALIDATE_ON_LOAD (opt-in) the batch is first checked in memory
+    against the QA rules (app.qa), and a failing batch is rejected before
+    any database round trip.
+
     Args:
-        records (list): List of dictionaries representing weather records.
+        records (list | WeatherColumns): Records from transform() or the
+            columns from transform_columnar().
         venue_id (str): Identifier for the venue (e.g., a location code).
-    
+        method (str, optional): Load method; defaults to config.LOAD_METHOD.
+        batch_size (int, optional): Rows per COPY chunk / VALUES page;
+            defaults to config.LOAD_BATCH_SIZE.
+        upsert (bool, optional): Merge into existing rows instead of plain
+            INSERTs; defaults to config.LOAD_UPSERT.
+
     Returns:
-        int: The number of rows inserted into the database.
-    
+        LoadResult: Rows loaded, split into inserted, updated and unchanged.
+
+    Raises:
+        QAError: If in-memory validation is enabled and the batch fails it.
+
     Note:
-        The INSERT query columns must match the keys produced by the transform() function.
-    """
-    conn = get_db_connection()  # Create a new database connection.
-    cur = conn.cursor()
-    insert_query = """
-        INSERT INTO weather_data (
-            venue_id, timestamp, temperature_2m, precipitation, snowfall, 
-            cloud_cover, wind_speed_10m, relative_humidity_2m, apparent_temperature, 
-            precipitation_probability, wind_gusts_10m, pressure_msl, wind_direction_10m, 
-            weather_code, rain, surface_pressure
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        The column order is defined by models.WEATHER_COLUMNS, whose names
+        match the keys produced by the transform() function.
     """
-    for rec in records:
-        cur.execute(insert_query, (
-            venue_id,
-            rec["timestamp"],
-            rec["temperature_2m"],
-            rec["precipitation"],
-            rec["snowfall"],
-            rec["cloud_cover"],
-            rec["wind_speed_10m"],
-            rec["relative_humidity_2m"],
-            rec["apparent_temperature"],
-            rec["precipitation_probability"],
-            rec["wind_gusts_10m"],
-            rec["pressure_msl"],
-            rec["wind_direction_10m"],
-            rec["weather_code"],
-            rec["rain"],
-            rec["surface_pressure"]
-        ))
-    conn.commit()
+    with stage("load"):
+        result = _load(records, venue_id, method, batch_size, upsert)
+    ROWS_LOADED.inc(result.inserted, outcome="inserted")
+    ROWS_LOADED.inc(result.updated, outcome="updated")
+    ROWS_LOADED.inc(result.unchanged, outcome="unchanged")
+    return result
+
+def _load(records, venue_id, method, batch_size, upsert):
+    """Does the work of load() with its arguments unresolved."""
+    import psycopg2
+
+    method = method or config.LOAD_METHOD
+    batch_size = batch_size or config.LOAD_BATCH_SIZE
+    upsert = config.LOAD_UPSERT if upsert is None else upsert
+    if method not in LOAD_METHODS:
+        raise ValueError(f"Unknown load method {method!r}; expected one of {LOAD_METHODS}")
+    if upsert:
+        records = _dedupe(records)
+    if config.QA_VALIDATE_ON_LOAD:
+        report = validate_records(records, venue_id)
+        if not report["passed"]:
+            raise QAError(report["violations"])
+
+    with connection() as conn:  # Borrow a pooled database connection.
+        span = _record_span(records)
+        if span is not None:
+            ensure_partitions(conn, *span)
+        cur = conn.cursor()
+        rows = _record_rows(records, venue_id)
+        if method == "copy":
+            try:
+                inserted, updated = _load_copy(cur, rows, batch_size, upsert)
+            except psycopg2.NotSupportedError:
+                conn.rollback()
+                cur = conn.cursor()
+                inserted, updated = _load_values(cur, _record_rows(records, venue_id), batch_size, upsert)
+        elif method == "values":
+            inserted, updated = _load_values(cur, rows, batch_size, upsert)
+        else:
+            inserted, updated = _load_row_by_row(cur, rows, upsert)
+        if config.ROLLUPS_ENABLED and span is not None and (inserted or updated):
+            refresh_rollups(cur, venue_id, *span)
+        conn.commit()
+        cur.close()
     count = len(records)
-    cur.close()
-    conn.close()
-    return count
+    return LoadResult(count, inserted, updated, count - inserted - updated)
+
+class PipelineError(Exception):
+    """
+    Raised when a chunk fails part-way through a run.
+
+    Chunks before the failing one are already committed; their combined
+    LoadResult is available as .result, the per-venue results of a shared
+    run as .results and the failing range as .failed_range.
+    """
+
+    def __init__(self, message, result, failed_range, results=None):
+        super().__init__(message)
+        self.result = result
+        self.failed_range = failed_range
+        self.results = results or {}
+
+def venue_cell(venue_ids):
+    """
+    Looks up the grid cell shared by venue_ids in the venue registry.
+
+    Returns:
+        tuple: (lat, lon) to extract for all of the venues.
+
+    Raises:
+        UnknownVenueError: If a venue is not registered.
+        ValueError: If the venues fall into different grid cells.
+    """
+    cells = get_registry().group_by_cell(venue_ids)
+    if len(cells) != 1:
+        raise ValueError(f"Venues {list(venue_ids)} do not share a grid cell")
+    return next(iter(cells))
+
+def plan_chunks(venue_id, start_date, end_date, incremental=False, chunk_days=None):
+    """
+    Returns the (first_day, last_day) chunks a run has to extract.
+
+    A full run covers the whole range. An incremental run covers only the
+    days of the range that are not complete in weather_data yet, so a range
+    that is mostly loaded costs one grouped index scan and a small fetch.
+    """
+    chunk_days = chunk_days or config.PIPELINE_CHUNK_DAYS
+    if not incremental:
+        return split_date_range(start_date, end_date, chunk_days)
+    return [
+        chunk
+        for first, last in missing_day_ranges(venue_id, start_date, end_date)
+        for chunk in split_date_range(first, last, chunk_days)
+    ]
+
+def _iter_chunks(venue_ids, lat, lon, ranges):
+    """
+    Extracts and transforms each chunk once, then loads it for every venue.
+
+    Yields:
+        tuple: (first_day, last_day, {venue_id: LoadResult}).
+    """
+    for first, last in ranges:
+        records = extract_transformed(lat, lon, first, last, venue_ids)
+        yield first, last, {venue_id: load(records, venue_id) for venue_id in venue_ids}
+
+def iter_pipeline(venue_id, start_date, end_date, chunk_days=None):
+    """
+    Streams the ETL process one date-range chunk at a time.
+
+    Each chunk of config.PIPELINE_CHUNK_DAYS days is extracted, transformed
+    and loaded (and committed) before the next one is requested, so peak memory
+    depends on the chunk size rather than on the length of the range.
+
+    Args:
+        venue_id (str): Identifier for the venue.
+        start_date (str): Start date in 'YYYY-MM-DD' format.
+        end_date (str): End date in 'YYYY-MM-DD' format.
+        chunk_days (int, optional): Defaults to config.PIPELINE_CHUNK_DAYS.
+
+    Returns:
+        iterator: (first_day, last_day, LoadResult) for every committed chunk.
+
+    Raises:
+        UnknownVenueError: If the venue is not registered.
+    """
+    lat, lon = venue_cell([venue_id])
+    ranges = split_date_range(start_date, end_date, chunk_days or config.PIPELINE_CHUNK_DAYS)
+    chunks = _iter_chunks([venue_id], lat, lon, ranges)
+    return ((first, last, results[venue_id]) for first, last, results in chunks)
+
+def _drive(venue_ids, start_date, end_date, on_chunk, incremental=False):
+    """
+    Runs _iter_chunks() to completion for venues sharing one grid cell.
+
+    Returns:
+        dict: venue_id -> LoadResult summed over all chunks.
+    """
+    lat, lon = venue_cell(venue_ids)
+    ranges = plan_chunks(venue_ids[0], start_date, end_date, incremental)
+    chunks = _iter_chunks(venue_ids, lat, lon, ranges)
+    totals = {venue_id: LoadResult() for venue_id in venue_ids}
+    for index in itertools.count():
+        try:
+            first, last, results = next(chunks)
+        except StopIteration:
+            return totals
+        except Exception as e:
+            total = sum(totals.values(), LoadResult())
+            raise PipelineError(
+                f"Pipeline failed after {total.rows_loaded} rows: {e}", total, ranges[index], totals
+            ) from e
+        for venue_id, result in results.items():
+            totals[venue_id] += result
+        if on_chunk is not None:
+            on_chunk(first, last, sum(results.values(), LoadResult()))
+
+def _clip(records, start_date, end_date):
+    """Drops the rows of an archive that fall outside [start_date, end_date]."""
+    lower, upper = (int(bound.timestamp()) for bound in window_bounds(start_date, end_date))
+    timestamps = records.timestamps
+    if not len(records) or (lower <= min(timestamps) and max(timestamps) < upper):
+        return records
+    return records.take([i for i, ts in enumerate(timestamps) if lower <= ts < upper])
+
+def replay_archives(venue_id, start_date, end_date, on_chunk=None, workers=None):
+    """
+    Rebuilds a venue's rows from landed raw responses (app.landing) without
+    network access.
+
+    Archives are decompressed and decoded into WeatherColumns on a pool of
+    worker processes, a few ahead of the loader, while this process
+    bulk-loads them in order (one COPY and commit per archive). Rows outside
+    the range are skipped; days no archive covers are logged.
+
+    Args:
+        venue_id (str): Identifier for the venue.
+        start_date (str | date): First day to rebuild.
+        end_date (str | date): Last day to rebuild (inclusive).
+        on_chunk (callable, optional): Called as on_chunk(first, last, result)
+            after each archive is committed.
+        workers (int, optional): Decoding processes; defaults to
+            config.REPLAY_WORKERS (1 decodes in this process).
 
-def run_pipeline(venue_id, start_date, end_date):
+    Returns:
+        LoadResult: Rows loaded, split into inserted, updated and unchanged.
+
+    Raises:
+        ValueError: If raw landing is disabled (RAW_LANDING_DIR is empty).
+        PipelineError: If an archive fails; earlier archives stay committed.
+    """
+    landing = get_landing()
+    if landing is None:
+        raise ValueError("Replay needs raw landing; set RAW_LANDING_DIR")
+    start, end = as_date(start_date), as_date(end_date)
+    archives = landing.list(venue_id, start, end)
+    covered = {day.isoformat() for first, last, _ in archives for day in iter_days(first, last)}
+    for first, last in missing_ranges(start, end, covered):
+        logger.warning(f"No landed responses for {venue_id} {first}..{last}; those days are not replayed")
+
+    workers = workers or config.REPLAY_WORKERS
+    pool = ProcessPoolExecutor(workers) if workers > 1 and len(archives) > 1 else None
+    total = LoadResult()
+
+    def replay_one(archive, decoded):
+        first, last, path = archive
+        try:
+            records = decoded.result() if pool is not None else read_columns(path)
+            ROWS_TRANSFORMED.inc(len(records))
+            result = load(_clip(records, start, end), venue_id)
+        except Exception as e:
+            raise PipelineError(
+                f"Replay failed at {path} after {total.rows_loaded} rows: {e}", total, (first, last)
+            ) from e
+        if on_chunk is not None:
+            on_chunk(first, last, result)
+        return result
+
+    pending = deque()
+    try:
+        for archive in archives:
+            pending.append((archive, pool.submit(read_columns, archive[2]) if pool is not None else None))
+            if len(pending) > workers:
+                total += replay_one(*pending.popleft())
+        while pending:
+            total += replay_one(*pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return total
+
+def run_pipeline(venue_id, start_date, end_date, on_chunk=None, incremental=False, replay=False):
     """
     Orchestrates the full ETL process.
 
-    It extracts weather data (using hardcoded coordinates for demonstration),
-    transforms the raw data into structured records, and loads them into the database.
+    It looks up the venue's coordinates in the venue registry, extracts
+    weather data for its grid cell, transforms the raw data into structured
+    records, and loads them into the database, streaming the range chunk by
+    chunk (planned by plan_chunks()) with a commit per chunk. With replay,
+    the rows are rebuilt from landed responses instead, without network
+    access.
 
     Args:
         venue_id (str): Identifier for the venue.
         start_date (str): Start date in 'YYYY-MM-DD' format.
         end_date (str): End date in 'YYYY-MM-DD' format.
-    
+        on_chunk (callable, optional): Called as on_chunk(first, last, result)
+            after each chunk is committed.
+        incremental (bool): Only extract the days that are not complete in
+            weather_data yet, and extend the venue's high-water mark when the
+            range continues it (only sync_venue() creates a mark).
+        replay (bool): Reload the range from the raw landing
+            (config.RAW_LANDING_DIR) through replay_archives().
+
+    Returns:
+        LoadResult: Rows loaded, split into inserted, updated and unchanged;
+        with replay, the result of replay_archives().
+
+    Raises:
+        UnknownVenueError: If the venue is not registered.
+        ValueError: If replay is combined with incremental, or replay is
+            requested while raw landing is disabled.
+        PipelineError: If a chunk fails; earlier chunks stay committed.
+    """
+    if replay:
+        if incremental:
+            raise ValueError("replay and incremental cannot be combined")
+        return replay_archives(venue_id, start_date, end_date, on_chunk)
+    result = _drive([venue_id], start_date, end_date, on_chunk, incremental)[venue_id]
+    if incremental:
+        advance_high_water_mark(venue_id, start_date, end_date)
+    return result
+
+def sync_venue(venue_id, start_date=None, on_chunk=None, today=None):
+    """
+    Brings a venue up to yesterday.
+
+    With a high-water mark this reads one venue_sync_state row and extracts
+    only the days after the mark; a first sync runs incrementally from
+    start_date, skipping days that are already complete, and seeds the mark
+    there.
+
+    Args:
+        venue_id (str): Identifier for the venue.
+        start_date (str, optional): Where a first sync starts; ignored once
+            the venue has a high-water mark.
+        on_chunk (callable, optional): Called as on_chunk(first, last, result)
+            after each chunk is committed.
+        today (date, optional): Overrides the current UTC date.
+
     Returns:
-        int: The total number of rows inserted into the database.
-    """
-    # Fixed coordinates are used here (representing, e.g., New York City).
-    lat, lon = 40.71, -74.01  
-    data = extract_weather_data(lat, lon, start_date, end_date)
-    records = transform(data)
-    inserted_count = load(records, venue_id)
-    return inserted_count
+        dict: 'venue_id', the synced 'start_date'/'end_date' (null when
+        already up to date), 'synced_through' and the LoadResult counts.
+
+    Raises:
+        UnknownVenueError: If the venue is not registered.
+        ValueError: If the venue was never synced and no start_date is given.
+        PipelineError: If a chunk fails; earlier chunks stay committed.
+    """
+    window = sync_window(venue_id, start_date, today)
+    result = LoadResult()
+    synced_through = None
+    if window is not None:
+        first, last, from_mark = window
+        # A first sync may overlap data loaded by earlier backfills, so it
+        # skips complete days; a window starting at the mark is fetched whole.
+        result = _drive([venue_id], first, last, on_chunk, incremental=not from_mark)[venue_id]
+        synced_through = advance_high_water_mark(venue_id, first, last, today, seed=True)
+    else:
+        synced_through = get_high_water_mark(venue_id)
+    report = {
+        "venue_id": venue_id,
+        "start_date": str(window[0]) if window else None,
+        "end_date": str(window[1]) if window else None,
+        "synced_through": str(synced_through) if synced_through else None,
+    }
+    report.update(result.as_dict())
+    return report
+
+def run_pipeline_shared(venue_ids, start_date, end_date, on_chunk=None):
+    """
+    Runs the pipeline once for several venues in the same grid cell.
+
+    Every chunk is extracted and transformed once and the result is loaded
+    for each venue, so clustered venues cost a single set of API calls.
+
+    Args:
+        venue_ids (list): Venues sharing one grid cell (see venues.grid_cell).
+        start_date (str): Start date in 'YYYY-MM-DD' format.
+        end_date (str): End date in 'YYYY-MM-DD' format.
+        on_chunk (callable, optional): Called as on_chunk(first, last, result)
+            with the chunk's LoadResult summed over the venues.
+
+    Returns:
+        dict: venue_id -> LoadResult.
+
+    Raises:
+        UnknownVenueError: If a venue is not registered.
+        ValueError: If the venues do not share a grid cell.
+        PipelineError: If a chunk fails; earlier chunks stay committed.
+    """
+    return _drive(list(venue_ids), start_date, end_date, on_chunk)
+
+def _land_and_load(data, venue_id, first, last):
+    """Lands a decoded response (when enabled), then transforms and loads it."""
+    landing = get_landing()
+    if landing is not None:
+        landing.put([venue_id], first, last, dumps(data))
+    return load(_transform_content(data), venue_id)
+
+async def run_pipeline_async(venue_id, start_date, end_date, on_chunk=None, incremental=False):
+    """
+    Async variant of run_pipeline() for the FastAPI endpoint.
+
+    Extraction runs on the event loop with concurrent chunked requests; the
+    CPU-bound transform and the blocking database load run in a worker thread.
+    While one chunk is being loaded the next one is already being fetched, and
+    at most config.PIPELINE_BUFFER_CHUNKS fetched chunks wait for the loader,
+    which bounds memory regardless of the length of the range.
+
+    Args:
+        venue_id (str): Identifier for the venue.
+        start_date (str): Start date in 'YYYY-MM-DD' format.
+        end_date (str): End date in 'YYYY-MM-DD' format.
+        on_chunk (callable, optional): Called as on_chunk(first, last, result)
+            after each chunk is committed.
+        incremental (bool): As for run_pipeline().
+
+    Returns:
+        LoadResult: Rows loaded, split into inserted, updated and unchanged.
+
+    Raises:
+        UnknownVenueError: If the venue is not registered.
+        PipelineError: If a chunk fails; earlier chunks stay committed.
+    """
+    lat, lon = await asyncio.to_thread(venue_cell, [venue_id])
+    ranges = await asyncio.to_thread(plan_chunks, venue_id, start_date, end_date, incremental)
+    queue = asyncio.Queue(maxsize=config.PIPELINE_BUFFER_CHUNKS)
+    done = object()
+
+    async def produce():
+        for first, last in ranges:
+            try:
+                data = await extract_weather_data_async(lat, lon, first, last)
+            except Exception as e:
+                await queue.put((first, last, e))
+                return
+            await queue.put((first, last, data))
+        await queue.put(done)
+
+    producer = asyncio.create_task(produce())
+    total = LoadResult()
+    try:
+        while (item := await queue.get()) is not done:
+            first, last, data = item
+            if isinstance(data, Exception):
+                raise PipelineError(
+                    f"Pipeline failed after {total.rows_loaded} rows: {data}", total, (first, last)
+                ) from data
+            try:
+                result = await asyncio.to_thread(_land_and_load, data, venue_id, first, last)
+            except Exception as e:
+                raise PipelineError(
+                    f"Pipeline failed after {total.rows_loaded} rows: {e}", total, (first, last)
+                ) from e
+            del data, item
+            total += result
+            if on_chunk is not None:
+                on_chunk(first, last, result)
+    finally:
+        producer.cancel()
+    if incremental:
+        await asyncio.to_thread(advance_high_water_mark, venue_id, start_date, end_date)
+    return total
@@ -0,0 +1,184 @@
+"""
+qa.py - Set-Based Data Quality Checks
+
+Every QA rule is either a NOT NULL check on a key column or an inclusive
+range check on an hourly field (NULL values pass range checks). The rules
+are evaluated in two places:
+
+  - run_qa() checks stored rows with a single aggregated scan: one
+    COUNT(*) FILTER (WHERE ...) per rule, optionally limited to one venue
+    and/or time window, e.g. the rows a pipeline run just loaded.
+  - validate_records() checks a batch in memory, so load() can reject a bad
+    batch before it reaches the database when config.QA_VALIDATE_ON_LOAD is
+    switched on (it is off by default).
+
+sql/qa_checks.sql is the same single-pass query for ad-hoc use in psql.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+
+from app.cache import as_date
+from app.columns import WeatherColumns
+from app.db import connection
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One QA rule: column must not be NULL (not_null) or lie in [minimum, maximum].
+    """
+
+    name: str
+    column: str
+    minimum: float = None
+    maximum: float = None
+    not_null: bool = False
+
+    def condition(self):
+        """Returns the SQL condition matching violating rows."""
+        from psycopg2 import sql
+
+        column = sql.Identifier(self.column)
+        if self.not_null:
+            return sql.SQL("{} IS NULL").format(column)
+        parts = []
+        if self.minimum is not None:
+            parts.append(sql.SQL("{} < {}").format(column, sql.Literal(self.minimum)))
+        if self.maximum is not None:
+            parts.append(sql.SQL("{} > {}").format(column, sql.Literal(self.maximum)))
+        return sql.SQL(" OR ").join(parts)
+
+    def violates(self, value):
+        """Returns whether one value breaks the rule."""
+        if value is None:
+            return self.not_null
+        return (self.minimum is not None and value < self.minimum) or \
+            (self.maximum is not None and value > self.maximum)
+
+RULES = (
+    Rule("venue_id_not_null", "venue_id", not_null=True),
+    Rule("timestamp_not_null", "timestamp", not_null=True),
+    Rule("temperature_2m_range", "temperature_2m", -50, 60),                    # °C
+    Rule("precipitation_range", "precipitation", 0),                            # mm
+    Rule("snowfall_range", "snowfall", 0),                                      # cm
+    Rule("cloud_cover_range", "cloud_cover", 0, 100),                           # %
+    Rule("wind_speed_10m_range", "wind_speed_10m", 0),                          # m/s
+    Rule("relative_humidity_2m_range", "relative_humidity_2m", 0, 100),         # %
+    Rule("apparent_temperature_range", "apparent_temperature", -80, 70),        # °C
+    Rule("precipitation_probability_range", "precipitation_probability", 0, 100),  # %
+    Rule("wind_gusts_10m_range", "wind_gusts_10m", 0),                          # m/s
+    Rule("pressure_msl_range", "pressure_msl", 800, 1100),                      # hPa
+    Rule("wind_direction_10m_range", "wind_direction_10m", 0, 360),             # °
+    Rule("weather_code_range", "weather_code", 0),                              # WMO code
+    Rule("rain_range", "rain", 0),                                              # mm
+    Rule("surface_pressure_range", "surface_pressure", 300, 1100),              # hPa, high altitude included
+)
+
+class QAError(ValueError):
+    """Raised by load() when a batch fails in-memory validation."""
+
+    def __init__(self, violations):
+        failing = ", ".join(f"{name}={count}" for name, count in violations.items() if count)
+        super().__init__(f"QA validation failed: {failing}")
+        self.violations = violations
+
+def build_query(table="weather_data", rules=RULES, venue_id=None, start_date=None, end_date=None):
+    """
+    Builds the single-pass QA query and its parameters.
+
+    The result row is COUNT(*) of the scoped rows followed by one FILTER
+    count per rule.
+
+    Returns:
+        tuple: (psycopg2.sql.Composed, params dict).
+    """
+    from psycopg2 import sql
+
+    counts = [
+        sql.SQL("COUNT(*) FILTER (WHERE {}) AS {}").format(rule.condition(), sql.Identifier(rule.name))
+        for rule in rules
+    ]
+    scope = []
+    params = {}
+    if venue_id is not None:
+        scope.append(sql.SQL("venue_id = %(venue_id)s"))
+        params["venue_id"] = venue_id
+    if start_date is not None:
+        scope.append(sql.SQL("timestamp >= %(lower)s"))
+        params["lower"] = datetime.combine(as_date(start_date), time(), tzinfo=timezone.utc)
+    if end_date is not None:
+        scope.append(sql.SQL("timestamp < %(upper)s"))
+        params["upper"] = datetime.combine(as_date(end_date) + timedelta(days=1), time(), tzinfo=timezone.utc)
+    where = sql.SQL(" WHERE ") + sql.SQL(" AND ").join(scope) if scope else sql.SQL("")
+    query = sql.SQL("SELECT COUNT(*) AS {}, {} FROM {}{}").format(
+        sql.Identifier("rows"), sql.SQL(", ").join(counts), sql.Identifier(table), where
+    )
+    return query, params
+
+def _report(rows, counts, rules):
+    violations = dict(zip((rule.name for rule in rules), counts))
+    return {"rows": rows, "violations": violations, "passed": not any(counts)}
+
+def run_qa(venue_id=None, start_date=None, end_date=None, table="weather_data", conn=None, rules=RULES):
+    """
+    Checks stored rows against every rule in one scan.
+
+    Args:
+        venue_id (str, optional): Only check this venue's rows.
+        start_date (date | str, optional): First UTC day to check.
+        end_date (date | str, optional): Last UTC day to check, inclusive.
+        table (str): Table or partition to scan.
+        conn (optional): Connection to use; defaults to a pooled one.
+        rules (tuple): Rules to evaluate.
+
+    Returns:
+        dict: 'rows' checked, 'violations' (rule name -> count) and 'passed'.
+    """
+    query, params = build_query(table, rules, venue_id, start_date, end_date)
+    if conn is not None:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            rows, *counts = cur.fetchone()
+        return _report(rows, counts, rules)
+    with connection() as pooled:
+        report = run_qa(venue_id, start_date, end_date, table, pooled, rules)
+        pooled.rollback()
+    return report
+
+def _count_column(values, nulls, rule):
+    """Counts violations in one column array with its null mask."""
+    if rule.not_null:
+        return sum(nulls)
+    if not any(nulls) and len(values):
+        # Common case: bounds checked in C via min()/max().
+        if (rule.minimum is None or min(values) >= rule.minimum) and \
+                (rule.maximum is None or max(values) <= rule.maximum):
+            return 0
+    return sum(1 for value, null in zip(values, nulls) if not null and rule.violates(value))
+
+def validate_records(records, venue_id="", rules=RULES):
+    """
+    Checks a batch in memory before it is loaded.
+
+    Args:
+        records (list | WeatherColumns): Records from transform() or the
+            columns from transform_columnar().
+        venue_id (str): Venue the batch will be loaded for.
+        rules (tuple): Rules to evaluate.
+
+    Returns:
+        dict: 'rows' checked, 'violations' (rule name -> count) and 'passed'.
+    """
+    n = len(records)
+    counts = []
+    for rule in rules:
+        if rule.column == "venue_id":
+            counts.append(0 if venue_id else n)
+        elif isinstance(records, WeatherColumns):
+            if rule.column == "timestamp":
+                counts.append(0)  # parsed timestamps are never null
+            else:
+                counts.append(_count_column(records.values[rule.column], records.nulls[rule.column], rule))
+        else:
+            counts.append(sum(1 for rec in records if rule.violates(rec.get(rule.column))))
+    return _report(n, counts, rules)
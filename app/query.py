@@ -0,0 +1,124 @@
+"""
+query.py - Read Access to Stored Weather Data
+
+Pages through weather_data for one venue and time window in timestamp order.
+Pagination is keyset-based: each page ends with the last row's timestamp,
+and the next page asks for rows strictly after it ("after"). That keeps every
+page an index range scan on the (venue_id, timestamp) unique index, however
+deep into the window the client is, unlike OFFSET.
+
+Rows are read through a server-side (named) cursor in batches of
+config.QUERY_FETCH_SIZE, so a large page is streamed to the client rather
+than materialized in memory.
+"""
+
+import json
+from datetime import datetime, time, timedelta, timezone
+
+from app import config
+from app.db import connection
+from app.models import HOURLY_FIELDS
+
+def parse_fields(fields):
+    """
+    Validates a field selection.
+
+    Args:
+        fields (str | list | None): Comma-separated names or a list of names
+            from HOURLY_FIELDS; None or empty selects all of them.
+
+    Returns:
+        tuple: The selected fields in the order requested.
+
+    Raises:
+        ValueError: For names that are not hourly weather fields.
+    """
+    if not fields:
+        return HOURLY_FIELDS
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    fields = tuple(dict.fromkeys(f.strip() for f in fields if f.strip()))
+    unknown = [f for f in fields if f not in HOURLY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or HOURLY_FIELDS
+
+def _utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def window_bounds(start_date, end_date):
+    """Returns the [start, end) UTC timestamps covering whole days start_date..end_date."""
+    lower = datetime.combine(start_date, time(), tzinfo=timezone.utc)
+    upper = datetime.combine(end_date + timedelta(days=1), time(), tzinfo=timezone.utc)
+    return lower, upper
+
+def build_query(fields, after=None):
+    """Builds the keyset page query for the selected fields."""
+    from psycopg2 import sql
+
+    columns = sql.SQL(", ").join(sql.Identifier(f) for f in ("timestamp",) + tuple(fields))
+    keyset = sql.SQL(" AND timestamp > %(after)s") if after is not None else sql.SQL("")
+    return sql.SQL(
+        "SELECT {columns} FROM weather_data "
+        "WHERE venue_id = %(venue_id)s AND timestamp >= %(lower)s AND timestamp < %(upper)s{keyset} "
+        "ORDER BY timestamp LIMIT %(limit)s"
+    ).format(columns=columns, keyset=keyset)
+
+def iter_weather(venue_id, start_date, end_date, fields=HOURLY_FIELDS, after=None, limit=None):
+    """
+    Yields one page of stored rows as (timestamp, value, ...) tuples.
+
+    Args:
+        venue_id (str): Venue to read.
+        start_date (date): First day of the window (UTC).
+        end_date (date): Last day of the window, inclusive (UTC).
+        fields (tuple): Columns to return after the timestamp.
+        after (datetime, optional): Keyset cursor; only rows strictly after it.
+        limit (int, optional): Page size (defaults to config.QUERY_PAGE_SIZE).
+
+    Yields:
+        tuple: timestamp followed by the selected field values.
+    """
+    lower, upper = window_bounds(start_date, end_date)
+    params = {
+        "venue_id": venue_id, "lower": lower, "upper": upper,
+        "after": _utc(after) if after is not None else None,
+        "limit": limit or config.QUERY_PAGE_SIZE,
+    }
+    with connection() as conn:
+        # Named cursors live inside a transaction; the read is finished with a
+        # rollback so the pooled connection goes back idle.
+        with conn.cursor(name="weather_query") as cur:
+            cur.itersize = config.QUERY_FETCH_SIZE
+            cur.execute(build_query(fields, after), params)
+            yield from cur
+        conn.rollback()
+
+def stream_page_json(venue_id, start_date, end_date, fields=HOURLY_FIELDS, after=None, limit=None, rows=None):
+    """
+    Encodes one page as a JSON document, chunk by chunk.
+
+    The document is {"venue_id", "fields", "rows": [{"timestamp", field...}],
+    "next_after"}; "next_after" is the timestamp to pass as the next page's
+    "after", or null once the window is exhausted.
+
+    Args:
+        rows (iterable, optional): Row source; defaults to iter_weather().
+    """
+    limit = limit or config.QUERY_PAGE_SIZE
+    if rows is None:
+        rows = iter_weather(venue_id, start_date, end_date, fields, after, limit)
+    names = ("timestamp",) + tuple(fields)
+    yield '{"venue_id": %s, "fields": %s, "rows": [' % (json.dumps(venue_id), json.dumps(list(fields)))
+    count = 0
+    last = None
+    for row in rows:
+        last = row[0].isoformat()
+        record = dict(zip(names, row))
+        record["timestamp"] = last
+        yield ("," if count else "") + json.dumps(record)
+        count += 1
+    next_after = last if count == limit else None
+    yield '], "count": %d, "next_after": %s}' % (count, json.dumps(next_after))
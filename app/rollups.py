@@ -0,0 +1,203 @@
+"""
+rollups.py - Daily and Monthly Aggregate Rollups
+
+weather_daily and weather_monthly hold per-venue aggregates (temperature
+min/max/mean, precipitation, rain and snowfall totals, maximum gusts) of the
+hourly rows in weather_data. load() calls refresh_rollups() for just the
+days it wrote, in the same transaction as the write, so the rollups are
+always consistent with the raw rows and never rebuilt from scratch.
+partitions.drop_partitions() removes the rollups of the days it retires
+with delete_rollups().
+
+aggregates() serves a window from the rollups. Days without a rollup row
+(e.g. loaded before the tables existed) are aggregated from the raw rows,
+and months only partly inside the window are combined from their days.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+
+from app.cache import as_date, iter_days, missing_ranges
+from app.db import connection
+
+GRANULARITIES = ("day", "month")
+
+# Columns shared by both rollup tables, in output order.
+AGGREGATE_FIELDS = (
+    "hours", "temperature_min", "temperature_max", "temperature_mean", "temperature_hours",
+    "precipitation_sum", "rain_sum", "snowfall_sum", "wind_gusts_max",
+)
+
+_RAW_AGGREGATES = """
+    COUNT(*), MIN(temperature_2m), MAX(temperature_2m), AVG(temperature_2m), COUNT(temperature_2m),
+    SUM(precipitation), SUM(rain), SUM(snowfall), MAX(wind_gusts_10m)
+"""
+
+_DAILY_AGGREGATES = """
+    SUM(hours), MIN(temperature_min), MAX(temperature_max),
+    SUM(temperature_mean * temperature_hours) / NULLIF(SUM(temperature_hours), 0), SUM(temperature_hours),
+    SUM(precipitation_sum), SUM(rain_sum), SUM(snowfall_sum), MAX(wind_gusts_max)
+"""
+
+_FIELD_LIST = ", ".join(AGGREGATE_FIELDS)
+_UPDATE_LIST = ", ".join(f"{field} = EXCLUDED.{field}" for field in AGGREGATE_FIELDS)
+
+_REFRESH_DAILY = f"""
+    INSERT INTO weather_daily (venue_id, day, {_FIELD_LIST})
+    SELECT venue_id, (timestamp AT TIME ZONE 'UTC')::date AS day, {_RAW_AGGREGATES}
+      FROM weather_data
+     WHERE venue_id = %(venue_id)s AND timestamp >= %(lower)s AND timestamp < %(upper)s
+     GROUP BY venue_id, day
+    ON CONFLICT (venue_id, day) DO UPDATE SET {_UPDATE_LIST}
+"""
+
+_REFRESH_MONTHLY = f"""
+    INSERT INTO weather_monthly (venue_id, month, days, {_FIELD_LIST})
+    SELECT venue_id, date_trunc('month', day)::date AS month, COUNT(*), {_DAILY_AGGREGATES}
+      FROM weather_daily
+     WHERE venue_id = %(venue_id)s AND day >= %(first_month)s AND day < %(after_month)s
+     GROUP BY venue_id, month
+    ON CONFLICT (venue_id, month) DO UPDATE SET days = EXCLUDED.days, {_UPDATE_LIST}
+"""
+
+def _utc(day):
+    return datetime.combine(day, time(), tzinfo=timezone.utc)
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+def next_month(day):
+    return date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+
+def refresh_rollups(cur, venue_id, first_day, last_day):
+    """
+    Recomputes the rollup rows of the days in [first_day, last_day] and of
+    the months containing them, inside the caller's transaction.
+    """
+    first_day, last_day = as_date(first_day), as_date(last_day)
+    cur.execute(_REFRESH_DAILY, {
+        "venue_id": venue_id, "lower": _utc(first_day), "upper": _utc(last_day + timedelta(days=1)),
+    })
+    cur.execute(_REFRESH_MONTHLY, {
+        "venue_id": venue_id, "first_month": month_start(first_day), "after_month": next_month(last_day),
+    })
+
+def delete_rollups(cur, first_day, end_day):
+    """
+    Deletes every venue's rollup rows for the days in [first_day, end_day)
+    and the months starting in it, inside the caller's transaction.
+
+    Args:
+        first_day (date | None): First day; None for everything before end_day.
+        end_day (date): Exclusive end.
+    """
+    first_day = as_date(first_day) if first_day is not None else date.min
+    end_day = as_date(end_day)
+    cur.execute("DELETE FROM weather_daily WHERE day >= %s AND day < %s", (first_day, end_day))
+    cur.execute("DELETE FROM weather_monthly WHERE month >= %s AND month < %s", (first_day, end_day))
+
+def _row(period, values, source):
+    row = {"period": period.isoformat()}
+    row.update(zip(AGGREGATE_FIELDS, (float(v) if v is not None and not isinstance(v, int) else v
+                                      for v in values)))
+    row["source"] = source
+    return row
+
+def combine(period, rows):
+    """
+    Combines per-day aggregate rows into one row for period.
+
+    The mean temperature is weighted by the hours that had a temperature.
+    """
+    def values(field):
+        return [row[field] for row in rows if row[field] is not None]
+
+    def total(field):
+        present = values(field)
+        return sum(present) if present else None
+
+    temperature_hours = sum(row["temperature_hours"] for row in rows)
+    weighted = [row["temperature_mean"] * row["temperature_hours"] for row in rows if row["temperature_mean"] is not None]
+    combined = {
+        "period": period.isoformat(),
+        "hours": sum(row["hours"] for row in rows),
+        "temperature_min": min(values("temperature_min"), default=None),
+        "temperature_max": max(values("temperature_max"), default=None),
+        "temperature_mean": sum(weighted) / temperature_hours if temperature_hours else None,
+        "temperature_hours": temperature_hours,
+        "precipitation_sum": total("precipitation_sum"),
+        "rain_sum": total("rain_sum"),
+        "snowfall_sum": total("snowfall_sum"),
+        "wind_gusts_max": max(values("wind_gusts_max"), default=None),
+    }
+    combined["source"] = rows[0]["source"] if len({row["source"] for row in rows}) == 1 else "mixed"
+    return combined
+
+def _daily(cur, venue_id, first_day, last_day):
+    """Per-day rows from weather_daily, with raw fallback for days it lacks."""
+    cur.execute(
+        f"SELECT day, {_FIELD_LIST} FROM weather_daily "
+        "WHERE venue_id = %s AND day >= %s AND day <= %s ORDER BY day",
+        (venue_id, first_day, last_day),
+    )
+    rows = {day: _row(day, values, "rollup") for day, *values in cur.fetchall()}
+    for gap_first, gap_last in missing_ranges(first_day, last_day, {d.isoformat() for d in rows}):
+        cur.execute(
+            f"SELECT (timestamp AT TIME ZONE 'UTC')::date AS day, {_RAW_AGGREGATES} FROM weather_data "
+            "WHERE venue_id = %s AND timestamp >= %s AND timestamp < %s GROUP BY day",
+            (venue_id, _utc(gap_first), _utc(gap_last + timedelta(days=1))),
+        )
+        rows.update({day: _row(day, values, "raw") for day, *values in cur.fetchall()})
+    return [rows[day] for day in sorted(rows)]
+
+def aggregates(venue_id, start_date, end_date, granularity="day"):
+    """
+    Returns per-day or per-month aggregates for a venue and UTC day window.
+
+    Args:
+        venue_id (str): Venue to aggregate.
+        start_date (date | str): First day of the window.
+        end_date (date | str): Last day of the window, inclusive.
+        granularity (str): "day" or "month".
+
+    Returns:
+        list: Dicts with 'period' (the day, or the first day of the month),
+        the AGGREGATE_FIELDS and 'source' ("rollup", "raw" or "mixed").
+        Months are limited to the days inside the window.
+
+    Raises:
+        ValueError: For an unknown granularity.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}; expected one of {GRANULARITIES}")
+    start_date, end_date = as_date(start_date), as_date(end_date)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            if granularity == "day":
+                result = _daily(cur, venue_id, start_date, end_date)
+            else:
+                result = _monthly(cur, venue_id, start_date, end_date)
+        conn.rollback()
+    return result
+
+def _monthly(cur, venue_id, start_date, end_date):
+    # Months wholly inside the window come from weather_monthly.
+    first_full = start_date if start_date.day == 1 else next_month(start_date)
+    after_full = month_start(end_date + timedelta(days=1))
+    months = {}
+    if first_full < after_full:
+        cur.execute(
+            f"SELECT month, {_FIELD_LIST} FROM weather_monthly "
+            "WHERE venue_id = %s AND month >= %s AND month < %s",
+            (venue_id, first_full, after_full),
+        )
+        months = {month: _row(month, values, "rollup") for month, *values in cur.fetchall()}
+    # Partial months, and months without a rollup row, are combined from days.
+    by_month = {}
+    for day in iter_days(start_date, end_date):
+        if month_start(day) not in months:
+            by_month.setdefault(month_start(day), []).append(day)
+    for month, days in by_month.items():
+        rows = _daily(cur, venue_id, days[0], days[-1])
+        if rows:
+            months[month] = combine(month, rows)
+    return [months[month] for month in sorted(months)]
@@ -0,0 +1,155 @@
+"""
+sync.py - Incremental Sync State
+
+Helpers behind run_pipeline(..., incremental=True) and sync_venue():
+
+  - complete_days() asks weather_data which days of a window already have
+    all 24 hours for a venue (one grouped range scan on the
+    (venue_id, timestamp) index), so only the missing days are extracted.
+  - The venue_sync_state table keeps a per-venue high-water mark: the last
+    day through which the venue's data is known to be complete. A daily
+    "sync to yesterday" reads that one row and fetches only the days after it.
+    Only sync_venue() seeds a mark, from its start date. Every advance is
+    checked against complete_days().
+
+Days newer than config.SYNC_SETTLE_DAYS are never treated as complete and
+never advance the high-water mark: the archive may still revise them, so
+they are fetched again until they settle.
+"""
+
+from datetime import datetime, time, timedelta, timezone
+
+from app import config
+from app.cache import as_date, missing_ranges
+from app.db import connection
+
+HOURS_PER_DAY = 24
+
+def settled_through(today=None):
+    """Returns the last day whose archive values are no longer revised."""
+    today = today or datetime.now(timezone.utc).date()
+    return today - timedelta(days=config.SYNC_SETTLE_DAYS)
+
+def complete_days(venue_id, start_date, end_date):
+    """
+    Returns the days in [start_date, end_date] stored with every hour present.
+
+    Returns:
+        set: 'YYYY-MM-DD' strings.
+    """
+    start_date, end_date = as_date(start_date), as_date(end_date)
+    lower = datetime.combine(start_date, time(), tzinfo=timezone.utc)
+    upper = datetime.combine(end_date + timedelta(days=1), time(), tzinfo=timezone.utc)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT (timestamp AT TIME ZONE 'UTC')::date AS day FROM weather_data "
+                "WHERE venue_id = %s AND timestamp >= %s AND timestamp < %s "
+                "GROUP BY day HAVING COUNT(*) >= %s",
+                (venue_id, lower, upper, HOURS_PER_DAY),
+            )
+            days = {row[0].isoformat() for row in cur}
+        conn.rollback()
+    return days
+
+def missing_day_ranges(venue_id, start_date, end_date, today=None):
+    """
+    Works out which parts of [start_date, end_date] still need extracting.
+
+    Returns:
+        list: Contiguous (first_day, last_day) date ranges with at least one
+        missing hour, or newer than the settle horizon.
+    """
+    start_date, end_date = as_date(start_date), as_date(end_date)
+    horizon = settled_through(today)
+    complete = set()
+    if start_date <= horizon:
+        complete = complete_days(venue_id, start_date, min(end_date, horizon))
+    return missing_ranges(start_date, end_date, complete)
+
+def get_high_water_mark(venue_id):
+    """Returns the day through which the venue is complete, or None."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT synced_through FROM venue_sync_state WHERE venue_id = %s", (venue_id,))
+            row = cur.fetchone()
+        conn.rollback()
+    return row[0] if row else None
+
+def advance_high_water_mark(venue_id, start_date, end_date, today=None, seed=False):
+    """
+    Records that [start_date, end_date] has been loaded for the venue.
+
+    The mark moves forward only through days that complete_days() confirms
+    are stored in full, and only as far as the run of complete days that
+    continues the current mark. Unsettled days never count. So the mark
+    never jumps over a gap or over hours the archive returned empty.
+
+    Args:
+        seed (bool): Create the mark when the venue has none yet. Only a
+            first sync_venue() does so, since only there is start_date the
+            origin of the venue's data; other runs can only extend a mark.
+
+    Returns:
+        date | None: The resulting high-water mark.
+    """
+    start_date = as_date(start_date)
+    end_date = min(as_date(end_date), settled_through(today))
+    mark = get_high_water_mark(venue_id)
+    if mark is None and not seed:
+        return None
+    first = start_date if mark is None else max(start_date, mark + timedelta(days=1))
+    if end_date < first or (mark is not None and mark < start_date - timedelta(days=1)):
+        return mark
+    complete = complete_days(venue_id, first, end_date)
+    through = first - timedelta(days=1)
+    while through < end_date and (through + timedelta(days=1)).isoformat() in complete:
+        through += timedelta(days=1)
+    if through < first:
+        return mark
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO venue_sync_state (venue_id, synced_through, updated_at)
+                VALUES (%(venue_id)s, %(through)s, now())
+                ON CONFLICT (venue_id) DO UPDATE
+                SET synced_through = EXCLUDED.synced_through, updated_at = now()
+                WHERE venue_sync_state.synced_through >= %(first)s - 1
+                  AND venue_sync_state.synced_through < EXCLUDED.synced_through
+                RETURNING synced_through
+                """,
+                {"venue_id": venue_id, "first": first, "through": through},
+            )
+            row = cur.fetchone()
+        conn.commit()
+    return row[0] if row else get_high_water_mark(venue_id)
+
+def sync_window(venue_id, start_date=None, today=None):
+    """
+    Returns the (first_day, last_day) a sync to yesterday has to extract.
+
+    With a high-water mark this is the day after the mark through yesterday
+    (starting no later than the settle horizon, so unsettled days are
+    refreshed); otherwise start_date through yesterday.
+
+    Returns:
+        tuple | None: (first_day, last_day, from_mark), where from_mark tells
+        whether the window starts at the high-water mark; None if the venue
+        is already up to date.
+
+    Raises:
+        ValueError: If the venue has never been synced and no start_date is given.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    yesterday = today - timedelta(days=1)
+    mark = get_high_water_mark(venue_id)
+    if mark is not None:
+        first = mark + timedelta(days=1)
+    elif start_date is not None:
+        first = as_date(start_date)
+    else:
+        raise ValueError(f"Venue {venue_id} has no sync state; pass a start date for the first sync")
+    if first > yesterday:
+        return None
+    return first, yesterday, mark is not None
@@ -0,0 +1,435 @@
+"""
+upstream.py - Shared Open-Meteo Client Policy (Rate Limit, Retries, Circuit Breaker)
+
+Every request to the Open-Meteo archive API goes through one UpstreamClient
+per process. That covers the synchronous extractor (pipeline.request_archive,
+over requests) and the async one (async_extract.fetch_chunk, over httpx):
+
+  - TokenBucket limits requests to config.UPSTREAM_RATE per second with
+    bursts of config.UPSTREAM_BURST. A 429 halves the rate (down to
+    UPSTREAM_MIN_RATE) and holds every caller back for the response's
+    Retry-After; each success adds back a tenth of the configured rate.
+  - Every request has a timeout (config.EXTRACT_TIMEOUT). Transport errors,
+    timeouts, 429 and 5xx responses are retried up to EXTRACT_MAX_RETRIES
+    times with jittered exponential backoff, so workers that failed together
+    do not retry together.
+  - CircuitBreaker opens after UPSTREAM_BREAKER_THRESHOLD consecutive failed
+    attempts. While it is open, requests fail at once with CircuitOpenError
+    instead of piling up on a struggling upstream. After
+    UPSTREAM_BREAKER_RESET seconds one probe request is let through, and its
+    outcome closes the circuit or opens it again.
+
+Requests that give up raise UpstreamError, which the API reports as HTTP 503.
+Other 4xx responses are raised as the HTTP library's own error without
+retrying, since repeating them cannot help.
+
+The state is per process and shared by threads and the event loop. The
+synchronous extractor reuses one keep-alive requests.Session per process
+(get_session()), like the async extractor's shared httpx.AsyncClient.
+"""
+
+import asyncio
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from app import config
+from app.metrics import (
+    UPSTREAM_BYTES, UPSTREAM_REJECTED, UPSTREAM_REQUESTS, UPSTREAM_RETRIES, UPSTREAM_WAIT_SECONDS, stage
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class UpstreamError(Exception):
+    """
+    Raised when Open-Meteo could not serve a request.
+
+    Attributes:
+        status (int | None): Last HTTP status, or None for transport errors.
+        retry_after (float | None): Seconds after which a new attempt may succeed.
+    """
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class CircuitOpenError(UpstreamError):
+    """Raised without contacting Open-Meteo while the circuit breaker is open."""
+
+def parse_retry_after(value):
+    """Returns a Retry-After header (seconds or HTTP date) in seconds, or None."""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class TokenBucket:
+    """
+    Token bucket whose rate backs off on throttling and recovers on success.
+
+    reserve() takes a token and returns how long the caller must wait before
+    sending, so one bucket serves threads (time.sleep) and coroutines
+    (asyncio.sleep) alike. The token count may go negative; every
+    reservation then queues behind the earlier ones.
+
+    Args:
+        rate (float): Requests per second; 0 disables limiting.
+        burst (int): Tokens the bucket holds when idle.
+        min_rate (float): Lowest rate that throttling may reduce it to.
+        clock (callable): Monotonic time source.
+    """
+
+    def __init__(self, rate, burst, min_rate, clock=time.monotonic):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = max(burst, 1)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        # Time the token count refers to; in the future while paused.
+        self._updated = clock()
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def reserve(self):
+        """Takes a token and returns the seconds to wait before using it."""
+        if self.max_rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= 1
+            return max(self._updated - now, 0.0) + max(-self._tokens, 0.0) / self.rate
+
+    def throttle(self, pause=None):
+        """Halves the rate (not below min_rate) and holds new requests back for pause seconds."""
+        if self.max_rate <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.rate = max(self.rate / 2, self.min_rate)
+            self._tokens = min(self._tokens, 0.0)
+            if pause:
+                self._updated = max(self._updated, now + pause)
+
+    def recover(self):
+        """Raises the rate by a tenth of the configured rate, up to it."""
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill(self._clock())
+            self.rate = min(self.rate + self.max_rate / 10, self.max_rate)
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker: closed -> open -> half_open -> closed.
+
+    Args:
+        threshold (int): Consecutive failures that open the circuit; 0 disables it.
+        reset_after (float): Seconds the circuit stays open before a probe.
+        clock (callable): Monotonic time source.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold, reset_after, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self.failures = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._opened_at = 0.0
+        self._probe_started = None
+
+    def check(self):
+        """
+        Returns if a request may be sent now.
+
+        Raises:
+            CircuitOpenError: While the circuit is open, or half open with
+                the probe request still in flight.
+        """
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = self._clock()
+            remaining = self._opened_at + self.reset_after - now
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+                self._probe_started = None
+            # A probe that never reported back is replaced after reset_after.
+            if self.state == self.HALF_OPEN and (
+                self._probe_started is None or now - self._probe_started > self.reset_after
+            ):
+                self._probe_started = now
+                return
+        raise CircuitOpenError(
+            f"Open-Meteo circuit is open after {self.failures} consecutive failures",
+            retry_after=max(remaining, 0.0),
+        )
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_started = None
+
+    def record_failure(self):
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+                self._probe_started = None
+
+class UpstreamClient:
+    """
+    Applies the rate limit, timeout, retry and circuit breaker policy to
+    Open-Meteo requests, and keeps their statistics.
+
+    Args:
+        limiter (TokenBucket): Shared request rate limiter.
+        breaker (CircuitBreaker): Shared circuit breaker.
+        max_retries (int): Retries after the first attempt.
+        backoff (float): Base backoff in seconds, doubled per retry.
+        timeout (float): Per-request timeout in seconds.
+        rng (callable): Returns floats in [0, 1) for the backoff jitter.
+    """
+
+    def __init__(self, limiter, breaker, max_retries, backoff, timeout, rng=random.random):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._rng = rng
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=512)
+        self._counts = dict.fromkeys(("requests", "throttled", "retries", "failed", "rejected"), 0)
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _admit(self):
+        """Checks the circuit and reserves a token; returns the seconds to wait before sending."""
+        try:
+            self.breaker.check()
+        except CircuitOpenError:
+            self._count("rejected")
+            UPSTREAM_REJECTED.inc()
+            raise
+        wait = self.limiter.reserve()
+        if wait:
+            UPSTREAM_WAIT_SECONDS.observe(wait)
+        return wait
+
+    def _settle(self, attempt, response, error, reason, elapsed):
+        """
+        Records one attempt.
+
+        Returns:
+            float | None: None when the response goes back to the caller,
+            otherwise the seconds to wait before the next attempt.
+
+        Raises:
+            UpstreamError: When the attempt failed and no retries are left.
+        """
+        status = response.status_code if response is not None else None
+        with self._lock:
+            self._counts["requests"] += 1
+            self._latencies.append(elapsed)
+        if response is not None:
+            UPSTREAM_REQUESTS.inc(status=status)
+            UPSTREAM_BYTES.inc(len(response.content))
+        if error is None and status not in RETRY_STATUSES:
+            # The upstream answered; a 4xx is the request's fault, not its health.
+            self.breaker.record_success()
+            self.limiter.recover()
+            return None
+
+        retry_after = None
+        if status == 429:
+            reason = "throttled"
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self._count("throttled")
+            self.limiter.throttle(retry_after)
+        else:
+            reason = reason or "server_error"
+            self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            self._count("failed")
+            cause = f"HTTP {status}" if status is not None else f"{reason}: {error}"
+            raise UpstreamError(
+                f"Open-Meteo request failed after {attempt + 1} attempts ({cause})", status, retry_after
+            ) from error
+        self._count("retries")
+        UPSTREAM_RETRIES.inc(reason=reason)
+        # Equal jitter; a Retry-After pause is enforced by the limiter.
+        base = self.backoff * 2 ** attempt
+        return base / 2 + self._rng() * base / 2
+
+    def get(self, url, params):
+        """
+        Sends a GET over the shared requests.Session under the policy.
+
+        Returns:
+            bytes: The response body.
+
+        Raises:
+            UpstreamError: If Open-Meteo keeps failing or the circuit is open.
+            requests.HTTPError: For other 4xx responses (not retried).
+        """
+        import requests  # Only the synchronous extract path needs it.
+
+        session = get_session()
+        for attempt in itertools.count():
+            wait = self._admit()
+            if wait:
+                time.sleep(wait)
+            response = error = reason = None
+            started = time.perf_counter()
+            try:
+                with stage("extract"):
+                    response = session.get(url, params=params, timeout=self.timeout)
+            except requests.Timeout as e:
+                error, reason = e, "timeout"
+            except requests.ConnectionError as e:
+                error, reason = e, "transport"
+            delay = self._settle(attempt, response, error, reason, time.perf_counter() - started)
+            if delay is None:
+                response.raise_for_status()
+                return response.content
+            time.sleep(delay)
+
+    async def get_async(self, client, url, params):
+        """
+        Sends a GET over an httpx.AsyncClient under the policy.
+
+        Returns:
+            bytes: The response body.
+
+        Raises:
+            UpstreamError: If Open-Meteo keeps failing or the circuit is open.
+            httpx.HTTPStatusError: For other 4xx responses (not retried).
+        """
+        import httpx
+
+        for attempt in itertools.count():
+            wait = self._admit()
+            if wait:
+                await asyncio.sleep(wait)
+            response = error = reason = None
+            started = time.perf_counter()
+            try:
+                with stage("extract", profile=False):
+                    response = await client.get(url, params=params, timeout=self.timeout)
+            except httpx.TimeoutException as e:
+                error, reason = e, "timeout"
+            except httpx.TransportError as e:
+                error, reason = e, "transport"
+            delay = self._settle(attempt, response, error, reason, time.perf_counter() - started)
+            if delay is None:
+                response.raise_for_status()
+                return response.content
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        """Returns request counts, the current rate limit, the circuit state and latency percentiles."""
+        with self._lock:
+            counts = dict(self._counts)
+            latencies = sorted(self._latencies)
+
+        def percentile(q):
+            return round(latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1000, 1)
+
+        return {
+            **counts,
+            "rate": round(self.limiter.rate, 3),
+            "max_rate": self.limiter.max_rate,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)}
+            if latencies else None,
+        }
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_upstream():
+    """Returns the process-wide UpstreamClient configured from app.config."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = UpstreamClient(
+                TokenBucket(config.UPSTREAM_RATE, config.UPSTREAM_BURST, config.UPSTREAM_MIN_RATE),
+                CircuitBreaker(config.UPSTREAM_BREAKER_THRESHOLD, config.UPSTREAM_BREAKER_RESET),
+                config.EXTRACT_MAX_RETRIES,
+                config.EXTRACT_BACKOFF,
+                config.EXTRACT_TIMEOUT,
+            )
+        return _client
+
+def upstream_stats():
+    """Returns get_upstream().stats(), or None when no request has been sent yet."""
+    return _client.stats() if _client is not None else None
+
+def reset_upstream():
+    """Drops the process-wide client, so the next request re-reads app.config."""
+    global _client
+    with _client_lock:
+        _client = None
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Returns the process-wide requests.Session, creating it on first use.
+
+    The session keeps connections to Open-Meteo alive between requests. It is
+    recreated after a fork so worker processes never share sockets with their
+    parent. requests itself is imported here, on first use.
+    """
+    import requests
+
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = requests.Session()
+            _session_pid = os.getpid()
+        return _session
+
+def close_session():
+    """Closes the shared session; called on application shutdown."""
+    global _session
+    with _session_lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
@@ -0,0 +1,146 @@
+"""
+venues.py - Venue Registry
+
+Maps venue_id to coordinates using the 'venues' table. The registry is loaded
+into memory at application startup; a venue added later is fetched from the
+database on its first lookup and then cached too.
+
+Open-Meteo serves gridded data, so coordinates are snapped to the grid cell
+they fall in (config.VENUE_GRID_RESOLUTION degrees). Venues that share a cell
+get identical weather, so one extraction can be fanned out to all of them
+(see pipeline.run_pipeline_shared), and the archive cache is keyed on the
+snapped coordinates.
+"""
+
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from app import config
+from app.db import connection
+
+class UnknownVenueError(KeyError):
+    """Raised when a venue_id is not present in the 'venues' table."""
+
+    def __str__(self):
+        return f"Unknown venue: {self.args[0]}"
+
+@dataclass(frozen=True)
+class Venue:
+    """A row of the 'venues' table."""
+    venue_id: str
+    latitude: float
+    longitude: float
+    name: Optional[str] = None
+
+    @property
+    def cell(self):
+        return grid_cell(self.latitude, self.longitude)
+
+def grid_cell(lat, lon, resolution=None):
+    """
+    Snaps coordinates to the center of their grid cell.
+
+    Returns:
+        tuple: (lat, lon) rounded to multiples of the grid resolution.
+    """
+    resolution = resolution or config.VENUE_GRID_RESOLUTION
+    return (
+        round(round(lat / resolution) * resolution, 4),
+        round(round(lon / resolution) * resolution, 4),
+    )
+
+_COLUMNS = "venue_id, latitude, longitude, name"
+
+class VenueRegistry:
+    """
+    In-memory venue_id -> Venue cache backed by the 'venues' table.
+
+    Args:
+        venues (iterable, optional): Venues to preload (e.g. in tests); a
+            registry built this way never queries the database.
+    """
+
+    def __init__(self, venues=None):
+        self._venues = {venue.venue_id: venue for venue in venues or ()}
+        self._use_db = venues is None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Replaces the cache with every row of the 'venues' table."""
+        with connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {_COLUMNS} FROM venues")
+                venues = {row[0]: Venue(*row) for row in cur.fetchall()}
+            conn.rollback()
+        with self._lock:
+            self._venues = venues
+        return len(venues)
+
+    def get(self, venue_id):
+        """
+        Returns the Venue for venue_id.
+
+        Raises:
+            UnknownVenueError: If the venue is not registered.
+        """
+        venue = self._venues.get(venue_id)
+        if venue is None and self._use_db:
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(f"SELECT {_COLUMNS} FROM venues WHERE venue_id = %s", (venue_id,))
+                    row = cur.fetchone()
+                conn.rollback()
+            if row is not None:
+                venue = Venue(*row)
+                with self._lock:
+                    self._venues[venue_id] = venue
+        if venue is None:
+            raise UnknownVenueError(venue_id)
+        return venue
+
+    def register(self, venue):
+        """Inserts or updates a venue in the database and the cache."""
+        if self._use_db:
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"""
+                        INSERT INTO venues ({_COLUMNS}) VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (venue_id) DO UPDATE SET
+                            latitude = EXCLUDED.latitude,
+                            longitude = EXCLUDED.longitude,
+                            name = EXCLUDED.name
+                        """,
+                        (venue.venue_id, venue.latitude, venue.longitude, venue.name),
+                    )
+                conn.commit()
+        with self._lock:
+            self._venues[venue.venue_id] = venue
+        return venue
+
+    def all(self):
+        """Returns the cached venues ordered by venue_id."""
+        return sorted(self._venues.values(), key=lambda venue: venue.venue_id)
+
+    def group_by_cell(self, venue_ids):
+        """
+        Groups venue_ids by grid cell.
+
+        Returns:
+            dict: (lat, lon) cell -> list of venue_ids, in input order.
+
+        Raises:
+            UnknownVenueError: If any venue is not registered.
+        """
+        groups = defaultdict(list)
+        for venue_id in venue_ids:
+            groups[self.get(venue_id).cell].append(venue_id)
+        return dict(groups)
+
+_registry = VenueRegistry()
+
+def get_registry():
+    """Returns the process-wide VenueRegistry."""
+    return _registry
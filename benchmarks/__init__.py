@@ -0,0 +1,6 @@
+"""
+__init__.py in benchmarks/
+
+This file makes the benchmarks directory a Python package so the scripts can
+be run with 'python -m benchmarks.<name>' from the project root.
+"""
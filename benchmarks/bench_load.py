@@ -0,0 +1,87 @@
+"""
+bench_load.py - Loader Throughput Benchmark
+
+Compares rows/sec of the load() methods ("row", "values", "copy") against a
+local PostgreSQL database. Connection settings come from the usual DB_*
+environment variables, and the 'weather_data' table from sql/schema.sql must
+already exist.
+
+Usage:
+    python -m benchmarks.bench_load --rows 8760 --repeat 3
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from app.db import get_db_connection
+from app.pipeline import LOAD_METHODS, load
+
+def synthetic_records(n_rows, start=datetime(2020, 1, 1)):
+    """
+    Builds n_rows hourly records shaped like the output of transform().
+    """
+    records = []
+    for i in range(n_rows):
+        records.append({
+            "timestamp": (start + timedelta(hours=i)).isoformat(),
+            "temperature_2m": 10.0 + (i % 24) * 0.5,
+            "precipitation": 0.1 * (i % 5),
+            "snowfall": 0.0,
+            "cloud_cover": i % 101,
+            "wind_speed_10m": 3.5,
+            "relative_humidity_2m": 60.0,
+            "apparent_temperature": 9.0,
+            "precipitation_probability": 20.0,
+            "wind_gusts_10m": 6.0,
+            "pressure_msl": 1012.0,
+            "wind_direction_10m": i % 360,
+            "weather_code": i % 4,
+            "rain": 0.05,
+            "surface_pressure": 1009.0,
+        })
+    return records
+
+def _delete_venue(venue_id):
+    conn = get_db_connection()
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM weather_data WHERE venue_id = %s", (venue_id,))
+    conn.commit()
+    conn.close()
+
+def bench(method, records, repeat, batch_size=None, upsert=None):
+    """
+    Loads records repeat times with the given method; returns the best rows/sec.
+    """
+    venue_id = f"bench_load_{method}"
+    best = 0.0
+    for _ in range(repeat):
+        _delete_venue(venue_id)
+        started = time.perf_counter()
+        load(records, venue_id, method=method, batch_size=batch_size, upsert=upsert)
+        elapsed = time.perf_counter() - started
+        best = max(best, len(records) / elapsed)
+    _delete_venue(venue_id)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=8760, help="records per load (default: one year)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per method; the best is reported")
+    parser.add_argument("--batch-size", type=int, default=None, help="override config.LOAD_BATCH_SIZE")
+    parser.add_argument("--insert-only", action="store_true", help="plain INSERT/COPY without ON CONFLICT")
+    parser.add_argument("--methods", nargs="+", default=list(LOAD_METHODS), choices=LOAD_METHODS)
+    args = parser.parse_args(argv)
+
+    records = synthetic_records(args.rows)
+    upsert = False if args.insert_only else None
+    results = {m: bench(m, records, args.repeat, args.batch_size, upsert) for m in args.methods}
+    baseline = results.get("row")
+
+    print(f"{'method':<8} {'rows/sec':>12} {'speedup':>9}")
+    for method, rate in results.items():
+        speedup = f"{rate / baseline:>8.1f}x" if baseline else f"{'-':>9}"
+        print(f"{method:<8} {rate:>12,.0f} {speedup}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+bench_startup.py - Service Startup Time Benchmark
+
+Starts fresh interpreters and measures how long `import app.main` takes and
+how long the FastAPI lifespan startup takes after it, with STARTUP_WARMUP on
+and off. It also lists which heavy libraries (psycopg2, requests, httpx) were
+already imported by `import app.main`. The lifespan connects to the database
+configured by the DB_* variables when one is set; without a database the
+pool warm-up fails fast and is logged.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("psycopg2", "requests", "httpx")
+
+_CHILD = """
+import asyncio, json, logging, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+loaded = [m for m in {heavy!r} if m in sys.modules]
+logging.disable(logging.CRITICAL)
+
+async def startup():
+    async with app.main.lifespan(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({{"import": imported - started, "startup": ready - imported, "loaded": loaded}}))
+"""
+
+def run_once(warmup):
+    """Returns the timings reported by one fresh interpreter."""
+    env = {**os.environ, "STARTUP_WARMUP": "true" if warmup else "false"}
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(heavy=HEAVY_MODULES)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'warmup':<7} {'import s':>9} {'lifespan s':>11}  imported by app.main")
+    for warmup in (False, True):
+        runs = [run_once(warmup) for _ in range(args.runs)]
+        import_s = statistics.median(r["import"] for r in runs)
+        startup_s = statistics.median(r["startup"] for r in runs)
+        loaded = ", ".join(runs[-1]["loaded"]) or "-"
+        print(f"{'on' if warmup else 'off':<7} {import_s:>9.3f} {startup_s:>11.3f}  {loaded}")
+
+if __name__ == "__main__":
+    main()
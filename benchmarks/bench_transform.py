@@ -0,0 +1,66 @@
+"""
+bench_transform.py - Transform Time and Memory Benchmark
+
+Compares the record-based transform() with transform_columnar() on synthetic
+Open-Meteo payloads covering several years of hourly data. For each mode it
+reports the best wall time and the peak memory allocated (tracemalloc) while
+transforming and while producing the loader's row tuples. No database or
+network access is needed.
+
+Usage:
+    python -m benchmarks.bench_transform --years 1 5 10
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections import deque
+from datetime import date, timedelta
+
+from app.columns import transform_columnar
+from app.models import HOURLY_FIELDS
+from app.pipeline import _record_rows, transform
+from tests.stub_server import synthetic_hourly
+
+MODES = {"records": transform, "columnar": transform_columnar}
+
+def synthetic_payload(years):
+    start = date(2010, 1, 1)
+    end = start + timedelta(days=365 * years - 1)
+    return {"hourly": synthetic_hourly(start, end, HOURLY_FIELDS)}
+
+def _run(func, payload):
+    result = func(payload)
+    deque(_record_rows(result, "bench"), maxlen=0)  # what load() consumes
+    return result
+
+def measure(func, payload, repeat):
+    """Returns (best seconds, peak bytes allocated) for one transform mode."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _run(func, payload)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    result = _run(func, payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'years':>5} {'hours':>7} {'mode':<9} {'seconds':>8} {'peak MB':>8}")
+    for years in args.years:
+        payload = synthetic_payload(years)
+        hours = len(payload["hourly"]["time"])
+        for mode, func in MODES.items():
+            seconds, peak = measure(func, payload, args.repeat)
+            print(f"{years:>5} {hours:>7} {mode:<9} {seconds:>8.3f} {peak / 2**20:>8.1f}")
+
+if __name__ == "__main__":
+    main()
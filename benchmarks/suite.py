@@ -0,0 +1,273 @@
+"""
+suite.py - Offline Benchmark Suite for the ETL Hot Paths
+
+Measures throughput (hours per second) and peak Python memory (tracemalloc)
+of extract_weather_data(), response decoding (stdlib json, orjson and
+straight into columns), transform (both modes), load() and end-to-end
+run_pipeline() over synthetic data of --hours per venue for --venues
+venues. It runs entirely offline:
+  - extraction talks to the local stub server (tests/stub_server.py), with
+    the archive cache disabled, so the suite runs from a repository checkout
+    (the tests package must be importable) rather than an installed package;
+  - load and run_pipeline use a throwaway PostgreSQL from testcontainers
+    (--db container), or the database configured by the DB_* variables
+    (--db env, use a local database, not production). The schema is created
+    from sql/schema.sql. --db none skips the database benchmarks.
+
+Results are written as JSON (--output). With --baseline, each benchmark is
+compared with the stored baseline; a throughput drop or memory growth
+beyond --tolerance is reported as a regression and the exit code is 1. A
+missing baseline file is an error, not a skipped comparison.
+--save-baseline stores the current results as the new baseline.
+
+benchmarks/baseline.json is the committed baseline (--db none, default
+--hours and --venues). Throughput depends on the machine, so regenerate it
+with --save-baseline on the machine that runs the comparison, e.g. the CI
+runner, and commit it alongside changes that move the numbers on purpose.
+
+Usage:
+    python -m benchmarks.suite --hours 8760 --venues 4 --output bench.json
+    python -m benchmarks.suite --db none --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --db none --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import urllib.parse
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+
+from app import config
+from app.columns import transform_columnar
+from app.decode import backend, decode_columns, loads, orjson
+from app.pipeline import extract_weather_data, load, request_archive, run_pipeline, transform
+from app.upstream import reset_upstream
+from app.venues import Venue, get_registry
+from tests.stub_server import OpenMeteoStub
+
+START = date(2020, 1, 1)
+
+def make_venues(n):
+    """Venues one degree apart, so each has its own grid cell and extraction."""
+    return [Venue(f"bench_{i}", 40.0 + i, -74.0) for i in range(n)]
+
+def measure(func, repeat, setup=None):
+    """
+    Runs func repeat times for the best wall time, then once more under
+    tracemalloc for the peak allocated memory.
+
+    Returns:
+        tuple: (best seconds, peak bytes).
+    """
+    best = float("inf")
+    for _ in range(repeat + 1):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def _result(hours, seconds, peak):
+    return {
+        "hours": hours,
+        "seconds": round(seconds, 6),
+        "hours_per_second": round(hours / seconds, 1) if seconds else None,
+        "peak_mb": round(peak / 2**20, 3),
+    }
+
+def _start_database(stack, mode):
+    """Points DB_* at a throwaway database (container) or the configured one (env)."""
+    if mode == "container":
+        from testcontainers.postgres import PostgresContainer
+
+        postgres = stack.enter_context(PostgresContainer("postgres:16-alpine"))
+        parsed = urllib.parse.urlparse(postgres.get_connection_url())
+        stack.enter_context(mock.patch.dict(os.environ, {
+            "DB_HOST": parsed.hostname, "DB_PORT": str(parsed.port), "DB_NAME": parsed.path.lstrip("/"),
+            "DB_USER": parsed.username, "DB_PASSWORD": parsed.password, "DB_SSLMODE": "disable",
+        }))
+    from app.db import close_pool, get_db_connection
+
+    close_pool()  # re-read DB_*
+    stack.callback(close_pool)
+    conn = get_db_connection()
+    with conn.cursor() as cur:
+        cur.execute(open("sql/schema.sql").read())
+    conn.commit()
+    conn.close()
+
+def _clear(venues):
+    from app.db import get_db_connection
+
+    conn = get_db_connection()
+    with conn.cursor() as cur:
+        ids = [v.venue_id for v in venues]
+        for table in ("weather_data", "weather_daily", "weather_monthly"):
+            cur.execute(f"DELETE FROM {table} WHERE venue_id = ANY(%s)", (ids,))
+    conn.commit()
+    conn.close()
+
+def run_suite(hours, n_venues, repeat, db):
+    """
+    Runs every benchmark and returns the results document.
+
+    Args:
+        hours (int): Hours of data per venue (rounded up to whole days).
+        n_venues (int): Number of venues.
+        repeat (int): Timed runs per benchmark; the best is reported.
+        db (str): "container", "env" or "none".
+    """
+    days = max(1, math.ceil(hours / 24))
+    end = START + timedelta(days=days - 1)
+    total = days * 24 * n_venues
+    venues = make_venues(n_venues)
+    results = {}
+
+    with ExitStack() as stack:
+        stub = stack.enter_context(OpenMeteoStub())
+        # The stub is local, so Open-Meteo's rate limit would only add sleeps.
+        stack.enter_context(mock.patch.multiple(
+            config, OPEN_METEO_ARCHIVE_URL=stub.url, ARCHIVE_CACHE_PATH="", PIPELINE_CHUNK_DAYS=max(days, 1),
+            UPSTREAM_RATE=0,
+        ))
+        reset_upstream()
+        stack.callback(reset_upstream)
+
+        def extract_all():
+            return [extract_weather_data(v.latitude, v.longitude, START, end) for v in venues]
+
+        results["extract"] = _result(total, *measure(extract_all, repeat))
+        payloads = extract_all()
+        bodies = [request_archive(v.latitude, v.longitude, START, end) for v in venues]
+
+        for decoder in ("json", "orjson"):
+            if decoder == "orjson" and orjson is None:
+                continue
+            with mock.patch.object(config, "JSON_DECODER", decoder):
+                results[f"decode_{decoder}"] = _result(total, *measure(lambda: [loads(b) for b in bodies], repeat))
+        results["decode_columns"] = _result(total, *measure(lambda: [decode_columns(b) for b in bodies], repeat))
+        del bodies
+
+        for mode, func in (("records", transform), ("columnar", transform_columnar)):
+            results[f"transform_{mode}"] = _result(
+                total, *measure(lambda: [func(p) for p in payloads], repeat)
+            )
+
+        if db != "none":
+            _start_database(stack, db)
+            registry = get_registry()
+            for venue in venues:
+                registry.register(venue)
+            columns = [transform_columnar(p) for p in payloads]
+
+            def load_all():
+                for venue, cols in zip(venues, columns):
+                    load(cols, venue.venue_id)
+
+            results["load"] = _result(total, *measure(load_all, repeat, setup=lambda: _clear(venues)))
+
+            def pipeline_all():
+                for venue in venues:
+                    run_pipeline(venue.venue_id, START, end)
+
+            results["run_pipeline"] = _result(total, *measure(pipeline_all, repeat, setup=lambda: _clear(venues)))
+            _clear(venues)
+
+    return {
+        "meta": {
+            "hours_per_venue": days * 24,
+            "venues": n_venues,
+            "repeat": repeat,
+            "db": db,
+            "transform_mode": config.TRANSFORM_MODE,
+            "json_decoder": backend(),
+            "load_method": config.LOAD_METHOD,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results with a baseline document.
+
+    Returns:
+        list: (benchmark, metric, baseline value, current value) for every
+        throughput drop or memory increase beyond tolerance.
+    """
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        current = results["results"].get(name)
+        if current is None:
+            continue
+        if base.get("hours_per_second") and current["hours_per_second"] < base["hours_per_second"] * (1 - tolerance):
+            regressions.append((name, "hours_per_second", base["hours_per_second"], current["hours_per_second"]))
+        if base.get("peak_mb") and current["peak_mb"] > base["peak_mb"] * (1 + tolerance):
+            regressions.append((name, "peak_mb", base["peak_mb"], current["peak_mb"]))
+    return regressions
+
+def _print_table(results, baseline):
+    base = (baseline or {}).get("results", {})
+    print(f"{'benchmark':<20} {'hours/sec':>12} {'peak MB':>9} {'vs baseline':>12}")
+    for name, r in results["results"].items():
+        change = ""
+        if name in base and base[name].get("hours_per_second"):
+            change = f"{r['hours_per_second'] / base[name]['hours_per_second'] - 1:+.1%}"
+        print(f"{name:<20} {r['hours_per_second']:>12,.0f} {r['peak_mb']:>9.1f} {change:>12}")
+
+def _default_db():
+    return "env" if os.getenv("DB_HOST") else "container"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--hours", type=int, default=8760, help="hours per venue (default: one year)")
+    parser.add_argument("--venues", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark; the best is reported")
+    parser.add_argument("--db", choices=("container", "env", "none"), default=None,
+                        help="database for load/run_pipeline (default: env if DB_HOST is set, else container)")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (default 0.2)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="store these results as the baseline")
+    args = parser.parse_args(argv)
+    if args.baseline and not os.path.exists(args.baseline):
+        parser.error(f"baseline {args.baseline} does not exist; create it with --save-baseline")
+
+    results = run_suite(args.hours, args.venues, args.repeat, args.db or _default_db())
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    _print_table(results, baseline)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, base, current in regressions:
+        print(f"REGRESSION {name}.{metric}: baseline {base}, now {current}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+-- dedupe_weather_data.sql - One-off migration for existing databases
+-- Removes duplicate (venue_id, timestamp) rows, keeping the most recently
+-- inserted one (highest id), so the unique index in schema.sql can be built.
+
+BEGIN;
+
+DELETE FROM weather_data w
+ USING weather_data newer
+ WHERE w.venue_id  = newer.venue_id
+   AND w.timestamp = newer.timestamp
+   AND w.id        < newer.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS weather_data_venue_timestamp_key
+    ON weather_data (venue_id, timestamp);
+
+COMMIT;
@@ -1,96 +1,42 @@
 -- sql/qa_checks.sql
 
--- 1) No NULLs in key columns
-SELECT *
-  FROM weather_data
- WHERE venue_id IS NULL
-    OR timestamp    IS NULL;
-
--- 2) No duplicate (venue_id, timestamp) rows
-SELECT venue_id,
-       timestamp,
-       COUNT(*) AS cnt
-  FROM weather_data
- GROUP BY venue_id, timestamp
-HAVING COUNT(*) > 1;
-
--- 3) Reasonable ranges for numeric fields
--- (adjust thresholds to your expected units if needed)
-
--- Temperature (°C)
-SELECT *
-  FROM weather_data
- WHERE temperature_2m < -50
-    OR temperature_2m > 60;
-
--- Precipitation (mm)
-SELECT *
-  FROM weather_data
- WHERE precipitation < 0;
-
--- Snowfall (cm)
-SELECT *
-  FROM weather_data
- WHERE snowfall < 0;
-
--- Cloud cover (%)
-SELECT *
-  FROM weather_data
- WHERE cloud_cover < 0
-    OR cloud_cover > 100;
-
--- Wind speed (m/s)
-SELECT *
-  FROM weather_data
- WHERE wind_speed_10m < 0;
-
--- Relative humidity (%)
-SELECT *
-  FROM weather_data
- WHERE relative_humidity_2m < 0
-    OR relative_humidity_2m > 100;
-
--- Apparent temperature (°C)
-SELECT *
-  FROM weather_data
- WHERE apparent_temperature < -80
-    OR apparent_temperature > 70;
-
--- Precipitation probability (%)
-SELECT *
-  FROM weather_data
- WHERE precipitation_probability < 0
-    OR precipitation_probability > 100;
-
--- Wind gusts (m/s)
-SELECT *
-  FROM weather_data
- WHERE wind_gusts_10m < 0;
-
--- Mean sea–level pressure (hPa)
-SELECT *
-  FROM weather_data
- WHERE pressure_msl < 800
-    OR pressure_msl > 1100;
-
--- Wind direction (°)
-SELECT *
-  FROM weather_data
- WHERE wind_direction_10m < 0
-    OR wind_direction_10m > 360;
-
--- Weather code (API code values, non‑negative)
-SELECT *
-  FROM weather_data
- WHERE weather_code < 0;
-
--- Rain (mm)
-SELECT *
-  FROM weather_data
- WHERE rain < 0;
-
--- Surface pressure (hPa)
-SELECT *
-  FROM weather_data
- WHERE surface_pressure < 800
-    OR surface_pressure > 1100;
+-- All QA checks in a single pass over weather_data: one FILTER count of
+-- violating rows per rule (0 everywhere means the data passed). This is the
+-- query app/qa.py builds from its RULES; use `python -m app.cli qa` or
+-- GET /qa to scope it to a venue and/or time window.
+-- Range checks ignore NULLs; adjust thresholds to your expected units if needed.
+
+SELECT COUNT(*) AS rows,
+       -- Key columns
+       COUNT(*) FILTER (WHERE venue_id IS NULL)                                       AS venue_id_not_null,
+       COUNT(*) FILTER (WHERE timestamp IS NULL)                                      AS timestamp_not_null,
+       -- Temperature (°C)
+       COUNT(*) FILTER (WHERE temperature_2m < -50 OR temperature_2m > 60)            AS temperature_2m_range,
+       -- Precipitation (mm)
+       COUNT(*) FILTER (WHERE precipitation < 0)                                      AS precipitation_range,
+       -- Snowfall (cm)
+       COUNT(*) FILTER (WHERE snowfall < 0)                                           AS snowfall_range,
+       -- Cloud cover (%)
+       COUNT(*) FILTER (WHERE cloud_cover < 0 OR cloud_cover > 100)                   AS cloud_cover_range,
+       -- Wind speed (m/s)
+       COUNT(*) FILTER (WHERE wind_speed_10m < 0)                                     AS wind_speed_10m_range,
+       -- Relative humidity (%)
+       COUNT(*) FILTER (WHERE relative_humidity_2m < 0 OR relative_humidity_2m > 100) AS relative_humidity_2m_range,
+       -- Apparent temperature (°C)
+       COUNT(*) FILTER (WHERE apparent_temperature < -80 OR apparent_temperature > 70) AS apparent_temperature_range,
+       -- Precipitation probability (%)
+       COUNT(*) FILTER (WHERE precipitation_probability < 0
+                           OR precipitation_probability > 100)                        AS precipitation_probability_range,
+       -- Wind gusts (m/s)
+       COUNT(*) FILTER (WHERE wind_gusts_10m < 0)                                     AS wind_gusts_10m_range,
+       -- Mean sea-level pressure (hPa)
+       COUNT(*) FILTER (WHERE pressure_msl < 800 OR pressure_msl > 1100)              AS pressure_msl_range,
+       -- Wind direction (°)
+       COUNT(*) FILTER (WHERE wind_direction_10m < 0 OR wind_direction_10m > 360)     AS wind_direction_10m_range,
+       -- Weather code (API code values, non-negative)
+       COUNT(*) FILTER (WHERE weather_code < 0)                                       AS weather_code_range,
+       -- Rain (mm)
+       COUNT(*) FILTER (WHERE rain < 0)                                               AS rain_range,
+       -- Surface pressure (hPa)
+       COUNT(*) FILTER (WHERE surface_pressure < 300 OR surface_pressure > 1100)      AS surface_pressure_range
+  FROM weather_data;
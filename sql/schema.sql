@@ -2,6 +2,13 @@
 -- This script creates the 'weather_data' table with all required fields.
 -- Each column has a comment explaining its purpose and unit of measure.
 
+CREATE TABLE IF NOT EXISTS venues (
+    venue_id TEXT PRIMARY KEY,               -- Identifier used by weather_data.venue_id
+    name TEXT,                               -- Optional display name
+    latitude DOUBLE PRECISION NOT NULL,      -- Venue latitude (decimal degrees)
+    longitude DOUBLE PRECISION NOT NULL      -- Venue longitude (decimal degrees)
+);
+
 CREATE TABLE IF NOT EXISTS weather_data (
     id SERIAL PRIMARY KEY,                   -- Unique record identifier
     venue_id TEXT NOT NULL,                  -- Identifier for the data's venue or location
@@ -20,4 +27,60 @@ CREATE TABLE IF NOT EXISTS weather_data (
     weather_code INTEGER,                    -- Coded weather condition representation
     rain REAL,                               -- Rain amount (mm)
     surface_pressure REAL                    -- Surface atmospheric pressure (hPa)
-);
\ No newline at end of file
+);
+
+-- Per-venue high-water mark for incremental sync (app/sync.py): every hour up to
+-- and including synced_through is stored in weather_data.
+CREATE TABLE IF NOT EXISTS venue_sync_state (
+    venue_id TEXT PRIMARY KEY,               -- Venue the mark belongs to
+    synced_through DATE NOT NULL,            -- Last complete day (UTC)
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- One row per venue and hour. load() upserts against this index
+-- (INSERT ... ON CONFLICT (venue_id, timestamp)), so re-running an overlapping
+-- date range updates rows in place instead of inserting duplicates.
+-- Existing databases with duplicate rows must run sql/dedupe_weather_data.sql first.
+CREATE UNIQUE INDEX IF NOT EXISTS weather_data_venue_timestamp_key
+    ON weather_data (venue_id, timestamp);
+
+-- Per-venue daily and monthly aggregates (app/rollups.py), refreshed by load()
+-- for the days it writes. temperature_hours counts the hours with a
+-- temperature, so means can be combined across days.
+CREATE TABLE IF NOT EXISTS weather_daily (
+    venue_id TEXT NOT NULL,
+    day DATE NOT NULL,                       -- UTC day
+    hours INTEGER NOT NULL,                  -- Hourly rows stored for the day
+    temperature_min REAL,                    -- °C
+    temperature_max REAL,                    -- °C
+    temperature_mean DOUBLE PRECISION,       -- °C
+    temperature_hours INTEGER NOT NULL,
+    precipitation_sum DOUBLE PRECISION,      -- mm
+    rain_sum DOUBLE PRECISION,               -- mm
+    snowfall_sum DOUBLE PRECISION,           -- cm
+    wind_gusts_max REAL,                     -- m/s
+    PRIMARY KEY (venue_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS weather_monthly (
+    venue_id TEXT NOT NULL,
+    month DATE NOT NULL,                     -- First day of the UTC month
+    days INTEGER NOT NULL,                   -- Days with data in the month
+    hours INTEGER NOT NULL,
+    temperature_min REAL,
+    temperature_max REAL,
+    temperature_mean DOUBLE PRECISION,
+    temperature_hours INTEGER NOT NULL,
+    precipitation_sum DOUBLE PRECISION,
+    rain_sum DOUBLE PRECISION,
+    snowfall_sum DOUBLE PRECISION,
+    wind_gusts_max REAL,
+    PRIMARY KEY (venue_id, month)
+);
+
+-- The same index serves the read API (app/query.py): per-venue time windows
+-- and keyset pages are range scans on it. For very large, append-mostly
+-- tables a BRIN index on timestamp is a much smaller complement for
+-- cross-venue time-range scans:
+-- CREATE INDEX IF NOT EXISTS weather_data_timestamp_brin
+--     ON weather_data USING BRIN (timestamp);
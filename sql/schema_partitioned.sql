@@ -0,0 +1,88 @@
+-- schema_partitioned.sql - Partitioned Database Schema for Weather Data
+-- Alternative to schema.sql for large installations: weather_data is range
+-- partitioned on timestamp. Partitions are not created here; load() creates
+-- them on demand (app/partitions.py) with the granularity configured by
+-- PARTITION_GRANULARITY ("month" or "year") and, if PARTITION_VENUE_BUCKETS
+-- is set, hash sub-partitions by venue_id. Old data is retired by dropping
+-- whole partitions: python -m app.cli partitions drop --before YYYY-MM-DD
+--
+-- Migrating an existing table: create this schema under a new name, copy the
+-- rows with INSERT ... SELECT after creating the partitions for their range
+-- (python -m app.cli partitions ensure --start ... --end ...), then swap names.
+
+CREATE TABLE IF NOT EXISTS venues (
+    venue_id TEXT PRIMARY KEY,               -- Identifier used by weather_data.venue_id
+    name TEXT,                               -- Optional display name
+    latitude DOUBLE PRECISION NOT NULL,      -- Venue latitude (decimal degrees)
+    longitude DOUBLE PRECISION NOT NULL      -- Venue longitude (decimal degrees)
+);
+
+-- Per-venue high-water mark for incremental sync (app/sync.py): every hour up to
+-- and including synced_through is stored in weather_data.
+CREATE TABLE IF NOT EXISTS venue_sync_state (
+    venue_id TEXT PRIMARY KEY,               -- Venue the mark belongs to
+    synced_through DATE NOT NULL,            -- Last complete day (UTC)
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Same columns as schema.sql. A primary key on a partitioned table has to
+-- include the partition key, so id is a plain BIGSERIAL and the
+-- (venue_id, timestamp) unique index below identifies a row.
+CREATE TABLE IF NOT EXISTS weather_data (
+    id BIGSERIAL,                            -- Record identifier
+    venue_id TEXT NOT NULL,                  -- Identifier for the data's venue or location
+    timestamp TIMESTAMPTZ NOT NULL,          -- Timestamp of the weather data (with timezone)
+    temperature_2m REAL,                     -- Temperature (°C)
+    precipitation REAL,                      -- Total precipitation (mm)
+    snowfall REAL,                           -- Snowfall (mm)
+    cloud_cover INTEGER,                     -- Cloud cover percentage (0-100)
+    wind_speed_10m REAL,                     -- Wind speed (m/s)
+    relative_humidity_2m REAL,               -- Relative humidity percentage (0-100)
+    apparent_temperature REAL,               -- "Feels like" temperature (°C)
+    precipitation_probability REAL,          -- Chance of precipitation (%)
+    wind_gusts_10m REAL,                     -- Wind gust speed (m/s)
+    pressure_msl REAL,                       -- Atmospheric pressure at mean sea level (hPa)
+    wind_direction_10m INTEGER,              -- Wind direction (degrees 0-360)
+    weather_code INTEGER,                    -- Coded weather condition representation
+    rain REAL,                               -- Rain amount (mm)
+    surface_pressure REAL                    -- Surface atmospheric pressure (hPa)
+) PARTITION BY RANGE (timestamp);
+
+-- Created on the parent, so every partition gets its own copy; load() upserts
+-- against it exactly as with the unpartitioned schema.
+CREATE UNIQUE INDEX IF NOT EXISTS weather_data_venue_timestamp_key
+    ON weather_data (venue_id, timestamp);
+
+-- Per-venue daily and monthly aggregates (app/rollups.py), refreshed by load()
+-- for the days it writes. temperature_hours counts the hours with a
+-- temperature, so means can be combined across days.
+CREATE TABLE IF NOT EXISTS weather_daily (
+    venue_id TEXT NOT NULL,
+    day DATE NOT NULL,                       -- UTC day
+    hours INTEGER NOT NULL,                  -- Hourly rows stored for the day
+    temperature_min REAL,                    -- °C
+    temperature_max REAL,                    -- °C
+    temperature_mean DOUBLE PRECISION,       -- °C
+    temperature_hours INTEGER NOT NULL,
+    precipitation_sum DOUBLE PRECISION,      -- mm
+    rain_sum DOUBLE PRECISION,               -- mm
+    snowfall_sum DOUBLE PRECISION,           -- cm
+    wind_gusts_max REAL,                     -- m/s
+    PRIMARY KEY (venue_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS weather_monthly (
+    venue_id TEXT NOT NULL,
+    month DATE NOT NULL,                     -- First day of the UTC month
+    days INTEGER NOT NULL,                   -- Days with data in the month
+    hours INTEGER NOT NULL,
+    temperature_min REAL,
+    temperature_max REAL,
+    temperature_mean DOUBLE PRECISION,
+    temperature_hours INTEGER NOT NULL,
+    precipitation_sum DOUBLE PRECISION,
+    rain_sum DOUBLE PRECISION,
+    snowfall_sum DOUBLE PRECISION,
+    wind_gusts_max REAL,
+    PRIMARY KEY (venue_id, month)
+);
@@ -3,8 +3,11 @@
 import os
 import psycopg2
 import urllib.parse
+from datetime import datetime, timedelta
 import pytest
 from testcontainers.postgres import PostgresContainer
+from app.db import close_pool
+from app.upstream import close_session, reset_upstream
 
 @pytest.fixture(scope="session")
 def postgres_container():
@@ -22,19 +25,72 @@ def postgres_container():
         os.environ["DB_USER"]     = parsed.username
         os.environ["DB_PASSWORD"] = parsed.password
         os.environ["DB_SSLMODE"]  = "disable"
+        # The app reads DB_* once per pool; drop anything read before this point
+        close_pool()
 
         # Load schema
-        conn = psycopg2.connect(
-            host=os.environ["DB_HOST"],
-            port=os.environ["DB_PORT"],
-            dbname=os.environ["DB_NAME"],
-            user=os.environ["DB_USER"],
-            password=os.environ["DB_PASSWORD"],
-            sslmode=os.environ.get("DB_SSLMODE")
-        )
+        conn = connect()
         with conn.cursor() as cur:
             cur.execute(open("sql/schema.sql").read())
             conn.commit()
         conn.close()
 
         yield postgres
+
+def connect(**options):
+    """Opens a connection to the test database from the DB_* variables set by postgres_container."""
+    return psycopg2.connect(
+        host=os.environ["DB_HOST"],
+        port=os.environ["DB_PORT"],
+        dbname=os.environ["DB_NAME"],
+        user=os.environ["DB_USER"],
+        password=os.environ["DB_PASSWORD"],
+        sslmode=os.environ.get("DB_SSLMODE"),
+        **options,
+    )
+
+@pytest.fixture
+def db_conn(postgres_container):
+    """A direct connection to the test database, outside the app's pool."""
+    conn = connect()
+    yield conn
+    conn.close()
+
+def synthetic_records(n_rows, start=datetime(2020, 1, 1)):
+    """
+    Builds n_rows hourly records shaped like the output of transform(),
+    starting at start (2020-01-01 00:00 by default).
+    """
+    records = []
+    for i in range(n_rows):
+        records.append({
+            "timestamp": (start + timedelta(hours=i)).isoformat(),
+            "temperature_2m": 10.0 + (i % 24) * 0.5,
+            "precipitation": 0.1 * (i % 5),
+            "snowfall": 0.0,
+            "cloud_cover": i % 101,
+            "wind_speed_10m": 3.5,
+            "relative_humidity_2m": 60.0,
+            "apparent_temperature": 9.0,
+            "precipitation_probability": 20.0,
+            "wind_gusts_10m": 6.0,
+            "pressure_msl": 1012.0,
+            "wind_direction_10m": i % 360,
+            "weather_code": i % 4,
+            "rain": 0.05,
+            "surface_pressure": 1009.0,
+        })
+    return records
+
+@pytest.fixture(autouse=True)
+def fresh_upstream():
+    """
+    Gives every test a new upstream client, so rate limits and circuit state
+    do not leak between tests and config patches made in setUp apply. The
+    shared session is closed afterwards, so no keep-alive connection to a
+    stopped stub server is reused.
+    """
+    reset_upstream()
+    yield
+    reset_upstream()
+    close_session()
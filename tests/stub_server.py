@@ -0,0 +1,133 @@
+"""
+stub_server.py - Local Stand-In for the Open-Meteo Archive API
+
+OpenMeteoStub serves deterministic synthetic hourly data for whatever
+start_date/end_date is requested and records every request, so tests can
+assert exactly which ranges were fetched without touching the network.
+
+Usage:
+    with OpenMeteoStub() as stub:
+        config.OPEN_METEO_ARCHIVE_URL = stub.url
+        ...
+        assert stub.requests == [("2024-01-01", "2024-01-02")]
+
+Faults can be queued with stub.faults.append((status, headers)); each queued
+fault answers one request before normal responses resume. Queuing DROP
+instead closes the connection without an answer. stub.delay slows every
+response down (use it to trigger client timeouts), and stub.max_in_flight
+records peak concurrency.
+"""
+
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PRESSURE_FIELDS = ("pressure_msl", "surface_pressure")
+PRESSURE_OFFSET = 1000  # hPa
+DROP = "drop"  # fault: close the connection without a response
+
+def synthetic_hourly(start, end, fields):
+    """
+    Builds Open-Meteo style 'hourly' arrays for every hour of [start, end].
+    Values depend only on the timestamp, so overlapping ranges agree, and
+    stay within the app.qa ranges so they can be loaded.
+    """
+    hourly = {"time": [], **{field: [] for field in fields}}
+    offsets = [PRESSURE_OFFSET if field in PRESSURE_FIELDS else 0 for field in fields]
+    current = datetime.combine(start, datetime.min.time())
+    stop = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    while current < stop:
+        hourly["time"].append(current.strftime("%Y-%m-%dT%H:%M"))
+        seed = current.toordinal() % 37 + current.hour / 100
+        for i, field in enumerate(fields):
+            hourly[field].append(round(seed + i + offsets[i], 2))
+        current += timedelta(hours=1)
+    return hourly
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        stub = self.server.stub
+        query = parse_qs(urlparse(self.path).query)
+        start = date.fromisoformat(query["start_date"][0])
+        end = date.fromisoformat(query["end_date"][0])
+        fields = query["hourly"][0].split(",")
+        with stub.lock:
+            stub.requests.append((start.isoformat(), end.isoformat()))
+            fault = stub.faults.pop(0) if stub.faults else None
+            stub.in_flight += 1
+            stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+        try:
+            if stub.delay:
+                time.sleep(stub.delay)
+            if fault == DROP:
+                self.close_connection = True
+            elif fault is not None:
+                self._send_fault(*fault)
+            else:
+                self._send_data(query, start, end, fields)
+        except ConnectionError:
+            pass  # the client timed out and went away
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+
+    def _send_fault(self, status, headers=None):
+        body = json.dumps({"error": True, "reason": f"injected {status}"}).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_data(self, query, start, end, fields):
+        body = json.dumps({
+            "latitude": float(query["latitude"][0]),
+            "longitude": float(query["longitude"][0]),
+            "timezone": "UTC",
+            "hourly": synthetic_hourly(start, end, fields),
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class OpenMeteoStub:
+    """
+    Threaded HTTP server on an ephemeral localhost port.
+
+    Attributes:
+        url (str): Archive endpoint URL to put in config.OPEN_METEO_ARCHIVE_URL.
+        requests (list): (start_date, end_date) of every request served.
+        faults (list): Queued (status, headers) responses or DROPs to inject.
+        delay (float): Seconds to sleep before answering each request.
+        max_in_flight (int): Peak number of concurrently handled requests.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.faults = []
+        self.delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.stub = self
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/v1/archive"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
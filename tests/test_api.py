@@ -7,15 +7,51 @@ This module uses FastAPI's TestClient and overrides the get_pipeline_runner
 dependency so that tests do not require a real database or external API.
 """
 
+import os
+import tempfile
+import threading
 import unittest
+
+import pytest
+from datetime import datetime, timezone
+from unittest import mock
+from app import config
 from fastapi.testclient import TestClient
-from app.main import app, get_pipeline_runner
+from app.coalesce import ResultCache
+from app.jobs import JobQueue, JobStore
+from app.metrics import stage
+from app.main import (
+    app, get_batch_runner, get_exporter, get_job_submitter, get_jobs, get_pipeline_runner, get_shared_batch_runner, get_venue_registry,
+    get_aggregator, get_qa_runner, get_results, get_venue_syncer, get_weather_reader
+)
+from app.pipeline import LoadResult, PipelineError
+from app.upstream import CircuitOpenError
+from app.venues import UnknownVenueError, Venue, VenueRegistry
 
 # Override the pipeline runner dependency to return a fixed row count
 app.dependency_overrides[get_pipeline_runner] = lambda: (lambda venue_id, start_date, end_date: 1)
 
+# Use an in-memory venue registry instead of the 'venues' table
+registry = VenueRegistry([Venue("a", 40.71, -74.01), Venue("b", 40.69, -74.03)])
+app.dependency_overrides[get_venue_registry] = lambda: registry
+
+# Give every request its own disabled result cache, so runner overrides take effect
+app.dependency_overrides[get_results] = lambda: ResultCache(ttl=0, max_entries=0)
+
 client = TestClient(app)
 
+@pytest.fixture(autouse=True, scope="module")
+def job_queue(tmp_path_factory):
+    """Keeps the job store of every request in a temporary directory."""
+    jobs = JobQueue(JobStore(str(tmp_path_factory.mktemp("jobs") / "jobs.sqlite3")), workers=1)
+    app.dependency_overrides[get_jobs] = lambda: jobs
+    app.dependency_overrides[get_job_submitter] = lambda: jobs.submit
+    yield jobs
+    del app.dependency_overrides[get_jobs]
+    del app.dependency_overrides[get_job_submitter]
+    jobs.shutdown(wait=True)
+    jobs.store.close()
+
 class TestAPI(unittest.TestCase):
     def test_get_weather_success(self):
         """
@@ -34,6 +70,53 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(data["status"], "success")
         self.assertEqual(data["rows_loaded"], 1)
 
+    def test_get_weather_reports_upsert_counts(self):
+        """
+        Verify that a LoadResult from the runner is expanded into the response.
+        """
+        app.dependency_overrides[get_pipeline_runner] = lambda: (
+            lambda venue_id, start_date, end_date: LoadResult(48, 24, 4, 20)
+        )
+        try:
+            response = client.get(
+                "/weather",
+                params={
+                    "venue_id": "test_venue",
+                    "start_date": "2024-01-01",
+                    "end_date": "2024-01-02"
+                }
+            )
+        finally:
+            app.dependency_overrides[get_pipeline_runner] = lambda: (lambda venue_id, start_date, end_date: 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"status": "success", "rows_loaded": 48, "inserted": 24, "updated": 4, "unchanged": 20}
+        )
+
+    def test_get_weather_result_cache_headers(self):
+        """
+        Verify that a repeated request is served from the result cache.
+        """
+        calls = []
+        cache = ResultCache(ttl=60, max_entries=8)
+        app.dependency_overrides[get_pipeline_runner] = lambda: (
+            lambda venue_id, start_date, end_date: calls.append(venue_id) or 7
+        )
+        app.dependency_overrides[get_results] = lambda: cache
+        try:
+            params = {"venue_id": "test_venue", "start_date": "2024-01-01", "end_date": "2024-01-02"}
+            first = client.get("/weather", params=params)
+            second = client.get("/weather", params=params)
+        finally:
+            app.dependency_overrides[get_pipeline_runner] = lambda: (lambda venue_id, start_date, end_date: 1)
+            app.dependency_overrides[get_results] = lambda: ResultCache(ttl=0, max_entries=0)
+        self.assertEqual(calls, ["test_venue"])
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual((second.headers["X-Cache-Hits"], second.headers["X-Cache-Misses"]), ("1", "1"))
+        self.assertEqual(second.json(), {"status": "success", "rows_loaded": 7})
+
     def test_get_weather_invalid_dates(self):
         """
         Ensure invalid date formats return a 422 error.
@@ -48,5 +131,320 @@ class TestAPI(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 422)
 
+    def test_post_weather_batch(self):
+        """
+        Verify that /weather/batch runs every job and reports per-venue status.
+        """
+        app.dependency_overrides[get_batch_runner] = lambda: (
+            lambda venue_id, start_date, end_date: LoadResult(24, 24, 0, 0)
+        )
+        app.dependency_overrides[get_shared_batch_runner] = lambda: (
+            lambda venue_ids, start_date, end_date: {v: LoadResult(24, 24, 0, 0) for v in venue_ids}
+        )
+        try:
+            response = client.post(
+                "/weather/batch",
+                json={
+                    "jobs": [
+                        {"venue_id": "a", "start_date": "2024-01-01", "end_date": "2024-01-01"},
+                        {"venue_id": "b", "start_date": "2024-01-01", "end_date": "2024-01-01"},
+                    ],
+                    "max_workers": 2,
+                },
+            )
+        finally:
+            del app.dependency_overrides[get_batch_runner]
+            del app.dependency_overrides[get_shared_batch_runner]
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["succeeded"], 2)
+        self.assertEqual(data["tasks"], 1)  # both venues share one grid cell
+        self.assertEqual(data["rows_loaded"], 48)
+        self.assertEqual(data["venues"]["b"]["status"], "success")
+
+    def test_post_weather_batch_requires_jobs(self):
+        response = client.post("/weather/batch", json={"jobs": []})
+        self.assertEqual(response.status_code, 422)
+
+    def test_post_weather_batch_rejects_duplicate_jobs(self):
+        job = {"venue_id": "a", "start_date": "2024-01-01", "end_date": "2024-01-02"}
+        response = client.post("/weather/batch", json={"jobs": [job, job]})
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("Duplicate job", response.json()["detail"])
+
+    def test_unknown_venue_returns_404(self):
+        """
+        Ensure an unregistered venue is reported as 404, not 500.
+        """
+        def runner(venue_id, start_date, end_date):
+            raise UnknownVenueError(venue_id)
+
+        app.dependency_overrides[get_pipeline_runner] = lambda: runner
+        try:
+            response = client.get(
+                "/weather",
+                params={"venue_id": "nowhere", "start_date": "2024-01-01", "end_date": "2024-01-02"}
+            )
+        finally:
+            app.dependency_overrides[get_pipeline_runner] = lambda: (lambda venue_id, start_date, end_date: 1)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["detail"], "Unknown venue: nowhere")
+
+    def test_upstream_outage_returns_503(self):
+        """
+        Ensure an Open-Meteo outage is reported as 503 with Retry-After and
+        the rows committed before it, not as a raw 500.
+        """
+        def runner(venue_id, start_date, end_date):
+            cause = CircuitOpenError("Open-Meteo circuit is open", retry_after=12.3)
+            raise PipelineError(f"Pipeline failed after 24 rows: {cause}", LoadResult(24, 24, 0, 0), None) from cause
+
+        app.dependency_overrides[get_pipeline_runner] = lambda: runner
+        try:
+            response = client.get(
+                "/weather",
+                params={"venue_id": "a", "start_date": "2024-01-01", "end_date": "2024-01-02"}
+            )
+        finally:
+            app.dependency_overrides[get_pipeline_runner] = lambda: (lambda venue_id, start_date, end_date: 1)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "13")
+        self.assertEqual(response.json()["detail"]["rows_loaded"], 24)
+        self.assertEqual(client.get("/upstream/stats").status_code, 200)
+
+    def test_put_and_list_venues(self):
+        """
+        Verify that a registered venue is listed with its grid cell.
+        """
+        response = client.put("/venues/c", json={"latitude": 51.51, "longitude": -0.13, "name": "London"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["cell"], [51.5, -0.1])
+        venues = {v["venue_id"]: v for v in client.get("/venues").json()}
+        self.assertEqual(venues["c"]["name"], "London")
+
+    def test_get_pool_stats(self):
+        """
+        Ensure /pool/stats answers without touching the database.
+        """
+        response = client.get("/pool/stats")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(response.json()["status"], ("ok", "not_started"))
+
+    def test_background_weather_job(self):
+        """
+        Verify that background=true returns 202 with a job id, coalesces an
+        identical request (but not an incremental one), and that
+        /jobs/{job_id} reports the result.
+        """
+        release = threading.Event()
+
+        def runner(venue_id, start_date, end_date, on_chunk=None, incremental=False):
+            release.wait(5)
+            on_chunk(start_date, end_date, LoadResult(48, 48, 0, 0))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            jobs = JobQueue(JobStore(os.path.join(tmp, "jobs.sqlite3")), workers=1, runner=runner)
+            saved = {dependency: app.dependency_overrides[dependency] for dependency in (get_jobs, get_job_submitter)}
+            app.dependency_overrides[get_jobs] = lambda: jobs
+            app.dependency_overrides[get_job_submitter] = lambda: jobs.submit
+            try:
+                params = {"venue_id": "a", "start_date": "2024-01-01", "end_date": "2024-01-02", "background": "true"}
+                first = client.get("/weather", params=params)
+                second = client.get("/weather", params=params)
+                self.assertEqual(first.status_code, 202)
+                self.assertFalse(first.json()["coalesced"])
+                self.assertTrue(second.json()["coalesced"])
+                job_id = first.json()["job_id"]
+                self.assertEqual(second.json()["job_id"], job_id)
+                incremental = client.get("/weather", params={**params, "incremental": "true"}).json()
+                self.assertFalse(incremental["coalesced"])
+
+                release.set()
+                jobs.shutdown(wait=True)
+                job = client.get(f"/jobs/{job_id}").json()
+                self.assertEqual(job["status"], "succeeded")
+                self.assertEqual(job["rows_loaded"], 48)
+                self.assertTrue(client.get(f"/jobs/{incremental['job_id']}").json()["incremental"])
+                self.assertEqual(
+                    {j["job_id"] for j in client.get("/jobs").json()}, {job_id, incremental["job_id"]}
+                )
+                self.assertEqual(client.get("/jobs/missing").status_code, 404)
+
+                params["venue_id"] = "unknown"
+                self.assertEqual(client.get("/weather", params=params).status_code, 404)
+            finally:
+                app.dependency_overrides.update(saved)
+                jobs.store.close()
+
+    def test_get_weather_data_pages(self):
+        """
+        Verify that /weather/data streams the selected fields and a keyset cursor.
+        """
+        calls = []
+
+        def reader(venue_id, start_date, end_date, fields, after, limit):
+            calls.append((fields, after, limit))
+            return iter([(datetime(2024, 1, 1, h, tzinfo=timezone.utc), 1.5) for h in range(limit)])
+
+        app.dependency_overrides[get_weather_reader] = lambda: reader
+        try:
+            params = {"venue_id": "a", "start_date": "2024-01-01", "end_date": "2024-01-02",
+                      "fields": "rain", "limit": 2, "after": "2023-12-31T23:00:00Z"}
+            response = client.get("/weather/data", params=params)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertEqual(page["rows"][0], {"timestamp": "2024-01-01T00:00:00+00:00", "rain": 1.5})
+            self.assertEqual(page["next_after"], "2024-01-01T01:00:00+00:00")
+            self.assertEqual(calls[0][0], ("rain",))
+            self.assertEqual(calls[0][2], 2)
+
+            params["fields"] = "rain,password"
+            self.assertEqual(client.get("/weather/data", params=params).status_code, 422)
+            params["fields"] = "rain"
+            params["end_date"] = "2023-12-01"
+            self.assertEqual(client.get("/weather/data", params=params).status_code, 422)
+        finally:
+            del app.dependency_overrides[get_weather_reader]
+
+    def test_sync_venue(self):
+        """
+        Verify that POST /venues/{venue_id}/sync returns the sync report and
+        maps a missing first-sync start date to 422.
+        """
+        def syncer(venue_id, start_date):
+            if start_date is None:
+                raise ValueError("no sync state")
+            return {"venue_id": venue_id, "start_date": str(start_date), "rows_loaded": 24}
+
+        app.dependency_overrides[get_venue_syncer] = lambda: syncer
+        try:
+            response = client.post("/venues/a/sync", params={"start_date": "2024-01-01"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["rows_loaded"], 24)
+            self.assertEqual(client.post("/venues/a/sync").status_code, 422)
+        finally:
+            del app.dependency_overrides[get_venue_syncer]
+
+    def test_get_weather_aggregates(self):
+        """
+        Verify that /weather/aggregates passes the window and granularity through.
+        """
+        calls = []
+
+        def aggregator(venue_id, start_date, end_date, granularity):
+            calls.append((venue_id, str(start_date), str(end_date), granularity))
+            return [{"period": "2024-01-01", "hours": 24, "source": "rollup"}]
+
+        app.dependency_overrides[get_aggregator] = lambda: aggregator
+        try:
+            params = {"venue_id": "a", "start_date": "2024-01-01", "end_date": "2024-03-31", "granularity": "month"}
+            response = client.get("/weather/aggregates", params=params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["periods"][0]["hours"], 24)
+            self.assertEqual(calls, [("a", "2024-01-01", "2024-03-31", "month")])
+            params["granularity"] = "week"
+            self.assertEqual(client.get("/weather/aggregates", params=params).status_code, 422)
+        finally:
+            del app.dependency_overrides[get_aggregator]
+
+    def test_get_qa(self):
+        """
+        Verify that /qa passes the scope through and returns the report.
+        """
+        calls = []
+
+        def qa_runner(venue_id, start_date, end_date):
+            calls.append((venue_id, str(start_date), end_date))
+            return {"rows": 24, "violations": {"rain_range": 1}, "passed": False}
+
+        app.dependency_overrides[get_qa_runner] = lambda: qa_runner
+        try:
+            response = client.get("/qa", params={"venue_id": "a", "start_date": "2024-01-01"})
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.json()["passed"])
+            self.assertEqual(calls, [("a", "2024-01-01", None)])
+        finally:
+            del app.dependency_overrides[get_qa_runner]
+
+    def test_export_and_download(self):
+        """
+        Verify that /weather/export reports files relative to EXPORT_DIR and
+        that /exports serves them but nothing outside the directory.
+        """
+        def exporter(venue_ids, start_date, end_date, directory, fmt, fields):
+            path = os.path.join(directory, "venue_id=a", "month=2024-01", f"data.{fmt}")
+            os.makedirs(os.path.dirname(path))
+            with open(path, "wb") as f:
+                f.write(b"ARROW1")
+            return [{"venue_id": "a", "month": "2024-01", "path": path, "rows": 24, "bytes": 6}]
+
+        app.dependency_overrides[get_exporter] = lambda: exporter
+        try:
+            with tempfile.TemporaryDirectory() as tmp, mock.patch.object(config, "EXPORT_DIR", tmp):
+                body = {"venue_ids": ["a"], "start_date": "2024-01-01", "end_date": "2024-01-31", "format": "arrow"}
+                response = client.post("/weather/export", json=body)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["rows"], 24)
+                path = response.json()["files"][0]["path"]
+                self.assertEqual(path, os.path.join("venue_id=a", "month=2024-01", "data.arrow"))
+                self.assertEqual(client.get(f"/exports/{path}").content, b"ARROW1")
+                self.assertEqual(client.get("/exports/..%2F..%2Fetc%2Fpasswd").status_code, 404)
+                body["fields"] = ["rain", "id"]
+                self.assertEqual(client.post("/weather/export", json=body).status_code, 422)
+        finally:
+            del app.dependency_overrides[get_exporter]
+
+    def test_metrics_and_profile_header(self):
+        """
+        Verify that a profiled request returns X-Profile-Id and writes the
+        profile, and that /metrics exposes the request histogram.
+        """
+        def runner(venue_id, start_date, end_date):
+            with stage("transform"):
+                sorted(range(1000), key=lambda x: -x)
+            return 1
+
+        app.dependency_overrides[get_pipeline_runner] = lambda: runner
+        try:
+            with tempfile.TemporaryDirectory() as tmp, \
+                    mock.patch.multiple(config, PROFILE_MODE="header", PROFILE_DIR=tmp):
+                params = {"venue_id": "test_venue", "start_date": "2024-01-01", "end_date": "2024-01-02"}
+                self.assertNotIn("X-Profile-Id", client.get("/weather", params=params).headers)
+                response = client.get("/weather", params=params, headers={"X-Profile": "1"})
+                self.assertEqual(response.status_code, 200)
+                profile_id = response.headers["X-Profile-Id"]
+                self.assertTrue(os.path.exists(os.path.join(tmp, f"{profile_id}.pstats")))
+        finally:
+            app.dependency_overrides[get_pipeline_runner] = lambda: (lambda venue_id, start_date, end_date: 1)
+
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn('weather_http_request_seconds_count{method="GET",route="/weather",status="200"}', response.text)
+        self.assertIn("# TYPE weather_pipeline_stage_seconds histogram", response.text)
+
+    def test_always_profiling_is_sampled_and_capped(self):
+        """
+        Verify that PROFILE_MODE=always profiles a PROFILE_SAMPLE_RATE
+        fraction of requests and keeps at most PROFILE_MAX_FILES profiles.
+        """
+        def runner(venue_id, start_date, end_date):
+            with stage("transform"):
+                sorted(range(1000), key=lambda x: -x)
+            return 1
+
+        app.dependency_overrides[get_pipeline_runner] = lambda: runner
+        params = {"venue_id": "test_venue", "start_date": "2024-01-01", "end_date": "2024-01-02"}
+        try:
+            with tempfile.TemporaryDirectory() as tmp, mock.patch.multiple(
+                config, PROFILE_MODE="always", PROFILE_DIR=tmp, PROFILE_MAX_FILES=2, PROFILE_SAMPLE_RATE=1.0
+            ):
+                ids = [client.get("/weather", params=params).headers["X-Profile-Id"] for _ in range(4)]
+                self.assertEqual(sorted(os.listdir(tmp)), sorted(f"{i}.pstats" for i in ids[-2:]))
+                with mock.patch.object(config, "PROFILE_SAMPLE_RATE", 0.0):
+                    self.assertNotIn("X-Profile-Id", client.get("/weather", params=params).headers)
+        finally:
+            app.dependency_overrides[get_pipeline_runner] = lambda: (lambda venue_id, start_date, end_date: 1)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+test_async_extract.py - Tests for the Concurrent Chunked Extractor
+
+Runs extract_weather_data_async() against the local stub HTTP server with the
+archive cache disabled, so every chunk request is visible to the stub.
+"""
+
+import asyncio
+import unittest
+from datetime import date
+from unittest import mock
+
+import httpx
+
+from app import config
+from app.async_extract import extract_weather_data_async, merge_chunks, split_date_range
+from app.upstream import UpstreamError
+from tests.stub_server import OpenMeteoStub
+
+class TestSplitDateRange(unittest.TestCase):
+    def test_splits_into_inclusive_chunks(self):
+        self.assertEqual(
+            split_date_range("2024-01-01", "2024-01-10", 4),
+            [
+                (date(2024, 1, 1), date(2024, 1, 4)),
+                (date(2024, 1, 5), date(2024, 1, 8)),
+                (date(2024, 1, 9), date(2024, 1, 10)),
+            ],
+        )
+
+    def test_empty_when_end_precedes_start(self):
+        self.assertEqual(split_date_range("2024-01-02", "2024-01-01", 4), [])
+
+class TestMergeChunks(unittest.TestCase):
+    def test_orders_chunks_by_first_timestamp(self):
+        later = {"hourly": {"time": ["2024-01-02T00:00"], "rain": [2.0]}}
+        earlier = {"hourly": {"time": ["2024-01-01T00:00"], "rain": [1.0]}}
+        merged = merge_chunks([later, earlier])
+        self.assertEqual(merged["hourly"]["time"], ["2024-01-01T00:00", "2024-01-02T00:00"])
+        self.assertEqual(merged["hourly"]["rain"], [1.0, 2.0])
+        self.assertEqual(merged["hourly"]["snowfall"], [None, None])
+
+class TestExtractAsync(unittest.TestCase):
+    def setUp(self):
+        self.stub = OpenMeteoStub().__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        patcher = mock.patch.multiple(
+            config,
+            OPEN_METEO_ARCHIVE_URL=self.stub.url,
+            ARCHIVE_CACHE_PATH="",
+            EXTRACT_CHUNK_DAYS=7,
+            EXTRACT_CONCURRENCY=2,
+            EXTRACT_BACKOFF=0.01,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def extract(self, start, end):
+        return asyncio.run(extract_weather_data_async(40.71, -74.01, start, end))
+
+    def test_long_range_is_fetched_in_concurrent_chunks(self):
+        self.stub.delay = 0.05
+        data = self.extract("2024-01-01", "2024-01-31")
+        self.assertEqual(len(self.stub.requests), 5)
+        self.assertEqual(self.stub.max_in_flight, 2)
+        times = data["hourly"]["time"]
+        self.assertEqual(len(times), 31 * 24)
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(len(data["hourly"]["temperature_2m"]), 31 * 24)
+
+    def test_rate_limited_chunk_is_retried_after_retry_after(self):
+        self.stub.faults.append((429, {"Retry-After": "0"}))
+        self.stub.faults.append((503, {}))
+        data = self.extract("2024-01-01", "2024-01-02")
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertEqual(len(data["hourly"]["time"]), 48)
+
+    def test_persistent_errors_are_raised(self):
+        self.stub.faults.extend([(500, {})] * (config.EXTRACT_MAX_RETRIES + 1))
+        with self.assertRaises(UpstreamError) as ctx:
+            self.extract("2024-01-01", "2024-01-02")
+        self.assertEqual(ctx.exception.status, 500)
+
+    def test_client_errors_are_not_retried(self):
+        self.stub.faults.append((400, {}))
+        with self.assertRaises(httpx.HTTPStatusError):
+            self.extract("2024-01-01", "2024-01-02")
+        self.assertEqual(len(self.stub.requests), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+test_batch.py - Unit Tests for the Batch Backfill Runner
+
+The pipeline runner is replaced by small fakes, so these tests check the
+scheduling (worker pool, per-venue limit) and the report, not the ETL.
+"""
+
+import threading
+import time
+import unittest
+from collections import defaultdict
+
+from app.batch import BatchJob, run_batch
+from app.pipeline import LoadResult
+from app.venues import Venue, VenueRegistry
+
+def picklable_runner(venue_id, start_date, end_date):
+    """Module-level fake runner for the process executor."""
+    if venue_id == "broken":
+        raise RuntimeError("upstream unavailable")
+    return LoadResult(24, 24, 0, 0)
+
+class ConcurrencyTracker:
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.total_peak = 0
+
+    def __call__(self, venue_id, start_date, end_date):
+        with self.lock:
+            self.running[venue_id] += 1
+            self.peak[venue_id] = max(self.peak[venue_id], self.running[venue_id])
+            self.total_peak = max(self.total_peak, sum(self.running.values()))
+        time.sleep(self.delay)
+        with self.lock:
+            self.running[venue_id] -= 1
+        return LoadResult(24, 20, 4, 0)
+
+class TestRunBatch(unittest.TestCase):
+    def jobs(self, venues, ranges_per_venue):
+        return [
+            BatchJob(venue, f"2024-01-{day:02d}", f"2024-01-{day:02d}")
+            for venue in venues
+            for day in range(1, ranges_per_venue + 1)
+        ]
+
+    def test_per_venue_limit_is_respected(self):
+        tracker = ConcurrencyTracker()
+        report = run_batch(self.jobs(["a", "b", "c"], 4), max_workers=6, per_venue_limit=1, runner=tracker)
+        self.assertEqual(max(tracker.peak.values()), 1)
+        self.assertGreater(tracker.total_peak, 1)
+        self.assertEqual(report["succeeded"], 12)
+        self.assertEqual(report["rows_loaded"], 12 * 24)
+        self.assertEqual(report["venues"]["a"], {
+            "status": "success", "rows_loaded": 96, "inserted": 80, "updated": 16, "unchanged": 0, "errors": [],
+        })
+
+    def test_worker_pool_bounds_total_concurrency(self):
+        tracker = ConcurrencyTracker()
+        run_batch(self.jobs(["a", "b", "c", "d"], 2), max_workers=2, per_venue_limit=2, runner=tracker)
+        self.assertLessEqual(tracker.total_peak, 2)
+
+    def test_failures_are_reported_per_venue(self):
+        report = run_batch(self.jobs(["ok", "broken"], 2), max_workers=2, runner=picklable_runner)
+        self.assertEqual((report["succeeded"], report["failed"]), (2, 2))
+        self.assertEqual(report["venues"]["ok"]["status"], "success")
+        broken = report["venues"]["broken"]
+        self.assertEqual(broken["status"], "failed")
+        self.assertIn("upstream unavailable", broken["errors"][0]["error"])
+        self.assertGreater(report["rows_per_second"], 0)
+
+    def test_process_executor(self):
+        report = run_batch(self.jobs(["a", "b"], 2), max_workers=2, executor="process", runner=picklable_runner)
+        self.assertEqual(report["rows_loaded"], 96)
+
+    def test_venues_in_one_grid_cell_share_a_task(self):
+        registry = VenueRegistry([
+            Venue("a", 40.71, -74.01), Venue("b", 40.69, -73.99), Venue("c", 51.51, -0.13),
+        ])
+        shared_calls = []
+
+        def shared_runner(venue_ids, start_date, end_date):
+            shared_calls.append(venue_ids)
+            return {venue_id: LoadResult(24, 24, 0, 0) for venue_id in venue_ids}
+
+        report = run_batch(
+            self.jobs(["a", "b", "c", "unregistered"], 1), max_workers=2,
+            runner=picklable_runner, shared_runner=shared_runner, registry=registry,
+        )
+        self.assertEqual(report["tasks"], 3)
+        self.assertEqual(shared_calls, [["a", "b"]])
+        self.assertEqual(report["rows_loaded"], 4 * 24)
+
+    def test_duplicate_jobs_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "Duplicate job: a 2024-01-01"):
+            run_batch(self.jobs(["a", "b"], 1) + self.jobs(["a"], 1), runner=picklable_runner)
+
+    def test_unknown_executor_is_rejected(self):
+        with self.assertRaises(ValueError):
+            run_batch([], executor="fiber")
+
+if __name__ == "__main__":
+    unittest.main()
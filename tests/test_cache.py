@@ -0,0 +1,102 @@
+"""
+test_cache.py - Tests for the Open-Meteo Archive Cache
+
+extract_weather_data() is pointed at a local stub HTTP server, so the tests
+check which day ranges actually go upstream without using the network.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from datetime import date
+from unittest import mock
+
+from app import config
+from app.cache import ArchiveCache, missing_ranges
+from app.models import HOURLY_FIELDS
+from app.pipeline import extract_weather_data
+from tests.stub_server import OpenMeteoStub
+
+class TestMissingRanges(unittest.TestCase):
+    def test_collapses_gaps_into_contiguous_ranges(self):
+        cached = {"2024-01-02", "2024-01-03", "2024-01-06"}
+        self.assertEqual(
+            missing_ranges(date(2024, 1, 1), date(2024, 1, 7), cached),
+            [
+                (date(2024, 1, 1), date(2024, 1, 1)),
+                (date(2024, 1, 4), date(2024, 1, 5)),
+                (date(2024, 1, 7), date(2024, 1, 7)),
+            ],
+        )
+
+class TestArchiveCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+        self.stub = OpenMeteoStub().__enter__()
+        patcher = mock.patch.multiple(
+            config,
+            OPEN_METEO_ARCHIVE_URL=self.stub.url,
+            ARCHIVE_CACHE_PATH=self.path,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache_patcher = mock.patch("app.cache._cache", None)
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
+    def tearDown(self):
+        self.stub.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def test_repeated_range_is_served_from_cache(self):
+        first = extract_weather_data(40.71, -74.01, "2024-01-01", "2024-01-03")
+        second = extract_weather_data(40.71, -74.01, "2024-01-01", "2024-01-03")
+        self.assertEqual(self.stub.requests, [("2024-01-01", "2024-01-03")])
+        self.assertEqual(len(first["hourly"]["time"]), 72)
+        self.assertEqual(first["hourly"], second["hourly"])
+
+    def test_overlapping_range_fetches_only_missing_days(self):
+        extract_weather_data(40.71, -74.01, "2024-01-01", "2024-01-10")
+        data = extract_weather_data(40.71, -74.01, "2024-01-05", "2024-01-15")
+        self.assertEqual(self.stub.requests, [("2024-01-01", "2024-01-10"), ("2024-01-11", "2024-01-15")])
+        self.assertEqual(data["hourly"]["time"][0], "2024-01-05T00:00")
+        self.assertEqual(data["hourly"]["time"][-1], "2024-01-15T23:00")
+        self.assertEqual(len(data["hourly"]["temperature_2m"]), 11 * 24)
+
+    def test_other_locations_are_cached_separately(self):
+        extract_weather_data(40.71, -74.01, "2024-01-01", "2024-01-01")
+        extract_weather_data(51.51, -0.13, "2024-01-01", "2024-01-01")
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_recent_days_expire_after_ttl(self):
+        now = [time.mktime((2024, 1, 10, 12, 0, 0, 0, 0, -1))]
+        cache = ArchiveCache(self.path, 10**9, recent_days=3, recent_ttl=60, clock=lambda: now[0])
+        days = {
+            "2024-01-01": {"time": ["2024-01-01T00:00"], "rain": [0.0]},
+            "2024-01-09": {"time": ["2024-01-09T00:00"], "rain": [0.0]},
+        }
+        cache.put_days(1.0, 2.0, ["rain"], days)
+        now[0] += 120
+        cached = cache.get_days(1.0, 2.0, ["rain"], date(2024, 1, 1), date(2024, 1, 9))
+        self.assertEqual(list(cached), ["2024-01-01"])
+        cache.close()
+
+    def test_least_recently_used_days_are_evicted(self):
+        now = [time.time()]
+        cache = ArchiveCache(self.path, 10**9, recent_days=0, recent_ttl=0, clock=lambda: now[0])
+        for day in ("2020-01-01", "2020-01-02", "2020-01-03"):
+            now[0] += 1
+            cache.put_days(1.0, 2.0, HOURLY_FIELDS, {day: {"time": [day + "T00:00"] * 24}})
+        now[0] += 1
+        cache.get_days(1.0, 2.0, HOURLY_FIELDS, date(2020, 1, 1), date(2020, 1, 1))
+        cache.max_bytes = cache.stats()["bytes"] - 1
+        now[0] += 1
+        cache.put_days(1.0, 2.0, HOURLY_FIELDS, {"2020-01-04": {"time": ["2020-01-04T00:00"] * 24}})
+        cached = cache.get_days(1.0, 2.0, HOURLY_FIELDS, date(2020, 1, 1), date(2020, 1, 4))
+        self.assertEqual(sorted(cached), ["2020-01-01", "2020-01-04"])
+        cache.close()
+
+if __name__ == "__main__":
+    unittest.main()
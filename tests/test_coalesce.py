@@ -0,0 +1,73 @@
+"""
+test_coalesce.py - Unit Tests for the GET /weather Result Cache
+
+Covers single-flight sharing of concurrent runs, TTL expiry, LRU eviction
+and that failures are shared but not cached.
+"""
+
+import asyncio
+import unittest
+
+from app.coalesce import ResultCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResultCache(ttl=10, max_entries=2, clock=self.clock)
+        self.calls = 0
+
+    async def compute(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.calls
+
+    def run_many(self, *keys):
+        async def main():
+            return await asyncio.gather(*(self.cache.run(key, self.compute) for key in keys))
+        return asyncio.run(main())
+
+    def test_concurrent_identical_requests_share_one_run(self):
+        results = self.run_many("a", "a", "a")
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [(1, "miss"), (1, "coalesced"), (1, "coalesced")])
+
+    def test_results_expire_after_ttl(self):
+        self.run_many("a")
+        self.assertEqual(self.run_many("a"), [(1, "hit")])
+        self.clock.now = 10
+        self.assertEqual(self.run_many("a"), [(2, "miss")])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.run_many("a")
+        self.run_many("b")
+        self.run_many("a")  # hit; "b" is now the least recently used
+        self.run_many("c")
+        self.assertEqual(self.cache.stats()["entries"], 2)
+        self.assertEqual(self.run_many("a")[0][1], "hit")
+        self.assertEqual(self.run_many("b")[0][1], "miss")
+
+    def test_failures_are_shared_but_not_cached(self):
+        async def fail():
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        async def main():
+            return await asyncio.gather(
+                self.cache.run("a", fail), self.cache.run("a", fail), return_exceptions=True
+            )
+
+        results = asyncio.run(main())
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(self.run_many("a"), [(2, "miss")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+test_db.py - Unit Tests for the Connection Pool
+
+These tests drive app.db.ConnectionPool with fake connection objects, so they
+need neither a database nor Docker.
+"""
+
+import os
+import threading
+import unittest
+from unittest import mock
+
+import psycopg2
+import psycopg2.extensions
+
+from app import config
+from app.db import ConnectionPool, PoolTimeout, _connect_kwargs, close_pool
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.opened = []
+
+    def connect(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+    def test_connections_are_reused(self):
+        pool = ConnectionPool(1, 2, timeout=1, connect=self.connect)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_exhausted_pool_times_out(self):
+        pool = ConnectionPool(0, 1, timeout=0.05, connect=self.connect)
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_waiter_gets_released_connection(self):
+        pool = ConnectionPool(0, 1, timeout=2, connect=self.connect)
+        conn = pool.getconn()
+        threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+        self.assertIs(pool.getconn(), conn)
+        self.assertGreater(pool.stats()["wait_time_max"], 0)
+
+    def test_broken_idle_connection_is_replaced_on_checkout(self):
+        pool = ConnectionPool(1, 1, timeout=1, healthcheck_after=0, connect=self.connect)
+        stale = self.opened[0]
+        stale.broken = True
+        conn = pool.getconn()
+        self.assertIsNot(conn, stale)
+        self.assertTrue(stale.closed)
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        pool = ConnectionPool(0, 1, timeout=1, connect=self.connect)
+        conn = pool.getconn()
+        conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        pool.putconn(conn)
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_stats_report_usage(self):
+        pool = ConnectionPool(1, 3, timeout=1, connect=self.connect)
+        first = pool.getconn()
+        pool.getconn()
+        pool.putconn(first)
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["in_use"], stats["idle"]), (2, 1, 1))
+        self.assertEqual(stats["acquired"], 2)
+
+    def test_closeall_closes_idle_and_returned_connections(self):
+        pool = ConnectionPool(1, 2, timeout=0.05, connect=self.connect)
+        borrowed = pool.getconn()
+        spare = pool.getconn()
+        pool.putconn(spare)
+        pool.closeall()
+        self.assertTrue(spare.closed)
+        pool.putconn(borrowed)
+        self.assertTrue(borrowed.closed)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+
+class TestDatabaseSettings(unittest.TestCase):
+    def test_settings_are_read_once_per_pool(self):
+        close_pool()
+        self.addCleanup(close_pool)
+        with mock.patch.dict(os.environ, {"DB_HOST": "first", "DB_SSLMODE": "disable"}):
+            self.assertEqual(_connect_kwargs()["host"], "first")
+            os.environ["DB_HOST"] = "second"
+            self.assertEqual(_connect_kwargs()["host"], "first")
+            close_pool()
+            self.assertEqual(config.database().host, "second")
+            self.assertEqual(config.database().sslmode, "disable")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+test_export.py - Tests for the Parquet / Arrow IPC Export
+
+Checks partitioning by venue and month, column types and atomic replacement
+without a database, then exports rows stored in the Testcontainers
+PostgreSQL database.
+"""
+
+import os
+from datetime import date, datetime, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.export import export_weather
+from app.models import HOURLY_FIELDS
+from app.pipeline import load
+from tests.conftest import synthetic_records
+
+def _rows(venue_id, start, hours, fields=("rain", "cloud_cover")):
+    first = int(start.replace(tzinfo=timezone.utc).timestamp()) * 1_000_000
+    return [(venue_id, first + h * 3_600_000_000, h / 10, h % 100) for h in range(hours)]
+
+def test_rows_are_split_by_venue_and_month(tmp_path):
+    rows = _rows("v1", datetime(2024, 1, 31, 12), 24) + _rows("v/2", datetime(2024, 1, 31), 1)
+    files = export_weather(None, None, None, str(tmp_path), "arrow", ("rain", "cloud_cover"), rows=rows)
+    assert [(f["venue_id"], f["month"], f["rows"]) for f in files] == [
+        ("v1", "2024-01", 12), ("v1", "2024-02", 12), ("v/2", "2024-01", 1)
+    ]
+    assert os.path.relpath(files[2]["path"], tmp_path) == os.path.join("venue_id=v%2F2", "month=2024-01", "data.arrow")
+
+    table = pa.ipc.open_file(pa.memory_map(files[1]["path"])).read_all()
+    assert table.schema.field("timestamp").type == pa.timestamp("us", tz="UTC")
+    assert table.schema.field("rain").type == pa.float32()
+    assert table.schema.field("cloud_cover").type == pa.int32()
+    assert table.column("timestamp")[0].as_py() == datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+def test_failed_export_keeps_existing_partition(tmp_path):
+    fields = ("rain", "cloud_cover")
+    (done,) = export_weather(None, None, None, str(tmp_path), "parquet", fields, rows=_rows("v1", datetime(2024, 1, 1), 3))
+
+    def failing_rows():
+        yield from _rows("v1", datetime(2024, 1, 1), 5)
+        raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError):
+        export_weather(None, None, None, str(tmp_path), "parquet", fields, rows=failing_rows())
+    assert pq.read_table(done["path"]).num_rows == 3
+    assert os.listdir(os.path.dirname(done["path"])) == ["data.parquet"]
+
+@pytest.mark.usefixtures("postgres_container")
+def test_export_streams_stored_rows(tmp_path):
+    venue_id = "test_export"
+    load(synthetic_records(48, start=datetime(2020, 1, 31)), venue_id)  # 2020-01-31 .. 2020-02-01
+
+    files = export_weather([venue_id], date(2020, 1, 31), date(2020, 2, 1), str(tmp_path), "parquet")
+    assert [(f["month"], f["rows"]) for f in files] == [("2020-01", 24), ("2020-02", 24)]
+    table = pq.read_table(files[0]["path"])
+    assert table.column_names == ["timestamp", *HOURLY_FIELDS]
+    assert table.column("timestamp")[1].as_py() == datetime(2020, 1, 31, 1, tzinfo=timezone.utc)
+    assert table.column("cloud_cover").type == pa.int32()
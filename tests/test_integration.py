@@ -29,6 +29,9 @@ def postgres_container():
         os.environ["DB_PASSWORD"] = parsed.password
         # Disable SSL for Testcontainers Postgres
         os.environ["DB_SSLMODE"] = "disable"
+        # The app reads DB_* once per pool; drop anything read before this point
+        from app.db import close_pool
+        close_pool()
 
         # Initialize the database schema
         conn = psycopg2.connect(
@@ -55,6 +58,13 @@ def client(postgres_container):
 
 # Integration test verifying API and DB
 def test_weather_pipeline_integration(client):
+    # Register the venue so the pipeline can look up its coordinates
+    response = client.put(
+        "/venues/integration_test",
+        json={"latitude": 40.71, "longitude": -74.01, "name": "Integration Test"}
+    )
+    assert response.status_code == 200, response.text
+
     # Call the endpoint
     response = client.get(
         "/weather",
@@ -0,0 +1,168 @@
+"""
+test_jobs.py - Unit Tests for Background Pipeline Jobs
+
+Runs the JobQueue against a temporary SQLite store and fake runners, so no
+database or upstream API is needed.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from app.jobs import JobQueue, JobStore
+from app.pipeline import LoadResult, PipelineError
+
+def wait_for(queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.store.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} is {queue.store.get(job_id)['status']}, expected {status}")
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.sqlite3")
+        self.queues = []
+
+    def tearDown(self):
+        for queue in self.queues:
+            queue.shutdown(wait=True)
+            queue.store.close()
+        self.tmp.cleanup()
+
+    def make_queue(self, runner):
+        queue = JobQueue(JobStore(self.path), workers=2, runner=runner)
+        self.queues.append(queue)
+        return queue
+
+    def test_progress_and_result(self):
+        def runner(venue_id, start, end, on_chunk=None):
+            on_chunk("2024-01-01", "2024-01-31", LoadResult(744, 744, 0, 0))
+            on_chunk("2024-02-01", "2024-02-10", LoadResult(240, 200, 40, 0))
+
+        queue = self.make_queue(runner)
+        job, coalesced = queue.submit("v1", "2024-01-01", "2024-02-10")
+        self.assertFalse(coalesced)
+        job = wait_for(queue, job["job_id"], "succeeded")
+        self.assertEqual(job["chunks_done"], 2)
+        self.assertEqual(job["rows_loaded"], 984)
+        self.assertEqual(job["inserted"], 944)
+        self.assertEqual(job["updated"], 40)
+        self.assertIsNotNone(job["finished_at"])
+
+    def test_identical_requests_are_coalesced(self):
+        release = threading.Event()
+        calls = []
+
+        def runner(venue_id, start, end, on_chunk=None):
+            calls.append(venue_id)
+            release.wait(5)
+
+        queue = self.make_queue(runner)
+        first, _ = queue.submit("v1", "2024-01-01", "2024-01-02")
+        second, coalesced = queue.submit("v1", "2024-01-01", "2024-01-02")
+        other, other_coalesced = queue.submit("v1", "2024-01-01", "2024-01-03")
+        self.assertTrue(coalesced)
+        self.assertEqual(first["job_id"], second["job_id"])
+        self.assertFalse(other_coalesced)
+        release.set()
+        wait_for(queue, first["job_id"], "succeeded")
+        wait_for(queue, other["job_id"], "succeeded")
+        self.assertEqual(len(calls), 2)
+
+        # Finished jobs are not joined; the same request runs again.
+        again, coalesced = queue.submit("v1", "2024-01-01", "2024-01-02")
+        self.assertFalse(coalesced)
+        self.assertNotEqual(again["job_id"], first["job_id"])
+
+    def test_incremental_jobs_run_incrementally_and_apart_from_full_runs(self):
+        release = threading.Event()
+        calls = []
+
+        def runner(venue_id, start, end, on_chunk=None, incremental=False):
+            calls.append(incremental)
+            release.wait(5)
+
+        queue = self.make_queue(runner)
+        full, _ = queue.submit("v1", "2024-01-01", "2024-01-02")
+        incremental, coalesced = queue.submit("v1", "2024-01-01", "2024-01-02", incremental=True)
+        self.assertFalse(coalesced)
+        self.assertTrue(incremental["incremental"])
+        self.assertTrue(queue.submit("v1", "2024-01-01", "2024-01-02", incremental=True)[1])
+        release.set()
+        wait_for(queue, full["job_id"], "succeeded")
+        wait_for(queue, incremental["job_id"], "succeeded")
+        self.assertEqual(sorted(calls), [False, True])
+
+    def test_failure_is_recorded(self):
+        def runner(venue_id, start, end, on_chunk=None):
+            on_chunk("2024-01-01", "2024-01-01", LoadResult(24, 24, 0, 0))
+            raise PipelineError("extract failed", LoadResult(24, 24, 0, 0), ("2024-01-02", "2024-01-02"))
+
+        queue = self.make_queue(runner)
+        job, _ = queue.submit("v1", "2024-01-01", "2024-01-02")
+        job = wait_for(queue, job["job_id"], "failed")
+        self.assertIn("extract failed", job["error"])
+        self.assertEqual(job["rows_loaded"], 24)
+
+    def test_unfinished_jobs_are_recovered(self):
+        store = JobStore(self.path)
+        queued, _ = store.create_or_get_active("v1", "2024-01-01", "2024-01-02", 1)
+        running, _ = store.create_or_get_active("v2", "2024-01-01", "2024-01-02", 1)
+        store.update(running["job_id"], status="running", chunks_done=1, rows_loaded=24)
+        store.close()
+
+        calls = []
+
+        def runner(venue_id, start, end, on_chunk=None):
+            calls.append(venue_id)
+            on_chunk(start, end, LoadResult(48, 48, 0, 0))
+
+        queue = self.make_queue(runner)
+        self.assertEqual(queue.recover(), 2)
+        wait_for(queue, queued["job_id"], "succeeded")
+        job = wait_for(queue, running["job_id"], "succeeded")
+        self.assertEqual(job["rows_loaded"], 48)
+        self.assertEqual(sorted(calls), ["v1", "v2"])
+
+    def test_recover_only_claims_orphaned_jobs(self):
+        release = threading.Event()
+        calls = []
+
+        def runner(venue_id, start, end, on_chunk=None):
+            calls.append(venue_id)
+            release.wait(5)
+
+        live = self.make_queue(runner)
+        held, _ = live.submit("v1", "2024-01-01", "2024-01-02")
+        wait_for(live, held["job_id"], "running")
+        store = JobStore(self.path)
+        orphan, _ = store.create_or_get_active("v2", "2024-01-01", "2024-01-02", 1,
+                                               owner="gone", lease_until=time.time() - 1)
+        store.close()
+
+        other = self.make_queue(runner)
+        self.assertEqual(other.recover(), 1)
+        self.assertEqual(other.recover(), 0)
+        self.assertEqual(live.recover(), 0)
+        release.set()
+        wait_for(other, orphan["job_id"], "succeeded")
+        wait_for(live, held["job_id"], "succeeded")
+        self.assertEqual(sorted(calls), ["v1", "v2"])
+
+    def test_heartbeat_adopts_jobs_whose_lease_expired(self):
+        store = JobStore(self.path)
+        orphan, _ = store.create_or_get_active("v1", "2024-01-01", "2024-01-02", 1,
+                                               owner="gone", lease_until=time.time() + 0.2)
+        store.close()
+        queue = JobQueue(JobStore(self.path), workers=1, runner=lambda *args, **kwargs: None, lease=0.15)
+        self.queues.append(queue)
+        wait_for(queue, orphan["job_id"], "succeeded")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+test_landing.py - Tests for Raw Landing and Offline Replay
+
+Runs the pipeline against the stub HTTP server with landing enabled and
+load() mocked, then shuts the stub down and replays the landed archives.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+from app import config
+from app.cache import ArchiveCache
+from app.landing import RawLanding, read_columns
+from app.pipeline import LoadResult, PipelineError, replay_archives, run_pipeline, run_pipeline_async
+from app.venues import Venue, VenueRegistry
+from tests.stub_server import OpenMeteoStub, synthetic_hourly
+
+class TestRawLanding(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.landing = RawLanding(tmp.name)
+
+    def test_put_lands_one_file_per_venue(self):
+        content = json.dumps({"hourly": synthetic_hourly(date(2024, 1, 1), date(2024, 1, 2), ["rain"])}).encode()
+        paths = self.landing.put(["v1", "v/2"], date(2024, 1, 1), date(2024, 1, 2), content)
+        self.assertEqual(os.path.relpath(paths[1], self.landing.root),
+                         os.path.join("venue_id=v%2F2", "2024-01-01_2024-01-02.json.gz"))
+        with open(paths[0], "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), content)
+        self.assertEqual(len(read_columns(paths[1])), 48)
+
+    def test_list_filters_by_overlap_and_orders_by_first_day(self):
+        for first, last in [(date(2024, 1, 7), date(2024, 1, 9)), (date(2024, 1, 1), date(2024, 1, 3)),
+                            (date(2024, 1, 4), date(2024, 1, 6))]:
+            self.landing.put(["v1"], first, last, b"{}")
+        archives = self.landing.list("v1", "2024-01-03", "2024-01-06")
+        self.assertEqual([(first.day, last.day) for first, last, _ in archives], [(1, 3), (4, 6)])
+        self.assertEqual(self.landing.list("unknown"), [])
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.multiple(
+            config, RAW_LANDING_DIR=tmp.name, ARCHIVE_CACHE_PATH="", PIPELINE_CHUNK_DAYS=3,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        registry = VenueRegistry([Venue("venue", 40.71, -74.01)])
+        registry_patcher = mock.patch("app.pipeline.get_registry", return_value=registry)
+        registry_patcher.start()
+        self.addCleanup(registry_patcher.stop)
+        load_patcher = mock.patch(
+            "app.pipeline.load", side_effect=lambda records, venue_id: LoadResult(len(records), len(records), 0, 0)
+        )
+        self.load = load_patcher.start()
+        self.addCleanup(load_patcher.stop)
+
+        with OpenMeteoStub() as stub, mock.patch.object(config, "OPEN_METEO_ARCHIVE_URL", stub.url):
+            run_pipeline("venue", "2024-01-01", "2024-01-10")
+        self.load.reset_mock()
+
+    def test_replay_reloads_landed_chunks_offline(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers), \
+                    mock.patch("app.pipeline.request_archive", side_effect=AssertionError("network")):
+                self.load.reset_mock()
+                result = run_pipeline("venue", "2024-01-02", "2024-01-10", replay=True)
+                self.assertEqual(result, LoadResult(216, 216, 0, 0))
+                self.assertEqual([len(call.args[0]) for call in self.load.call_args_list], [48, 72, 72, 24])
+
+    def test_corrupt_archive_fails_with_committed_progress(self):
+        (_, _, path), = RawLanding(config.RAW_LANDING_DIR).list("venue", "2024-01-04", "2024-01-04")
+        with open(path, "wb") as f:
+            f.write(b"not gzip")
+        with self.assertRaises(PipelineError) as ctx:
+            replay_archives("venue", "2024-01-01", "2024-01-10", workers=1)
+        self.assertEqual(ctx.exception.result.rows_loaded, 72)
+        self.assertEqual(ctx.exception.failed_range, (date(2024, 1, 4), date(2024, 1, 6)))
+
+    def test_cached_and_async_paths_land_decodable_archives(self):
+        cache = ArchiveCache(os.path.join(config.RAW_LANDING_DIR, "cache.sqlite"), 1 << 20, 0, 0)
+        self.addCleanup(cache.close)
+        with OpenMeteoStub() as stub, mock.patch.object(config, "OPEN_METEO_ARCHIVE_URL", stub.url), \
+                mock.patch("app.pipeline.get_archive_cache", return_value=cache), \
+                mock.patch("app.async_extract.get_archive_cache", return_value=cache):
+            run_pipeline("venue", "2024-01-11", "2024-01-12")
+            asyncio.run(run_pipeline_async("venue", "2024-01-13", "2024-01-13"))
+        self.assertEqual([len(call.args[0]) for call in self.load.call_args_list], [48, 24])
+        archives = RawLanding(config.RAW_LANDING_DIR).list("venue", "2024-01-11", "2024-01-13")
+        self.assertEqual([len(read_columns(path)) for _, _, path in archives], [48, 24])
+
+    def test_replay_requires_landing(self):
+        with mock.patch.object(config, "RAW_LANDING_DIR", ""), self.assertRaises(ValueError):
+            replay_archives("venue", "2024-01-01", "2024-01-10")
@@ -0,0 +1,69 @@
+"""
+test_load.py - Integration Tests for the Bulk Loader
+
+Loads the same synthetic records with every load() method into the
+Testcontainers PostgreSQL database and checks the stored rows, including
+re-running a load in upsert mode.
+"""
+
+import pytest
+
+from app.pipeline import LOAD_METHODS, _CopyStream, load
+from tests.conftest import synthetic_records
+
+def test_copy_stream_encodes_csv_in_batches():
+    rows = [("v,1", "2024-01-01T00:00", 1.5, None)] * 5
+    stream = _CopyStream(rows, batch_size=2)
+    chunks = []
+    while True:
+        data = stream.read(10)
+        if not data:
+            break
+        assert len(data) <= 10
+        chunks.append(data)
+    assert "".join(chunks) == '"v,1",2024-01-01T00:00,1.5,\n' * 5
+
+def test_unknown_load_method_is_rejected():
+    with pytest.raises(ValueError):
+        load([], "venue", method="bogus")
+
+@pytest.mark.parametrize("method", LOAD_METHODS)
+def test_load_methods_store_all_rows(db_conn, method):
+    venue_id = f"test_load_{method}"
+    records = synthetic_records(50)
+    records[3]["temperature_2m"] = None
+
+    result = load(records, venue_id, method=method, batch_size=7)
+    assert result.rows_loaded == 50
+    assert result.inserted == 50
+
+    with db_conn.cursor() as cur:
+        cur.execute(
+            "SELECT COUNT(*), COUNT(temperature_2m), MAX(wind_direction_10m) "
+            "FROM weather_data WHERE venue_id = %s",
+            (venue_id,),
+        )
+        count, non_null_temps, max_direction = cur.fetchone()
+    assert count == 50
+    assert non_null_temps == 49
+    assert max_direction == 49
+
+@pytest.mark.parametrize("method", LOAD_METHODS)
+def test_upsert_reload_is_idempotent(db_conn, method):
+    venue_id = f"test_upsert_{method}"
+    records = synthetic_records(30)
+    load(records, venue_id, method=method, batch_size=7, upsert=True)
+
+    records[0]["temperature_2m"] = 99.0
+    records.append(dict(records[1]))  # duplicate timestamp within the batch
+    result = load(records + synthetic_records(40)[30:], venue_id, method=method, upsert=True)
+    assert (result.rows_loaded, result.inserted, result.updated, result.unchanged) == (40, 10, 1, 29)
+
+    with db_conn.cursor() as cur:
+        cur.execute(
+            "SELECT COUNT(*), MAX(temperature_2m) FROM weather_data WHERE venue_id = %s",
+            (venue_id,),
+        )
+        count, max_temp = cur.fetchone()
+    assert count == 40
+    assert max_temp == 99.0
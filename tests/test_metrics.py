@@ -0,0 +1,72 @@
+"""
+test_metrics.py - Unit Tests for Pipeline Instrumentation
+
+Covers the Prometheus text rendering, stage timing, per-request profiling
+across threads, and the upstream counters recorded by the extractor.
+"""
+
+import asyncio
+import unittest
+from datetime import date
+from unittest import mock
+
+from app import config, metrics
+from app.pipeline import fetch_archive
+from tests.stub_server import OpenMeteoStub
+
+class TestMetrics(unittest.TestCase):
+    def test_counter_and_histogram_render(self):
+        registry = metrics.Registry()
+        counter = registry.register(metrics.Counter("test_total", "A counter.", ("kind",)))
+        histogram = registry.register(metrics.Histogram("test_seconds", "A histogram.", buckets=(0.1, 1.0)))
+        counter.inc(kind="a")
+        counter.inc(2, kind='b"q')
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        text = registry.render()
+        self.assertIn("# TYPE test_total counter", text)
+        self.assertIn('test_total{kind="a"} 1', text)
+        self.assertIn('test_total{kind="b\\"q"} 2', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("test_seconds_count 3", text)
+        with self.assertRaises(ValueError):
+            counter.inc(other="x")
+
+    def test_stage_records_duration(self):
+        before = metrics.STAGE_SECONDS.count(stage="unit-test")
+        with metrics.stage("unit-test"):
+            pass
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage="unit-test"), before + 1)
+
+    def test_profiling_follows_stages_into_threads(self):
+        def work():
+            with metrics.stage("unit-test"):
+                return sorted(range(1000), key=lambda x: -x)[0]
+
+        async def request():
+            with metrics.profiling() as profile:
+                await asyncio.to_thread(work)
+                work()
+            return profile
+
+        profile = asyncio.run(request())
+        self.assertIn("sorted", profile.summary())
+        # Outside profiling() stages are only timed.
+        with metrics.stage("unit-test"):
+            self.assertIsNone(metrics._current_profile.get())
+
+    def test_fetch_archive_counts_bytes_and_status(self):
+        with OpenMeteoStub() as stub, mock.patch.object(config, "OPEN_METEO_ARCHIVE_URL", stub.url):
+            bytes_before = metrics.UPSTREAM_BYTES.value()
+            ok_before = metrics.UPSTREAM_REQUESTS.value(status=200)
+            decode_before = metrics.STAGE_SECONDS.count(stage="decode")
+            fetch_archive(40.7, -74.0, date(2024, 1, 1), date(2024, 1, 2))
+        self.assertGreater(metrics.UPSTREAM_BYTES.value(), bytes_before)
+        self.assertEqual(metrics.UPSTREAM_REQUESTS.value(status=200), ok_before + 1)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage="decode"), decode_before + 1)
+
+if __name__ == "__main__":
+    unittest.main()
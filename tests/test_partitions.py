@@ -0,0 +1,76 @@
+"""
+test_partitions.py - Tests for Time-Partitioned weather_data
+
+Checks partition naming and bounds without a database, then creates, fills,
+checks and drops partitions of sql/schema_partitioned.sql in a separate
+schema of the Testcontainers PostgreSQL database.
+"""
+
+from datetime import date
+from unittest import mock
+
+import pytest
+
+from app import config, partitions
+from app.rollups import refresh_rollups
+from tests.conftest import connect
+
+def test_partition_for_month_and_year():
+    assert partitions.partition_for("2024-12-15", "month") == (
+        "weather_data_p2024_12", date(2024, 12, 1), date(2025, 1, 1)
+    )
+    assert partitions.partition_for(date(2024, 2, 29), "year") == (
+        "weather_data_p2024", date(2024, 1, 1), date(2025, 1, 1)
+    )
+    with pytest.raises(ValueError):
+        partitions.partition_for("2024-01-01", "week")
+
+def test_partitions_for_range_spans_boundaries():
+    names = [p[0] for p in partitions.partitions_for_range("2023-11-30", "2024-02-01", "month")]
+    assert names == ["weather_data_p2023_11", "weather_data_p2023_12", "weather_data_p2024_01", "weather_data_p2024_02"]
+
+@pytest.fixture
+def partitioned_conn(postgres_container):
+    conn = connect(options="-c search_path=partition_test")
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS partition_test CASCADE; CREATE SCHEMA partition_test")
+        cur.execute(open("sql/schema_partitioned.sql").read())
+    conn.commit()
+    partitions.reset()
+    yield conn
+    partitions.reset()
+    conn.close()
+
+@pytest.mark.parametrize("buckets", [0, 4])
+def test_ensure_load_qa_and_drop(partitioned_conn, buckets):
+    conn = partitioned_conn
+    with mock.patch.multiple(config, PARTITION_GRANULARITY="month", PARTITION_VENUE_BUCKETS=buckets):
+        created = partitions.ensure_partitions(conn, "2020-01-15", "2020-03-02")
+        assert created == ["weather_data_p2020_01", "weather_data_p2020_02", "weather_data_p2020_03"]
+        assert partitions.ensure_partitions(conn, "2020-01-01", "2020-01-31") == []
+
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO weather_data (venue_id, timestamp, temperature_2m) VALUES "
+                "('v1', '2020-01-31 23:00+00', 5.0), ('v1', '2020-02-01 00:00+00', 99.0)"
+            )
+        conn.commit()
+
+        report = partitions.qa_by_partition(conn)
+        assert list(report) == created
+        assert report["weather_data_p2020_01"]["passed"]
+        assert report["weather_data_p2020_02"]["violations"]["temperature_2m_range"] == 1  # 99 °C
+
+        with conn.cursor() as cur:
+            refresh_rollups(cur, "v1", "2020-01-31", "2020-02-01")
+        conn.commit()
+
+        assert partitions.drop_partitions(conn, "2020-02-01") == ["weather_data_p2020_01"]
+        assert [p[0] for p in partitions.list_partitions(conn)] == created[1:]
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM weather_data")
+            assert cur.fetchone()[0] == 1
+            cur.execute("SELECT day FROM weather_daily")
+            assert cur.fetchall() == [(date(2020, 2, 1),)]
+            cur.execute("SELECT month FROM weather_monthly")
+            assert cur.fetchall() == [(date(2020, 2, 1),)]
@@ -1,13 +1,26 @@
 """
 test_pipeline.py - Unit Tests for the ETL Pipeline
 
-This module contains tests for the transform function in the ETL pipeline.
+This module contains tests for the transform functions in the ETL pipeline.
 It verifies that data is correctly processed from the API response format
-to the list of dictionaries that match the database schema.
+to the list of dictionaries (or the column arrays) that match the database schema.
 """
 
+import asyncio
+import json
 import unittest
-from app.pipeline import transform
+from datetime import date, datetime
+from unittest import mock
+
+from app import config, decode
+from app.columns import transform_columnar
+from app.decode import decode_columns
+from app.pipeline import (
+    LoadResult, PipelineError, iter_pipeline, run_pipeline, run_pipeline_async, run_pipeline_shared, sync_venue,
+    _as_utc, _record_rows, transform
+)
+from app.venues import UnknownVenueError, Venue, VenueRegistry
+from tests.stub_server import OpenMeteoStub
 
 class TestPipeline(unittest.TestCase):
     def test_transform_empty_data(self):
@@ -47,5 +60,216 @@ class TestPipeline(unittest.TestCase):
         self.assertEqual(result[1]["wind_direction_10m"], 190)
         self.assertEqual(result[0]["weather_code"], 0)
 
+    def test_transform_missing_field_yields_none(self):
+        """
+        A field absent from the response (or shorter than 'time') becomes None.
+        """
+        data = {"hourly": {"time": ["2024-01-01T00:00", "2024-01-01T01:00"], "rain": [0.2]}}
+        result = transform(data)
+        self.assertIsNone(result[0]["temperature_2m"])
+        self.assertEqual(result[0]["rain"], 0.2)
+        self.assertIsNone(result[1]["rain"])
+
+class TestColumnarTransform(unittest.TestCase):
+    def test_columns_and_null_masks(self):
+        data = {
+            "hourly": {
+                "time": ["2024-01-01T00:00", "2024-01-01T01:00", "2024-01-01T02:00"],
+                "temperature_2m": [5.0, None, 7.0],
+                "cloud_cover": [80, 85, None],
+            }
+        }
+        columns = transform_columnar(data)
+        self.assertEqual(len(columns), 3)
+        self.assertEqual(list(columns.timestamps), [1704067200, 1704070800, 1704074400])
+        self.assertEqual(columns.column("temperature_2m"), [5.0, None, 7.0])
+        self.assertEqual(columns.column("cloud_cover"), [80, 85, None])
+        self.assertEqual(columns.values["cloud_cover"].typecode, "q")
+        self.assertEqual(columns.column("rain"), [None, None, None])
+
+    def test_irregular_timestamps_are_parsed_individually(self):
+        data = {"hourly": {"time": ["2024-01-01T00:00Z", "2024-01-01T05:00Z", "2024-01-01T06:00Z"]}}
+        columns = transform_columnar(data)
+        self.assertEqual(list(columns.timestamps), [1704067200, 1704085200, 1704088800])
+
+    def test_gap_offset_by_repeated_hour_is_not_inferred(self):
+        times = ["2024-01-01T00:00", "2024-01-01T01:00", "2024-01-01T01:00", "2024-01-01T03:00"]
+        columns = transform_columnar({"hourly": {"time": times}})
+        self.assertEqual(list(columns.timestamps), [1704067200, 1704070800, 1704070800, 1704078000])
+        regular = [f"2024-01-{d:02d}T{h:02d}:00" for d in (1, 2) for h in range(24)]
+        self.assertEqual(list(transform_columnar({"hourly": {"time": regular}}).timestamps),
+                         list(range(1704067200, 1704067200 + 48 * 3600, 3600)))
+
+    def test_rows_match_record_transform(self):
+        data = {
+            "hourly": {
+                "time": ["2024-01-01T00:00", "2024-01-01T01:00"],
+                "temperature_2m": [5.0, 6.0],
+                "weather_code": [0, 3],
+            }
+        }
+        rows = list(transform_columnar(data).iter_rows("venue"))
+        self.assertEqual(rows[1][:2], ("venue", "2024-01-01 01:00:00+00"))
+        records = transform(data)
+        self.assertEqual(rows[1][2:], tuple(v for k, v in records[1].items() if k != "timestamp"))
+
+    def test_dedupe_keeps_last_row_per_timestamp(self):
+        data = {
+            "hourly": {
+                "time": ["2024-01-01T00:00", "2024-01-01T01:00", "2024-01-01T00:00"],
+                "rain": [1.0, 2.0, 3.0],
+            }
+        }
+        columns = transform_columnar(data).dedupe()
+        self.assertEqual(list(columns.timestamps), [1704070800, 1704067200])
+        self.assertEqual(columns.column("rain"), [2.0, 3.0])
+
+    def test_decode_columns_matches_transform_with_either_decoder(self):
+        data = {
+            "hourly": {
+                "time": ["2024-01-01T00:00", "2024-01-01T01:00"],
+                "temperature_2m": [5.5, None],
+                "weather_code": [0, 3],
+            }
+        }
+        content = json.dumps(data).encode()
+        expected = list(transform_columnar(data).iter_rows("venue"))
+        for decoder in ("orjson", "json"):
+            with self.subTest(decoder=decoder), mock.patch.object(config, "JSON_DECODER", decoder):
+                self.assertEqual(list(decode_columns(content).iter_rows("venue")), expected)
+                self.assertEqual(decode.loads(decode.dumps(data)), data)
+        self.assertEqual(list(decode_columns(json.loads(content)).iter_rows("venue")), expected)
+        with mock.patch("app.decode.orjson", None):
+            self.assertEqual(decode.backend(), "json")
+            self.assertEqual(decode.loads(content), data)
+
+    def test_both_transform_modes_load_utc_instants(self):
+        data = {"hourly": {"time": ["2024-01-01T00:00", "2024-07-01T13:00"], "rain": [1.0, None]}}
+        records = [row[1] for row in _record_rows(transform(data), "venue")]
+        columns = [row[1] for row in _record_rows(transform_columnar(data), "venue")]
+        self.assertEqual(records, ["2024-01-01T00:00+00", "2024-07-01T13:00+00"])
+        self.assertEqual([datetime.fromisoformat(ts) for ts in records],
+                         [datetime.fromisoformat(ts) for ts in columns])
+        self.assertEqual(_as_utc("2024-01-01T00:00:00-05:00"), "2024-01-01T00:00:00-05:00")
+
+    def test_consuming_transform_releases_hourly_lists(self):
+        data = {"hourly": {"time": ["2024-01-01T00:00"], "rain": [1.0]}}
+        columns = transform_columnar(data, consume=True)
+        self.assertEqual(columns.column("rain"), [1.0])
+        self.assertEqual(data["hourly"], {})
+
+class TestStreamingPipeline(unittest.TestCase):
+    """
+    Runs the chunked pipeline against the stub HTTP server with load() mocked,
+    so only the chunking and commit behaviour is exercised.
+    """
+
+    def setUp(self):
+        self.stub = OpenMeteoStub().__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        patcher = mock.patch.multiple(
+            config,
+            OPEN_METEO_ARCHIVE_URL=self.stub.url,
+            ARCHIVE_CACHE_PATH="",
+            PIPELINE_CHUNK_DAYS=3,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        registry = VenueRegistry([
+            Venue("venue", 40.71, -74.01),
+            Venue("neighbour", 40.68, -73.98),
+            Venue("london", 51.51, -0.13),
+        ])
+        registry_patcher = mock.patch("app.pipeline.get_registry", return_value=registry)
+        registry_patcher.start()
+        self.addCleanup(registry_patcher.stop)
+        self.loaded = []
+        self.venues_loaded = []
+        load_patcher = mock.patch("app.pipeline.load", side_effect=self.fake_load)
+        self.load = load_patcher.start()
+        self.addCleanup(load_patcher.stop)
+
+    def fake_load(self, records, venue_id):
+        self.loaded.append(len(records))
+        self.venues_loaded.append(venue_id)
+        return LoadResult(len(records), len(records), 0, 0)
+
+    def test_iter_pipeline_loads_one_chunk_at_a_time(self):
+        chunks = list(iter_pipeline("venue", "2024-01-01", "2024-01-10", chunk_days=3))
+        self.assertEqual([(first, last) for first, last, _ in chunks][-1], (date(2024, 1, 10), date(2024, 1, 10)))
+        self.assertEqual(self.loaded, [72, 72, 72, 24])
+        self.assertEqual(len(self.stub.requests), 4)
+
+    def test_run_pipeline_sums_chunk_results(self):
+        seen = []
+        result = run_pipeline("venue", "2024-01-01", "2024-01-10", on_chunk=lambda *args: seen.append(args))
+        self.assertEqual(result, LoadResult(240, 240, 0, 0))
+        self.assertEqual(len(seen), 4)
+
+    def test_failed_chunk_keeps_earlier_results(self):
+        self.load.side_effect = [LoadResult(72, 72, 0, 0), LoadResult(72, 72, 0, 0), RuntimeError("db down")]
+        with self.assertRaises(PipelineError) as ctx:
+            run_pipeline("venue", "2024-01-01", "2024-01-10")
+        self.assertEqual(ctx.exception.result.rows_loaded, 144)
+        self.assertEqual(ctx.exception.failed_range, (date(2024, 1, 7), date(2024, 1, 9)))
+
+    def test_incremental_run_fetches_only_missing_days(self):
+        stored = {"2024-01-01", "2024-01-02", "2024-01-03", "2024-01-05", "2024-01-06"}
+        with mock.patch("app.sync.complete_days", return_value=stored), \
+                mock.patch("app.pipeline.advance_high_water_mark") as advance:
+            result = run_pipeline("venue", "2024-01-01", "2024-01-10", incremental=True)
+        # Day 4 and days 7-10 (two chunks of at most 3 days).
+        self.assertEqual(self.loaded, [24, 72, 24])
+        self.assertEqual(result.rows_loaded, 120)
+        advance.assert_called_once_with("venue", "2024-01-01", "2024-01-10")
+
+    def test_sync_venue_starts_after_high_water_mark(self):
+        with mock.patch("app.sync.get_high_water_mark", return_value=date(2024, 1, 7)), \
+                mock.patch("app.sync.complete_days") as complete_days, \
+                mock.patch("app.pipeline.advance_high_water_mark", return_value=date(2024, 1, 9)):
+            report = sync_venue("venue", today=date(2024, 1, 11))
+        complete_days.assert_not_called()
+        self.assertEqual((report["start_date"], report["end_date"]), ("2024-01-08", "2024-01-10"))
+        self.assertEqual(report["synced_through"], "2024-01-09")
+        self.assertEqual(self.loaded, [72])
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_first_sync_requires_start_date(self):
+        with mock.patch("app.sync.get_high_water_mark", return_value=None):
+            with self.assertRaises(ValueError):
+                sync_venue("venue", today=date(2024, 1, 11))
+
+    def test_extraction_uses_venue_grid_cell(self):
+        run_pipeline("london", "2024-01-01", "2024-01-01")
+        self.assertEqual(self.venues_loaded, ["london"])
+        self.assertEqual(len(self.stub.requests), 1)
+
+    def test_unknown_venue_is_rejected_before_extraction(self):
+        with self.assertRaises(UnknownVenueError):
+            run_pipeline("nowhere", "2024-01-01", "2024-01-01")
+        self.assertEqual(self.stub.requests, [])
+
+    def test_shared_run_fans_one_extraction_out_to_all_venues(self):
+        results = run_pipeline_shared(["venue", "neighbour"], "2024-01-01", "2024-01-06")
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(results["neighbour"].rows_loaded, 144)
+        self.assertEqual(self.venues_loaded, ["venue", "neighbour"] * 2)
+
+    def test_shared_run_requires_one_cell(self):
+        with self.assertRaises(ValueError):
+            run_pipeline_shared(["venue", "london"], "2024-01-01", "2024-01-01")
+
+    def test_async_pipeline_streams_chunks(self):
+        result = asyncio.run(run_pipeline_async("venue", "2024-01-01", "2024-01-10"))
+        self.assertEqual(result.rows_loaded, 240)
+        self.assertEqual(self.loaded, [72, 72, 72, 24])
+
+    def test_async_pipeline_reports_failed_fetch(self):
+        self.stub.faults.extend([(400, {})])
+        with self.assertRaises(PipelineError) as ctx:
+            asyncio.run(run_pipeline_async("venue", "2024-01-01", "2024-01-10"))
+        self.assertEqual(ctx.exception.failed_range, (date(2024, 1, 1), date(2024, 1, 3)))
+        self.assertEqual(self.loaded, [])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+"""
+test_qa.py - Unit Tests for the QA Rules
+
+Covers in-memory validation of record lists and column arrays, the
+generated single-pass query, and load() rejecting a bad batch before it
+touches the database.
+"""
+
+import unittest
+from datetime import date
+from unittest import mock
+
+from app import config
+from app.columns import transform_columnar
+from app.pipeline import load
+from app.qa import RULES, QAError, build_query, validate_records
+from tests.conftest import synthetic_records
+
+class TestQA(unittest.TestCase):
+    def test_valid_records_pass(self):
+        report = validate_records(synthetic_records(48), "v1")
+        self.assertTrue(report["passed"])
+        self.assertEqual(report["rows"], 48)
+        self.assertEqual(set(report["violations"]), {rule.name for rule in RULES})
+
+    def test_record_violations_are_counted_per_rule(self):
+        records = synthetic_records(10)
+        records[0]["cloud_cover"] = 101
+        records[1]["cloud_cover"] = -1
+        records[2]["pressure_msl"] = 500.0
+        records[3]["temperature_2m"] = None  # NULLs pass range checks
+        records[4]["timestamp"] = None
+        report = validate_records(records, "")
+        self.assertFalse(report["passed"])
+        failing = {name: count for name, count in report["violations"].items() if count}
+        self.assertEqual(failing, {
+            "venue_id_not_null": 10, "timestamp_not_null": 1, "cloud_cover_range": 2, "pressure_msl_range": 1,
+        })
+
+    def test_columns_are_validated(self):
+        data = {"hourly": {
+            "time": [f"2024-01-01T{hour:02d}:00" for hour in range(24)],
+            "temperature_2m": [5.0 + hour / 2 for hour in range(24)],
+            "relative_humidity_2m": [60] * 24,
+        }}
+        columns = transform_columnar(data)
+        self.assertTrue(validate_records(columns, "v1")["passed"])
+
+        data["hourly"]["relative_humidity_2m"][5] = 140
+        data["hourly"]["relative_humidity_2m"][6] = None
+        report = validate_records(transform_columnar(data), "v1")
+        self.assertEqual(report["violations"]["relative_humidity_2m_range"], 1)
+
+    def test_query_has_one_filter_per_rule(self):
+        query, params = build_query(venue_id="v1", start_date="2024-01-01", end_date="2024-01-31")
+        self.assertEqual(set(params), {"venue_id", "lower", "upper"})
+        self.assertEqual(params["upper"].date(), date(2024, 2, 1))
+        self.assertEqual(repr(query).count("FILTER"), len(RULES))
+
+    def test_load_rejects_bad_batch_without_connecting(self):
+        records = synthetic_records(5)
+        records[2]["wind_direction_10m"] = 400
+        with mock.patch.object(config, "QA_VALIDATE_ON_LOAD", True), \
+                mock.patch("app.pipeline.connection") as connection:
+            with self.assertRaises(QAError) as ctx:
+                load(records, "v1")
+        connection.assert_not_called()
+        self.assertEqual(ctx.exception.violations["wind_direction_10m_range"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
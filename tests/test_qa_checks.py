@@ -1,34 +1,42 @@
-import os
-import psycopg2
-import pytest
+from app.pipeline import load
+from app.qa import RULES, run_qa
+from tests.conftest import synthetic_records
 
-@pytest.mark.usefixtures("postgres_container")
-def test_qa_checks():
+def test_qa_checks(db_conn):
     """
-    Runs each QA SQL in sql/qa_checks.sql; fails if any check returns rows.
+    Runs the single-pass query in sql/qa_checks.sql; fails if any rule
+    reports violating rows, or if the file and app.qa.RULES disagree.
     """
-    # Build connection parameters from env vars
-    dsn = {
-        "host":     os.environ["DB_HOST"],
-        "port":     os.environ["DB_PORT"],
-        "dbname":   os.environ["DB_NAME"],
-        "user":     os.environ["DB_USER"],
-        "password": os.environ["DB_PASSWORD"],
-        "sslmode":  os.environ.get("DB_SSLMODE", "disable"),
-    }
+    cur = db_conn.cursor()
+    cur.execute(open("sql/qa_checks.sql").read())
+    rows, *counts = cur.fetchone()
+    names = [column.name for column in cur.description[1:]]
+    cur.close()
 
-    # Connect and run each query in qa_checks.sql
-    conn = psycopg2.connect(**dsn)
-    cur = conn.cursor()
+    assert names == [rule.name for rule in RULES]
+    violations = {name: count for name, count in zip(names, counts) if count}
+    assert not violations, f"QA checks failed: {violations}"
 
-    # Split on semicolon + newline to get individual statements
-    raw_sql = open("sql/qa_checks.sql").read().strip()
-    queries = [q.strip() for q in raw_sql.split(";\n") if q.strip()]
+def test_run_qa_scoped_to_venue_and_window(db_conn):
+    """
+    Stores a bad row (bypassing in-memory validation) and checks that
+    run_qa() counts it only within its venue and window.
+    """
+    load(synthetic_records(24), "test_qa_scope")  # 2020-01-01
 
-    for query in queries:
-        cur.execute(query)
-        rows = cur.fetchall()
-        assert not rows, f"QA check failed for:\n{query}\nReturned rows:\n{rows}"
+    with db_conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO weather_data (venue_id, timestamp, cloud_cover) VALUES (%s, %s, %s)",
+            ("test_qa_scope", "2020-01-02T06:00:00+00", 150),
+        )
+    db_conn.commit()
 
-    cur.close()
-    conn.close()
+    report = run_qa("test_qa_scope", "2020-01-02", "2020-01-02")
+    assert report["rows"] == 1
+    assert report["violations"]["cloud_cover_range"] == 1
+    assert not report["passed"]
+    assert run_qa("test_qa_scope", "2020-01-01", "2020-01-01")["passed"]
+
+    with db_conn.cursor() as cur:
+        cur.execute("DELETE FROM weather_data WHERE venue_id = 'test_qa_scope'")
+    db_conn.commit()
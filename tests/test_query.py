@@ -0,0 +1,49 @@
+"""
+test_query.py - Tests for the Read API Query Layer
+
+Checks field selection and page encoding without a database, then pages
+through rows stored in the Testcontainers PostgreSQL database.
+"""
+
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.models import HOURLY_FIELDS
+from app.pipeline import load
+from app.query import iter_weather, parse_fields, stream_page_json
+from tests.conftest import synthetic_records
+
+def test_parse_fields():
+    assert parse_fields(None) == HOURLY_FIELDS
+    assert parse_fields("rain, temperature_2m,rain") == ("rain", "temperature_2m")
+    with pytest.raises(ValueError):
+        parse_fields("rain,id")
+
+def test_stream_page_json_reports_next_cursor():
+    rows = [(datetime(2024, 1, 1, h, tzinfo=timezone.utc), float(h)) for h in range(3)]
+    page = json.loads("".join(stream_page_json("v1", None, None, ("rain",), limit=3, rows=rows)))
+    assert page["count"] == 3
+    assert page["rows"][1] == {"timestamp": "2024-01-01T01:00:00+00:00", "rain": 1.0}
+    assert page["next_after"] == "2024-01-01T02:00:00+00:00"
+
+    page = json.loads("".join(stream_page_json("v1", None, None, ("rain",), limit=5, rows=rows)))
+    assert page["next_after"] is None
+
+@pytest.mark.usefixtures("postgres_container")
+def test_keyset_pages_cover_window():
+    venue_id = "test_query"
+    load(synthetic_records(72), venue_id)  # 2020-01-01 .. 2020-01-03
+
+    seen = []
+    after = None
+    while True:
+        rows = list(iter_weather(venue_id, date(2020, 1, 2), date(2020, 1, 3), ("rain",), after, limit=20))
+        seen.extend(rows)
+        if len(rows) < 20:
+            break
+        after = rows[-1][0]
+    assert len(seen) == 48
+    assert seen[0][0] == datetime(2020, 1, 2, tzinfo=timezone.utc)
+    assert [r[0] for r in seen] == sorted({r[0] for r in seen})
@@ -0,0 +1,61 @@
+"""
+test_rollups.py - Tests for the Daily and Monthly Rollups
+
+Checks how day rows are combined into months without a database, then loads
+hourly rows into the Testcontainers PostgreSQL database and reads the
+rollups back, including the raw fallback for days without a rollup row.
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from app.pipeline import load
+from app.rollups import aggregates, combine
+from tests.conftest import synthetic_records
+
+def _day(hours, mean, temperature_hours, precipitation, source="rollup"):
+    return {
+        "hours": hours, "temperature_min": mean - 1, "temperature_max": mean + 1, "temperature_mean": mean,
+        "temperature_hours": temperature_hours, "precipitation_sum": precipitation, "rain_sum": None,
+        "snowfall_sum": 0.0, "wind_gusts_max": 5.0, "source": source,
+    }
+
+def test_combine_weights_mean_by_hours():
+    month = combine(date(2024, 1, 1), [_day(24, 10.0, 24, 1.0), _day(12, 4.0, 12, None, source="raw")])
+    assert month["period"] == "2024-01-01"
+    assert month["hours"] == 36
+    assert month["temperature_mean"] == pytest.approx(8.0)
+    assert (month["temperature_min"], month["temperature_max"]) == (3.0, 11.0)
+    assert month["precipitation_sum"] == 1.0
+    assert month["rain_sum"] is None
+    assert month["source"] == "mixed"
+
+def test_load_maintains_rollups(db_conn):
+    venue_id = "test_rollups"
+    records = synthetic_records(24 * 40, start=datetime(2020, 1, 15))  # 2020-01-15 .. 2020-02-23
+    load(records, venue_id)
+
+    days = aggregates(venue_id, "2020-01-15", "2020-01-16")
+    assert [d["period"] for d in days] == ["2020-01-15", "2020-01-16"]
+    assert days[0]["hours"] == 24
+    assert days[0]["temperature_min"] == pytest.approx(10.0)
+    assert days[0]["temperature_max"] == pytest.approx(21.5)
+    assert days[0]["source"] == "rollup"
+
+    # Reloading a changed hour refreshes only that day's and month's rows.
+    changed = dict(records[0], temperature_2m=-5.0)
+    load([changed], venue_id)
+    assert aggregates(venue_id, "2020-01-15", "2020-01-15")[0]["temperature_min"] == pytest.approx(-5.0)
+
+    months = aggregates(venue_id, "2020-01-01", "2020-02-29", granularity="month")
+    assert [(m["period"], m["hours"]) for m in months] == [("2020-01-01", 17 * 24), ("2020-02-01", 23 * 24)]
+    assert months[1]["source"] == "rollup"
+
+    # Days missing from the rollups are aggregated from the raw rows.
+    with db_conn.cursor() as cur:
+        cur.execute("DELETE FROM weather_daily WHERE venue_id = %s AND day = '2020-01-16'", (venue_id,))
+    db_conn.commit()
+    days = aggregates(venue_id, "2020-01-15", "2020-01-17")
+    assert [d["source"] for d in days] == ["rollup", "raw", "rollup"]
+    assert days[1]["hours"] == 24
@@ -0,0 +1,56 @@
+"""
+test_sync.py - Integration Tests for Incremental Sync State
+
+Checks gap detection and the high-water mark against the Testcontainers
+PostgreSQL database.
+"""
+
+from datetime import date
+
+import pytest
+
+from app.pipeline import load
+from app.sync import advance_high_water_mark, complete_days, get_high_water_mark, missing_day_ranges
+from tests.conftest import synthetic_records
+
+TODAY = date(2024, 1, 1)
+
+@pytest.mark.usefixtures("postgres_container")
+def test_complete_days_and_missing_ranges():
+    venue_id = "test_sync_gaps"
+    records = synthetic_records(96)  # 2020-01-01 .. 2020-01-04
+    del records[30]  # one missing hour on 2020-01-02
+    load(records, venue_id)
+
+    assert complete_days(venue_id, "2020-01-01", "2020-01-05") == {"2020-01-01", "2020-01-03", "2020-01-04"}
+    assert missing_day_ranges(venue_id, "2020-01-01", "2020-01-06", today=TODAY) == [
+        (date(2020, 1, 2), date(2020, 1, 2)),
+        (date(2020, 1, 5), date(2020, 1, 6)),
+    ]
+
+@pytest.mark.usefixtures("postgres_container")
+def test_high_water_mark_never_skips_a_gap():
+    venue_id = "test_sync_mark"
+    records = synthetic_records(24 * 15)  # 2020-01-01 .. 2020-01-15
+    del records[24 * 12 + 5]  # one missing hour on 2020-01-13
+    load(records, venue_id)
+
+    # Only a seeded (first sync) run creates the mark.
+    assert advance_high_water_mark(venue_id, "2020-01-05", "2020-01-10", today=TODAY) is None
+    assert get_high_water_mark(venue_id) is None
+    assert advance_high_water_mark(venue_id, "2020-01-01", "2020-01-10", today=TODAY, seed=True) == date(2020, 1, 10)
+    # Not contiguous with the mark: unchanged.
+    assert advance_high_water_mark(venue_id, "2020-01-20", "2020-01-31", today=TODAY) == date(2020, 1, 10)
+    # Stops before the incomplete day.
+    assert advance_high_water_mark(venue_id, "2020-01-11", "2020-01-15", today=TODAY) == date(2020, 1, 12)
+    load(synthetic_records(24 * 15), venue_id)
+    assert advance_high_water_mark(venue_id, "2020-01-01", "2020-01-15", today=TODAY) == date(2020, 1, 15)
+    # Days without stored data do not count.
+    assert advance_high_water_mark(venue_id, "2020-01-16", "2020-01-20", today=TODAY) == date(2020, 1, 15)
+
+@pytest.mark.usefixtures("postgres_container")
+def test_seeded_mark_starts_at_the_first_complete_day():
+    venue_id = "test_sync_seed"
+    load(synthetic_records(24 * 3), venue_id)  # 2020-01-01 .. 2020-01-03
+    assert advance_high_water_mark(venue_id, "2019-12-31", "2020-01-03", today=TODAY, seed=True) is None
+    assert advance_high_water_mark(venue_id, "2020-01-01", "2020-01-03", today=TODAY, seed=True) == date(2020, 1, 3)
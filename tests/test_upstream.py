@@ -0,0 +1,176 @@
+"""
+test_upstream.py - Tests for the Shared Open-Meteo Client Policy
+
+Checks the token bucket and circuit breaker against a fake clock, then sends
+requests through UpstreamClient to the local stub server with injected 429s,
+5xx responses, dropped connections and slow responses.
+"""
+
+import asyncio
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest import mock
+
+import httpx
+
+from app import config
+from app.upstream import (
+    CircuitBreaker, CircuitOpenError, TokenBucket, UpstreamClient, UpstreamError, close_session, get_session,
+    get_upstream, parse_retry_after,
+)
+from tests.stub_server import DROP, OpenMeteoStub
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(rate=2, burst=2, min_rate=0.5, clock=self.clock)
+
+    def test_burst_then_spacing(self):
+        self.assertEqual([self.bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+        self.clock.now += 1.0
+        self.assertEqual(self.bucket.reserve(), 0.5)
+
+    def test_throttle_pauses_and_halves_the_rate_until_recovered(self):
+        self.bucket.throttle(pause=3)
+        self.assertEqual(self.bucket.rate, 1)
+        self.assertEqual(self.bucket.reserve(), 4.0)  # pause plus one token at the halved rate
+        for _ in range(3):
+            self.bucket.throttle()
+        self.assertEqual(self.bucket.rate, 0.5)
+        for _ in range(20):
+            self.bucket.recover()
+        self.assertEqual(self.bucket.rate, 2)
+
+    def test_zero_rate_disables_limiting(self):
+        bucket = TokenBucket(rate=0, burst=1, min_rate=0.5, clock=self.clock)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(threshold=2, reset_after=10, clock=self.clock)
+
+    def test_opens_after_consecutive_failures_and_probes_after_reset(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.check()
+        self.breaker.record_failure()
+        self.clock.now += 4
+        with self.assertRaises(CircuitOpenError) as ctx:
+            self.breaker.check()
+        self.assertEqual(ctx.exception.retry_after, 6)
+
+        self.clock.now += 6
+        self.breaker.check()  # the probe
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.check()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.now += 10
+        self.breaker.check()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.check()
+
+def test_parse_retry_after():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < parse_retry_after(later) <= 30
+
+class TestUpstreamClient(unittest.TestCase):
+    """Requests through the policy against the stub server with injected faults."""
+
+    def setUp(self):
+        self.stub = OpenMeteoStub().__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        patcher = mock.patch.multiple(
+            config,
+            EXTRACT_MAX_RETRIES=2,
+            EXTRACT_BACKOFF=0.01,
+            EXTRACT_TIMEOUT=0.2,
+            UPSTREAM_BREAKER_THRESHOLD=3,
+            UPSTREAM_BREAKER_RESET=60,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.params = {
+            "latitude": 40.71, "longitude": -74.01, "start_date": "2024-01-01", "end_date": "2024-01-01",
+            "hourly": "rain", "timezone": "UTC",
+        }
+
+    def get(self):
+        return get_upstream().get(self.stub.url, self.params)
+
+    def test_dropped_connections_and_5xx_are_retried(self):
+        self.stub.faults.extend([DROP, (503, {})])
+        self.assertIn(b'"hourly"', self.get())
+        stats = get_upstream().stats()
+        self.assertEqual((stats["requests"], stats["retries"], stats["circuit"]), (3, 2, "closed"))
+        self.assertIsNotNone(stats["latency_ms"])
+
+    def test_sync_requests_share_one_session(self):
+        session = get_session()
+        with mock.patch.object(session, "get", wraps=session.get) as get:
+            self.get()
+            self.get()
+        self.assertEqual(get.call_count, 2)
+        close_session()
+        self.assertIsNot(get_session(), session)
+
+    def test_429_backs_off_the_rate_and_honors_retry_after(self):
+        self.stub.faults.append((429, {"Retry-After": "0.3"}))
+        started = time.monotonic()
+        self.get()
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        stats = get_upstream().stats()
+        self.assertEqual(stats["throttled"], 1)
+        self.assertLess(stats["rate"], config.UPSTREAM_RATE)
+
+    def test_slow_responses_time_out(self):
+        self.stub.delay = 0.5
+        with self.assertRaises(UpstreamError) as ctx:
+            self.get()
+        self.assertIsNone(ctx.exception.status)
+        self.assertEqual(len(self.stub.requests), 3)
+
+    def test_open_circuit_fails_fast_without_contacting_upstream(self):
+        self.stub.faults.extend([(500, {})] * 3)
+        with self.assertRaises(UpstreamError):
+            self.get()
+        with self.assertRaises(CircuitOpenError) as ctx:
+            asyncio.run(self.get_async())
+        self.assertEqual(len(self.stub.requests), 3)
+        self.assertGreater(ctx.exception.retry_after, 0)
+        self.assertEqual(get_upstream().stats()["rejected"], 1)
+
+    def test_client_errors_are_not_retried(self):
+        self.stub.faults.append((400, {}))
+        with self.assertRaises(httpx.HTTPStatusError):
+            asyncio.run(self.get_async())
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(get_upstream().breaker.failures, 0)
+
+    async def get_async(self):
+        async with httpx.AsyncClient() as client:
+            return await get_upstream().get_async(client, self.stub.url, self.params)
+
+class TestJitter(unittest.TestCase):
+    def test_backoff_is_jittered_between_half_and_full(self):
+        client = UpstreamClient(
+            TokenBucket(0, 1, 0), CircuitBreaker(0, 0), max_retries=5, backoff=1.0, timeout=1, rng=lambda: 0.5
+        )
+        response = mock.Mock(status_code=503, content=b"")
+        self.assertEqual([client._settle(attempt, response, None, None, 0.1) for attempt in range(3)], [0.75, 1.5, 3.0])
@@ -0,0 +1,50 @@
+"""
+test_venues.py - Unit Tests for the Venue Registry
+
+Uses registries built from in-memory venues, which never touch the database.
+"""
+
+import unittest
+from unittest import mock
+
+from app import config
+from app.venues import UnknownVenueError, Venue, VenueRegistry, grid_cell
+
+class TestGridCell(unittest.TestCase):
+    def test_snaps_to_resolution(self):
+        self.assertEqual(grid_cell(40.71, -74.01, 0.1), (40.7, -74.0))
+        self.assertEqual(grid_cell(40.76, -74.04, 0.1), (40.8, -74.0))
+        self.assertEqual(grid_cell(40.71, -74.01, 0.25), (40.75, -74.0))
+
+    def test_default_resolution_comes_from_config(self):
+        with mock.patch.object(config, "VENUE_GRID_RESOLUTION", 1.0):
+            self.assertEqual(grid_cell(40.71, -74.01), (41.0, -74.0))
+
+class TestVenueRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = VenueRegistry([
+            Venue("nyc-1", 40.71, -74.01),
+            Venue("nyc-2", 40.73, -73.99),
+            Venue("london", 51.51, -0.13),
+        ])
+
+    def test_get_returns_venue(self):
+        self.assertEqual(self.registry.get("london").latitude, 51.51)
+
+    def test_unknown_venue_raises(self):
+        with self.assertRaises(UnknownVenueError) as ctx:
+            self.registry.get("nowhere")
+        self.assertEqual(str(ctx.exception), "Unknown venue: nowhere")
+
+    def test_group_by_cell(self):
+        self.assertEqual(
+            self.registry.group_by_cell(["nyc-1", "london", "nyc-2"]),
+            {(40.7, -74.0): ["nyc-1", "nyc-2"], (51.5, -0.1): ["london"]},
+        )
+
+    def test_register_adds_to_cache(self):
+        self.registry.register(Venue("paris", 48.85, 2.35))
+        self.assertEqual([v.venue_id for v in self.registry.all()], ["london", "nyc-1", "nyc-2", "paris"])
+
+if __name__ == "__main__":
+    unittest.main()